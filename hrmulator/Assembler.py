@@ -1,13 +1,15 @@
+import os
 import re
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 
-from .Instructions import INSTRUCTION_CATALOG
+from .Instructions import INSTRUCTION_CATALOG, AbstractTileInstruction
 
 
 class AssemblerError(Exception):
     def __init__(self, line_number, text):
         self.line_number = line_number
         self.text = text
+        super().__init__(line_number, text)  # so that it pickles
 
     def __str__(self):
         return f'{self.description}, line {self.line_number}: "{self.text}"'
@@ -29,6 +31,11 @@ class SyntaxError(AssemblerError):
     description = "Syntax error"
 
 
+AssembledFile = namedtuple("AssembledFile", "path program jump_table errors")
+# What `assemble_directory` makes of each file: the program and the jump
+# table, or else None and None, and every error found in it.
+
+
 class Assembler:
     """
     This is the class that turns text into an HRM program.
@@ -37,21 +44,22 @@ class Assembler:
 
         Assembler.assemble_program_file(file_path)
         Assembler.assemble_program_text(str)
+        Assembler.assemble_directory(directory_path)
 
     Either your program is stored in the file-system somewhere, or else you
     provide it inline.  Your choice.  Both routines return a tuple of the
-    program itself, and the jump table referring into it.
+    program itself, and the jump table referring into it.  Or, to grade a
+    whole directory of programs at once, `assemble_directory` assembles every
+    `.hrm` file in it, and reports every error in every file, rather than
+    stopping at the first.
     """
 
-    comment_re = re.compile(r"(.*)#.*")
-    # keep anything to the left of the comment marker
-
-    label_re = re.compile(r"(\w+):")
-    instruction_with_arg_re = re.compile(r"(\w+)\s+(\w+)$")
-    indirect_tile_instruction_re = re.compile(r"(\w+)\s+\[(\w+)\]$")
-    # Note tile index is made of word characters not necessarily digits.
-
-    instruction_re = re.compile(r"(\w+)$")
+    line_re = re.compile(r"(?:(\w+):|(\w+)(?:\s+(\w+)|\s+\[(\w+)\])?$)")
+    # Every line, once the comment and the surrounding whitespace are gone,
+    # is a label, or an instruction, with or without an argument, direct or
+    # indirect; and this tells which, in a single match.  A label is a word
+    # followed by a colon, and anything after that is ignored.  Note tile
+    # index is made of word characters not necessarily digits.
 
     def __init__(self):
         """
@@ -63,28 +71,48 @@ class Assembler:
     def assemble_program_file(self, path):
         """...when your HRM program lives in the file-system."""
         with open(path, "r") as infile:
-            lines = infile.readlines()
-        return self._assemble_program(lines)
+            return self._assemble_program(infile)  # a line at a time
 
     def assemble_program_text(self, text):
         """...when your HRM program is provided inline."""
         lines = text.split("\n")
         return self._assemble_program(lines)
 
+    def assemble_directory(self, path):
+        """
+        Assemble every `.hrm` file in the directory `path`, and return an
+        AssembledFile for each, in order of their names.  Any AssemblerError,
+        or any error reading a file, is kept in the file's `errors`, not
+        raised.
+        """
+        assembled = []
+        for name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, name)
+            if not name.endswith(".hrm") or not os.path.isfile(file_path):
+                continue
+            errors = []
+            try:
+                with open(file_path, "r") as infile:
+                    program, jump_table = self._assemble_program(infile, errors)
+            except (OSError, UnicodeDecodeError) as e:
+                errors.append(e)
+            if errors:
+                program = jump_table = None
+            assembled.append(AssembledFile(file_path, program, jump_table, errors))
+        return assembled
+
     def _strip_off_the_comment_if_any(self, line):
-        match = re.match(self.comment_re, line)
-        if match is not None:
-            line = match.group(1)
-        return line
-
-    def _save_labels_in_the_jump_table(self, line, step, jump_table):
-        match = re.match(self.label_re, line)
-        if match is not None:
-            jump_table[match.group(1)] = step
-            return True
-
-    def _assemble_program(self, lines):
-        """Read the source line-by-line and translate it into instructions."""
+        # keep anything to the left of the last comment marker
+        comment = line.rfind("#")
+        return line if comment < 0 else line[:comment]
+
+    def _assemble_program(self, lines, errors=None):
+        """
+        Read the source line-by-line and translate it into instructions.
+
+        Raise the first AssemblerError; or, given a list of `errors`, add
+        every one to it, and go on to the next line.
+        """
         program = []
 
         jump_table = OrderedDict()
@@ -98,61 +126,62 @@ class Assembler:
         # order when there are multiple labels at the same point.  Edge
         # case, I know.
 
+        match_line = self.line_re.match
+        symbol_catalog = self.symbol_catalog
         step = 0
         line_number = 0  # ...for error reporting; 1-based like your editor.
         for line in lines:
             line_number += 1
 
-            line = self._strip_off_the_comment_if_any(line)
+            if "#" in line:
+                line = self._strip_off_the_comment_if_any(line)
             line = line.strip()
             if not line:
                 continue
 
-            if self._save_labels_in_the_jump_table(line, step, jump_table):
-                continue
-
-            match = None
-            arg = None
-            indirect = False
-            has_arg_match = re.match(self.instruction_with_arg_re, line)
-            indirect_tile_match = re.match(self.indirect_tile_instruction_re, line)
-            op_match = re.match(self.instruction_re, line)
-
-            match = has_arg_match or indirect_tile_match
-            if match is not None:
-                arg = match.group(2)
-                indirect = indirect_tile_match is not None
+            match = match_line(line)
+            if match is None:
+                error = SyntaxError(line_number, line)
             else:
-                match = op_match
-
-            if match is not None:
-                symbol = match.group(1).lower()
-                if symbol not in self.symbol_catalog:
-                    raise UnknownInstructionError(line_number, match.group(1))
-
-                class_ = self.symbol_catalog[symbol]
-                if class_.has_argument:
+                label, symbol, arg, indirect_arg = match.groups()
+                if label is not None:
+                    jump_table[label] = step
+                    continue
+
+                indirect = indirect_arg is not None
+                if indirect:
+                    arg = indirect_arg
+                class_ = symbol_catalog.get(symbol.lower())
+                if class_ is None:
+                    error = UnknownInstructionError(line_number, symbol)
+                elif class_.has_argument:
                     if arg is None:
-                        raise ArgumentRequiredError(line_number, line)
-                    try:
-                        # arg could be a raw step number, or tile index.
-                        arg = int(arg)
-                    except ValueError:
-                        # otherwise it's a name or label
-                        pass
-
-                    # Can't just say class_(arg, indirect=indirect) because it
-                    # might be one of the jump instructions.  They don't take
-                    # the indirect keyword
-                    instruction = class_(arg, indirect=True) if indirect else class_(arg)
-
+                        error = ArgumentRequiredError(line_number, line)
+                    elif indirect and not issubclass(class_, AbstractTileInstruction):
+                        error = SyntaxError(line_number, line)  # only tiles can be indirect, not places
+                    else:
+                        try:
+                            # arg could be a raw step number, or tile index.
+                            arg = int(arg)
+                        except ValueError:
+                            # otherwise it's a name or label
+                            pass
+
+                        # Can't just say class_(arg, indirect=indirect) because it
+                        # might be one of the jump instructions.  They don't take
+                        # the indirect keyword
+                        program.append(class_(arg, indirect=True) if indirect else class_(arg))
+                        step += 1
+                        continue
                 elif arg is not None:
-                    raise UnexpectedArgumentError(line_number, arg)
+                    error = UnexpectedArgumentError(line_number, arg)
                 else:
-                    instruction = class_()
-                program.append(instruction)
-                step += 1
-            else:
-                raise SyntaxError(line_number, line)
+                    program.append(class_())
+                    step += 1
+                    continue
+
+            if errors is None:
+                raise error
+            errors.append(error)
 
         return (program, jump_table)
@@ -0,0 +1,213 @@
+"""
+Assembling a program means reading its source, and matching every line of it
+against a handful of regular expressions.  Grading the same submission again,
+or loading one program into thousands of computers, needn't do that again
+and again: an AssemblyCache keeps the programs it has assembled, by the
+content of their source, and hands each one back, without assembling it, the
+next time the same source comes along.
+
+    >>> cache = AssemblyCache()
+    >>> program, jump_table = cache.assemble(program_text='''
+    ... START:
+    ...     move_from_inbox   # the same program...
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> program, jump_table = cache.assemble(program_text='''
+    ... START:
+    ...     move_from_inbox
+    ...     move_to_outbox    # ...with different comments
+    ...     jump_to START''')
+    >>> cache.hits, cache.misses
+    (1, 1)
+
+A program is known by the SHA-256 hash of its normalized source: without the
+comments, the blank lines, or the extra whitespace, all of which the assembler
+ignores anyway.  So two sources with the same key assemble to the same
+program.  A source that doesn't assemble isn't kept, and raises its
+AssemblerError, with the right line number, every time.  A source in a file is
+hashed, and assembled, a line at a time, without reading all of it at once.
+
+The cache keeps at most `maxsize` programs in memory, dropping the least
+recently used.  With a `directory`, it also keeps every program it assembles
+there, pickled, in a file named for its key; so any number of processes can
+share what they've assembled, and a program assembled once is never assembled
+again, even after a restart.  A file in the directory that can't be read is
+as good as no file.  Only point it at a directory you trust: unpickling runs
+code.
+
+Every caller gets a list and a jump table of its own, holding the same
+instructions; so a computer can change its program without changing anyone
+else's.  A caller who asks for the program as bytecode gets a BytecodeProgram
+(see Bytecode.py), which can't be changed, so it's encoded only once, and
+shared.  Computers share `default_cache`, unless they're given another, with
+`Computer(assembly_cache=...)`; `run_batch`, `run_lockstep`, and `run_shared`
+use it too.  It's safe to share between threads.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from .Assembler import Assembler
+from .Bytecode import BytecodeProgram
+
+MAXSIZE = 256
+
+FORMAT = "hrmulator assembly 1"
+# Part of every key: change it when assembled programs change, so that files
+# left in a cache directory by an older hrmulator aren't used.
+
+
+def normalize(text):
+    """
+    Return the source `text` the way the assembler sees it: without comments,
+    blank lines, or any whitespace but a single space between words.
+    """
+    return "\n".join(_normalized_lines(text.split("\n")))
+
+
+def _normalized_lines(lines):
+    strip_comment = Assembler()._strip_off_the_comment_if_any
+    lines = (" ".join(strip_comment(line).split()) for line in lines)
+    return (line for line in lines if line)
+
+
+@functools.lru_cache(maxsize=MAXSIZE)
+def key(text):
+    """
+    Return the key of the source `text`: the hash of it, normalized.  The keys
+    of recent sources are remembered, so the same text is only hashed once.
+    """
+    return hashlib.sha256(f"{FORMAT}\n{normalize(text)}".encode("utf-8")).hexdigest()
+
+
+def file_key(path):
+    """
+    Return the key of the source in the file `path`, the same as `key` of all
+    of it, reading it a line at a time.
+    """
+    digest = hashlib.sha256(f"{FORMAT}\n".encode("utf-8"))
+    separator = ""
+    with open(path, "r") as f:
+        for line in _normalized_lines(f):
+            digest.update(f"{separator}{line}".encode("utf-8"))
+            separator = "\n"
+    return digest.hexdigest()
+
+
+class AssemblyCache:
+    def __init__(self, maxsize=MAXSIZE, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.programs = OrderedDict()  # key: (program, jump_table), least recently used first
+        self.bytecode = {}  # key: BytecodeProgram, for those of `programs` asked for as bytecode
+        self.hits = 0  # found in memory
+        self.disk_hits = 0  # found in `directory`
+        self.misses = 0  # assembled
+
+    def assemble(self, *, program_path=None, program_text=None, bytecode=False, metrics=None):
+        """
+        Return the program, and the jump table, for the source `program_text`,
+        or in the file `program_path`; just like Assembler's methods.  With
+        `bytecode=True`, the program is a BytecodeProgram.  With `metrics`, an
+        ExecutorMetrics, a program that has to be assembled, found neither in
+        memory nor in `directory`, has how long that took observed in its
+        `assembly_seconds`.
+        """
+        program_key = key(program_text) if program_text is not None else file_key(program_path)
+        with self.lock:
+            assembled = self.programs.get(program_key)
+            if assembled is not None:
+                self.programs.move_to_end(program_key)
+                self.hits += 1
+        if assembled is None:
+            assembled = self._read(program_key)
+            if assembled is not None:
+                self._keep(program_key, assembled, "disk_hits")
+            else:
+                start = time.perf_counter()
+                if program_text is not None:
+                    assembled = Assembler().assemble_program_text(program_text)
+                else:
+                    assembled = Assembler().assemble_program_file(program_path)
+                if metrics is not None:
+                    metrics.assembly_seconds.observe(time.perf_counter() - start)
+                self._write(program_key, assembled)
+                self._keep(program_key, assembled, "misses")
+        program, jump_table = assembled
+        if bytecode:
+            return self._encode(program_key, program), OrderedDict(jump_table)
+        return list(program), OrderedDict(jump_table)
+
+    def _encode(self, program_key, program):
+        """Return `program` as a BytecodeProgram, encoding it only if it hasn't been already."""
+        with self.lock:
+            encoded = self.bytecode.get(program_key)
+        if encoded is None:
+            encoded = BytecodeProgram(program)
+            with self.lock:
+                if program_key in self.programs:
+                    encoded = self.bytecode.setdefault(program_key, encoded)
+        return encoded
+
+    def _keep(self, program_key, assembled, counter):
+        """Keep `assembled` in memory, and count where it came from in `counter`."""
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            if self.maxsize <= 0:
+                return
+            self.programs[program_key] = assembled
+            self.programs.move_to_end(program_key)
+            while len(self.programs) > self.maxsize:
+                dropped, _ = self.programs.popitem(last=False)
+                self.bytecode.pop(dropped, None)
+
+    def _path(self, program_key):
+        return os.path.join(self.directory, f"{program_key}.pickle")
+
+    def _read(self, program_key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(program_key), "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None  # missing, or written by something else: assemble it again
+
+    def _write(self, program_key, assembled):
+        """Write `assembled` to `directory`, all at once, so that no process reads half of it."""
+        if self.directory is None:
+            return
+        fd, temporary = tempfile.mkstemp(dir=self.directory, prefix=".assembly-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(assembled, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self._path(program_key))
+        except OSError:
+            os.unlink(temporary)  # a full disk just means it gets assembled again
+
+    def clear(self):
+        """Forget every program kept in memory; the ones in `directory` stay."""
+        with self.lock:
+            self.programs.clear()
+            self.bytecode.clear()
+
+    def __reduce__(self):
+        # a copy, or a pickled one, starts out empty, with the same settings, and its own lock
+        return AssemblyCache, (self.maxsize, self.directory)
+
+
+default_cache = AssemblyCache()
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
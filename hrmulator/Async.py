@@ -0,0 +1,170 @@
+"""
+`Computer.run_async` is `run` for asyncio: it runs the program a slice of
+steps at a time, and lets the event loop get on with everything else in
+between, so one event loop can keep any number of computers going without a
+thread for each, and without any one of them hogging it.  When the inbox runs
+dry, rather than stopping, it waits for more.
+
+    >>> import asyncio
+    >>> from hrmulator.Computer import Computer
+    >>> async def echo(requests, responses):
+    ...     computer = Computer()
+    ...     computer.load_program(program_text='''
+    ...     START:
+    ...         move_from_inbox
+    ...         move_to_outbox
+    ...         jump_to START''')
+    ...     computer.set_inbox(AsyncInbox(requests))
+    ...     computer.set_outbox(AsyncOutbox(responses))
+    ...     await computer.run_async()
+    ...     return computer.total_steps_executed
+    >>> async def main():
+    ...     requests, responses = asyncio.Queue(), asyncio.Queue()
+    ...     running = asyncio.create_task(echo(requests, responses))
+    ...     for value in (1, 'A', 2):
+    ...         await requests.put(value)
+    ...         print(await responses.get())
+    ...     await requests.put(None)
+    ...     return await running
+    >>> asyncio.run(main())
+    1
+    A
+    2
+    9
+
+An AsyncInbox takes its values from an `asyncio.Queue`, or from an async
+iterator (`set_inbox` wraps one of those by itself).  A queue's values end
+with a `None`, or when the queue is shut down; an iterator's, when it stops.
+An AsyncOutbox sends values on to an `asyncio.Queue`, or to a coroutine
+function, which is called with each one.  Either may be used without the
+other, and both may be used with plain `run`, too: it just won't wait.
+
+Values moved to an AsyncOutbox are sent at the end of each slice, and before
+waiting for the inbox, so a program always answers one request before it's
+made to wait for the next.  A slice is `steps_per_slice` dispatches; a
+counting loop, see CountingLoops.py, or a superinstruction, see Fusion.py,
+counts as one, however many steps it takes.
+
+Only the "interpreter" and "linked" engines can run in slices, see
+`Computer.start`, and with them,
+fusing and detecting loops work just the same as they do for `run`.
+"""
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+
+from .Computer import FINISHED, PAUSED
+from .Streams import Inbox
+
+# Queue.shutdown is new in Python 3.13
+QueueShutDown = getattr(asyncio, "QueueShutDown", ())
+
+
+class AsyncInbox(Inbox):
+    """
+    An inbox that waits for its values to arrive, from an `asyncio.Queue` or an
+    async iterator.  Its length is the number of values that have arrived and
+    not yet been taken.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.arrived = deque()
+        self.taken = 0  # how many values `popleft` has handed out
+        self.ended = False
+
+    def __len__(self):
+        return len(self.arrived)
+
+    def popleft(self):
+        if not self.arrived:
+            raise IndexError("pop from an empty inbox")
+        self.taken += 1
+        return self.arrived.popleft()
+
+    def __iter__(self):
+        """Iterate over the values that have arrived; the rest are yet to come."""
+        return iter(self.arrived)
+
+    async def wait(self):
+        """Wait for more values to arrive; return False if there won't be any."""
+        if self.ended:
+            return False
+        if isinstance(self.source, AsyncIterator):
+            try:
+                self.arrived.append(await self.source.__anext__())
+            except StopAsyncIteration:
+                self.ended = True
+        else:
+            try:
+                self._arrive(await self.source.get())
+                # take everything else that's already there, too
+                while not self.ended and not self.source.empty():
+                    self._arrive(self.source.get_nowait())
+            except QueueShutDown:
+                self.ended = True
+        return bool(self.arrived)
+
+    def _arrive(self, value):
+        if value is None:
+            self.ended = True
+        else:
+            self.arrived.append(value)
+
+    def __repr__(self):
+        return f"<an async inbox, {self.taken} values taken>"
+
+
+class AsyncOutbox:
+    """
+    An outbox that sends values on to an `asyncio.Queue` or a coroutine
+    function.  Values wait in `pending` until they're sent.
+    """
+
+    def __init__(self, sink):
+        self.send = sink.put if isinstance(sink, asyncio.Queue) else sink
+        self.pending = deque()
+        self.sent = 0
+
+    def append(self, value):
+        self.pending.append(value)
+
+    def extend(self, values):
+        self.pending.extend(values)
+
+    async def flush(self):
+        """Send every pending value."""
+        while self.pending:
+            await self.send(self.pending.popleft())
+            self.sent += 1
+
+    def __repr__(self):
+        return f"<an async outbox, {self.sent} values sent>"
+
+
+async def run_async(computer, steps_per_slice):
+    """See Computer.run_async."""
+    computer.start()
+    inbox, outbox = computer.inbox, computer.outbox
+    flush = outbox.flush if isinstance(outbox, AsyncOutbox) else None
+    while True:
+        try:
+            why = computer.resume(steps_per_slice)
+        except Exception:
+            # send what the program did output before it failed
+            if flush is not None:
+                await flush()
+            raise
+        if flush is not None:
+            await flush()
+        if why is PAUSED:
+            await asyncio.sleep(0)
+        elif why is FINISHED or not (isinstance(inbox, AsyncInbox) and await inbox.wait()):
+            break
+    computer.program_counter = None
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,168 @@
+"""
+Grading a program means running it over and over, against thousands of
+inboxes.  `run_batch` assembles the program once, and spreads the runs out
+over a pool of worker processes, so a big machine can use all of its cores:
+
+    >>> from hrmulator.Memory import Memory
+    >>> results = run_batch(
+    ...     program_text='''
+    ...     START:
+    ...         move_from_inbox
+    ...         jump_if_zero_to START
+    ...         move_to_outbox
+    ...         jump_to START''',
+    ...     memory=Memory(),
+    ...     inboxes=[[1, 0, 2], [], [0, 0, 'A']],
+    ...     max_workers=2,
+    ... )
+    >>> for result in results:
+    ...     print(result.outbox, result.steps, result.error)
+    [1, 2] 10 None
+    [] 0 None
+    ['A'] 8 None
+
+The results come back in the same order as the inboxes.  Each run starts from
+`memory` just as it was given, so one run can't see what another left on the
+floor.  A run that fails doesn't stop the batch: its result holds the
+exception, along with whatever made it into the outbox before the failure.
+With `detect_loops=True`, a run that would go on forever fails, too, with an
+InfiniteLoopError; see LoopDetection.py.
+
+There are three ways to run the batch, chosen by `backend`:
+
+    "process"       (the default) a pool of worker processes.  The program,
+                    the memory, and the inboxes are pickled to get them to the
+                    workers, and so are the results on their way back.
+    "thread"        a pool of threads in this process, sharing the assembled
+                    program, with nothing pickled.  On a free-threaded build
+                    of CPython, the threads really do run at the same time;
+                    with the GIL, they take turns.
+    "subinterpreter"
+                    a pool of subinterpreters, each with a GIL of its own, in
+                    this process.  Everything is pickled, as for processes,
+                    but the pool is much cheaper to start.  This needs Python
+                    3.14 or newer.
+
+The threads can share the program because a Computer keeps every bit of its
+state to itself; see Computer.py for exactly what is safe.  To keep the
+overhead down, inboxes are handed out in chunks; `chunksize` picks how many at
+a time, and by default there are about four chunks per worker.  Each chunk is
+run by one computer, with its own copy of `memory`, that has its tiles put
+back, see `Memory.restore`, between runs; so the program is only linked, or
+transpiled, once a chunk.
+"""
+import concurrent.futures
+import copy
+import os
+import time
+from collections import namedtuple
+from functools import partial
+
+from .AssemblyCache import default_cache
+from .Computer import Computer
+from .Memory import Memory
+
+BatchResult = namedtuple("BatchResult", ["outbox", "steps", "error"])
+
+BACKENDS = {
+    # backend name: the name of its executor class in concurrent.futures
+    "process": "ProcessPoolExecutor",
+    "thread": "ThreadPoolExecutor",
+    "subinterpreter": "InterpreterPoolExecutor",
+}
+
+CHUNKS_PER_WORKER = 4
+
+_job = None
+# Each process's, or subinterpreter's, copy of (program, jump_table, memory,
+# engine, detect_loops), set once, by `_start_worker`, when the pool starts
+# it.  Threads share the one job, and are handed it directly.
+
+
+def run_batch(
+    *,
+    program_path=None,
+    program_text=None,
+    memory=None,
+    inboxes,
+    engine="linked",
+    detect_loops=False,
+    backend="process",
+    max_workers=None,
+    chunksize=None,
+    metrics=None,
+):
+    """
+    Run one program against each of `inboxes`, in a pool of `max_workers`
+    workers (by default, one for each CPU), and return a list of
+    BatchResults.  With `metrics`, an ExecutorMetrics, count the runs and
+    their steps, and errors, and time them, see Metrics.py.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend "{backend}", expected one of {tuple(BACKENDS)}')
+    executor_class = getattr(concurrent.futures, BACKENDS[backend], None)
+    if executor_class is None:
+        raise ValueError(f'The "{backend}" backend is not available in this version of Python')
+    program, jump_table = default_cache.assemble(program_path=program_path, program_text=program_text)
+    if memory is None:
+        memory = Memory()
+    Computer(engine=engine, detect_loops=detect_loops)  # fail now, not in every worker, if we can't
+
+    inboxes = [list(inbox) for inbox in inboxes]
+    if not inboxes:
+        return []
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(inboxes) // (max_workers * CHUNKS_PER_WORKER))
+    chunks = [inboxes[start : start + chunksize] for start in range(0, len(inboxes), chunksize)]
+
+    job = (program, jump_table, memory, engine, detect_loops)
+    if backend == "thread":
+        pool = executor_class(max_workers=max_workers)
+        run_chunk = partial(_run_chunk, job=job)
+    else:
+        pool = executor_class(max_workers=max_workers, initializer=_start_worker, initargs=job)
+        run_chunk = _run_chunk
+    with pool as executor:
+        chunks = list(executor.map(run_chunk, chunks))
+    results = []
+    for chunk_results, chunk_seconds in chunks:
+        results.extend(chunk_results)
+        if metrics is not None:
+            for result, seconds in zip(chunk_results, chunk_seconds):
+                metrics.record_run(result.steps, seconds, result.error)
+    return results
+
+
+def _start_worker(*job):
+    global _job
+    _job = job
+
+
+def _run_chunk(inboxes, job=None):
+    """Return the results of running each of `inboxes`, and how long each took."""
+    program, jump_table, memory, engine, detect_loops = job or _job
+    computer = Computer(engine=engine, detect_loops=detect_loops)
+    computer.program, computer.jump_table = program, jump_table
+    computer.memory = copy.deepcopy(memory)
+    floor = computer.memory.snapshot()
+    results = []
+    seconds = []
+    for inbox in inboxes:
+        start = time.perf_counter()
+        computer.memory.restore(floor)
+        computer.set_inbox(inbox)
+        try:
+            computer.run()
+            error = None
+        except Exception as e:
+            error = e
+        results.append(BatchResult(computer.outbox, computer.total_steps_executed, error))
+        seconds.append(time.perf_counter() - start)
+    return results, seconds
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
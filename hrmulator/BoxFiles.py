@@ -0,0 +1,232 @@
+"""
+A box file holds any number of inboxes, or outboxes, in one compact binary
+file.  Each value is a 32-bit cell: an integer n is stored as 2n, and a letter
+c as 2·ord(c) + 1, tagged as in Values.py.  The cells of every box are laid
+end to end, and an index at the end of the file says where each box starts:
+
+    MAGIC   cells...   index: (count + 1) offsets, in cells   count   MAGIC
+
+All numbers are little-endian: the cells are signed 32-bit integers, the
+offsets and the count unsigned 64-bit integers.
+
+BoxFileWriter writes a box file, one box at a time; either a whole box at
+once, with `write`, or value by value, by using `outbox()` as a computer's
+outbox.  BoxFile reads one, through `mmap`, so opening even a huge file costs
+next to nothing.  Each of its boxes is a MappedInbox, which a computer takes
+just as it is, decoding values straight out of the file as it moves them.
+
+    >>> import os, tempfile
+    >>> from hrmulator.Computer import Computer
+    >>> directory = tempfile.mkdtemp()
+    >>> inboxes_path = os.path.join(directory, "inboxes.hrmbox")
+    >>> outboxes_path = os.path.join(directory, "outboxes.hrmbox")
+    >>> with BoxFileWriter(inboxes_path) as inboxes:
+    ...     inboxes.write([1, 0, 2])
+    ...     inboxes.write([])
+    ...     inboxes.write([0, 0, 'A'])
+    >>> computer = Computer()
+    >>> computer.load_program(program_text='''
+    ... START:
+    ...     move_from_inbox
+    ...     jump_if_zero_to START
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> with BoxFile(inboxes_path) as inboxes, BoxFileWriter(outboxes_path) as outboxes:
+    ...     for inbox in inboxes:
+    ...         computer.set_inbox(inbox)
+    ...         computer.set_outbox(outboxes.outbox())
+    ...         computer.run()
+    >>> with BoxFile(outboxes_path) as outboxes:
+    ...     [list(outbox) for outbox in outboxes]
+    [[1, 2], [], ['A']]
+
+Integers must fit in 31 bits; anything else that isn't a letter can't be
+stored, and raises ValueError.
+"""
+import mmap
+import struct
+import sys
+from array import array
+
+from . import Values
+from .Streams import Inbox
+from .Values import decode
+
+MAGIC = b"HRMBOX01"
+
+SMALLEST_INT = -(2**30)
+LARGEST_INT = 2**30 - 1
+
+
+def encode(value):
+    """Return the cell that holds `value`."""
+    if type(value) is int and not SMALLEST_INT <= value <= LARGEST_INT:
+        raise ValueError(value, f"{value} is too big for a box file.")
+    return Values.encode(value)
+
+
+class BoxFile:
+    """A box file, opened for reading; a read-only sequence of MappedInboxes."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self.map)
+        if size < 3 * len(MAGIC) or self.map[: len(MAGIC)] != MAGIC or self.map[-len(MAGIC) :] != MAGIC:
+            self.map.close()
+            raise ValueError(path, f"{path} is not a box file.")
+        (self.count,) = struct.unpack_from("<Q", self.map, size - 2 * len(MAGIC))
+        index_start = size - 2 * len(MAGIC) - 8 * (self.count + 1)
+        self.offsets = _view(self.map, index_start, size - 2 * len(MAGIC), "Q")
+        self.cells = _view(self.map, len(MAGIC), index_start, "i")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        index = range(self.count)[index]
+        return MappedInbox(self, index, self.offsets[index], self.offsets[index + 1])
+
+    def __iter__(self):
+        return (self[index] for index in range(self.count))
+
+    def close(self):
+        # every view of the map has to be released before the map can be
+        # closed; that's why MappedInboxes read through `cells`, not a slice of it
+        self.offsets.release()
+        self.cells.release()
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MappedInbox(Inbox):
+    """
+    One box of a BoxFile, as an inbox: the cells from `start` up to `stop`.  It
+    decodes values out of the file only as they are taken; its length is the
+    number of values left.  It can't be used once the BoxFile is closed.
+    """
+
+    def __init__(self, box_file, index, start, stop):
+        self.box_file = box_file
+        self.index = index
+        self.cells = box_file.cells
+        self.next = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.next
+
+    def popleft(self):
+        if self.next >= self.stop:
+            raise IndexError("pop from an empty inbox")
+        cell = self.cells[self.next]
+        self.next += 1
+        return chr(cell >> 1) if cell & 1 else cell >> 1
+
+    def position(self):
+        return self.next
+
+    def copy(self):
+        return MappedInbox(self.box_file, self.index, self.next, self.stop)
+
+    def __iter__(self):
+        """Iterate over the values left, without taking them."""
+        return (decode(self.cells[i]) for i in range(self.next, self.stop))
+
+    def __repr__(self):
+        return f"<box {self.index} of {self.box_file.path}, {len(self)} values left>"
+
+
+class BoxFileWriter:
+    """A box file, opened for writing, one box after another."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.offsets = array("Q", [0])
+        self.box = None  # the cells of the box being written
+
+    def write(self, values):
+        """Write a whole box."""
+        self.outbox().extend(values)
+
+    def outbox(self):
+        """
+        Start a new box, and return an outbox that writes to it.  The box is
+        finished by the next call to `write` or `outbox`, or by `close`.
+        """
+        self._finish_box()
+        self.box = array("i")
+        return BoxOutbox(self.box)
+
+    def _finish_box(self):
+        if self.box is not None:
+            self.file.write(_little_endian(self.box))
+            self.offsets.append(self.offsets[-1] + len(self.box))
+            self.box = None
+
+    def close(self):
+        self._finish_box()
+        self.file.write(_little_endian(self.offsets))
+        self.file.write(struct.pack("<Q", len(self.offsets) - 1))
+        self.file.write(MAGIC)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BoxOutbox:
+    """An outbox that encodes values into a box of a BoxFileWriter."""
+
+    def __init__(self, box):
+        self.box = box
+
+    def append(self, value):
+        self.box.append(encode(value))
+
+    def extend(self, values):
+        self.box.extend(encode(value) for value in values)
+
+    def __len__(self):
+        return len(self.box)
+
+    def __iter__(self):
+        return (decode(cell) for cell in self.box)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def _view(buffer, start, stop, format):
+    """A memoryview of `buffer[start:stop]` as an array of `format`."""
+    view = memoryview(buffer)[start:stop]
+    if sys.byteorder == "little":
+        return view.cast(format)
+    swapped = array(format, view)
+    swapped.byteswap()
+    return memoryview(swapped)
+
+
+def _little_endian(cells):
+    if sys.byteorder == "little":
+        return cells.tobytes()
+    swapped = array(cells.typecode, cells)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,279 @@
+"""
+A compact alternative to a program that's a list of Instruction objects.  A
+BytecodeProgram keeps three parallel arrays, one entry per step: the opcode,
+which is the instruction's position in INSTRUCTION_CATALOG; the operand; and
+whether the operand is indirect.  An operand that is a label, rather than a
+number, is stored as a negative index into a table of labels, and the labels
+themselves are interned, so all the programs that say `START` share one
+string.  (So is a number too big for the 64 bits of an operand; it isn't a
+step, or a tile, anyone will ever reach, but it's still a valid program.)
+
+    >>> from hrmulator.Assembler import Assembler
+    >>> program, jump_table = Assembler().assemble_program_text('''
+    ... START:
+    ...     move_from_inbox
+    ...     copy_to [index]
+    ...     jump_to START''')
+    >>> bytecode = BytecodeProgram(program)
+    >>> list(bytecode.opcodes), list(bytecode.operands), list(bytecode.indirect)
+    ([1, 4, 9], [0, -1, -2], [0, 1, 0])
+    >>> bytecode.labels
+    ('index', 'START')
+
+A BytecodeProgram still behaves like a list of instructions for anyone who
+asks: indexing it, or iterating over it, decodes instructions on the fly.
+That's how it gets printed, debugged, and run by the other engines.
+
+    >>> print(bytecode[1])
+    copy_to [index]
+
+Its real purpose is `run`, a single tight loop over the arrays, that holds
+the machine's state in local variables; see the "bytecode" engine in
+Computer.py.
+"""
+import sys
+from array import array
+
+from .Instructions import (
+    INSTRUCTION_CATALOG,
+    AccumulatorIsEmptyError,
+    Add,
+    BumpDown,
+    BumpUp,
+    CopyFrom,
+    CopyTo,
+    InboxIsEmptyError,
+    IncompatibleTypesError,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    MoveFromInbox,
+    MoveToOutbox,
+    NoSuchJumpDestinationError,
+    Subtract,
+    resolve_destination,
+)
+from .Memory import CantIndirectThroughLetter, CantStoreBadType, MemoryTileIsEmptyError
+from .TypeTools import is_char, is_int_or_char
+
+OPCODES = {class_: opcode for opcode, class_ in enumerate(INSTRUCTION_CATALOG)}
+
+MOVE_FROM_INBOX = OPCODES[MoveFromInbox]
+MOVE_TO_OUTBOX = OPCODES[MoveToOutbox]
+COPY_FROM = OPCODES[CopyFrom]
+COPY_TO = OPCODES[CopyTo]
+ADD = OPCODES[Add]
+SUBTRACT = OPCODES[Subtract]
+BUMP_UP = OPCODES[BumpUp]
+BUMP_DOWN = OPCODES[BumpDown]
+JUMP = OPCODES[Jump]
+JUMP_IF_ZERO = OPCODES[JumpIfZero]
+JUMP_IF_NEGATIVE = OPCODES[JumpIfNegative]
+
+# INSTRUCTION_CATALOG lists the instructions without an argument first, then
+# the tile instructions, then the jumps; `run` relies on that to dispatch with
+# fewer comparisons.
+
+INDIRECT = 0x10
+# `run` folds the indirect flag into the opcode, so it can dispatch once.
+
+MAX_OPERAND = 2**63 - 1
+
+UNLINKED = -1
+# `run`'s opcode for a step whose tile label, or jump destination, is unknown;
+# `execute` raises, if and when it gets to that.
+
+
+class BytecodeProgram:
+    __slots__ = ("opcodes", "operands", "indirect", "labels")
+
+    def __init__(self, program):
+        """Encode `program`, a list of instructions, as bytecode."""
+        self.opcodes = array("i")
+        self.operands = array("q")
+        self.indirect = array("i")
+        labels = {}
+        for instruction in program:
+            self.opcodes.append(OPCODES[type(instruction)])
+            if not instruction.has_argument:
+                operand = 0
+            elif isinstance(instruction, Jump):
+                operand = instruction.destination_pc
+            else:
+                operand = instruction.tile_index
+            if type(operand) is str:
+                operand = -1 - labels.setdefault(sys.intern(operand), len(labels))
+            elif not 0 <= operand <= MAX_OPERAND:
+                operand = -1 - labels.setdefault(operand, len(labels))
+            self.operands.append(operand)
+            self.indirect.append(1 if getattr(instruction, "indirect", False) else 0)
+        self.labels = tuple(labels)
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __getitem__(self, index):
+        if type(index) is slice:
+            return [self._decode(step) for step in range(len(self))[index]]
+        return self._decode(range(len(self))[index])
+
+    def __iter__(self):
+        return (self._decode(step) for step in range(len(self)))
+
+    def _operand(self, step):
+        operand = self.operands[step]
+        return operand if operand >= 0 else self.labels[-1 - operand]
+
+    def _decode(self, step):
+        class_ = INSTRUCTION_CATALOG[self.opcodes[step]]
+        if not class_.has_argument:
+            return class_()
+        if self.indirect[step]:
+            return class_(self._operand(step), indirect=True)
+        return class_(self._operand(step))
+
+    def resolve(self, jump_table, memory):
+        """
+        Return lists of opcodes and operands ready for `run`: destinations
+        and tiles resolved to numbers, indirection folded into the opcode.
+        They're good for as long as the jump table and the memory's labels
+        stay the same.
+        """
+        opcodes = []
+        operands = []
+        for step, opcode in enumerate(self.opcodes):
+            operand = self._operand(step)
+            if opcode >= JUMP:
+                try:
+                    operand = resolve_destination(operand, jump_table, len(self))
+                except NoSuchJumpDestinationError:
+                    opcode = UNLINKED
+            elif opcode >= COPY_FROM:
+                try:
+                    operand = memory._resolve_key(operand)
+                except KeyError:
+                    opcode = UNLINKED
+                else:
+                    if self.indirect[step]:
+                        opcode |= INDIRECT
+            opcodes.append(opcode)
+            operands.append(operand)
+        return opcodes, operands
+
+    def run(self, computer, resolved=None):
+        """
+        Run from `computer.program_counter` until the program ends, or raises.
+        `resolved` is what `resolve` returned for the computer's jump table and
+        memory, if it's been kept from an earlier run.
+
+        Exactly like every other engine, this leaves the computer pointing at
+        the step that raised, if one did, having counted only the steps that
+        completed.
+        """
+        opcodes, operands = resolved or self.resolve(computer.jump_table, computer.memory)
+        tiles = computer.memory.tiles
+        inbox = computer.inbox
+        outbox = computer.outbox
+        accumulator = computer.accumulator
+        step = computer.program_counter
+        end = len(opcodes)
+        count = 0
+        try:
+            while step < end:
+                opcode = opcodes[step]
+                operand = operands[step]
+                if opcode < COPY_FROM:
+                    if opcode == MOVE_FROM_INBOX:
+                        if not inbox:
+                            raise InboxIsEmptyError("The inbox is empty.")
+                        accumulator = inbox.popleft()
+                    elif opcode == MOVE_TO_OUTBOX:
+                        if accumulator is None:
+                            raise AccumulatorIsEmptyError("The accumulator is empty.")
+                        outbox.append(accumulator)
+                        accumulator = None
+                    elif opcode == UNLINKED:
+                        computer.accumulator = accumulator
+                        computer.program_counter = step
+                        computer.program[step].execute(computer)
+                        computer.total_steps_executed -= 1  # counted below, like every other step
+                        step = computer.program_counter
+                        count += 1
+                        continue
+                    step += 1
+                elif JUMP <= opcode < INDIRECT:
+                    if opcode == JUMP:
+                        step = operand
+                    else:
+                        if accumulator is None:
+                            raise AccumulatorIsEmptyError("The accumulator is empty.")
+                        if accumulator == 0 if opcode == JUMP_IF_ZERO else accumulator < 0:
+                            step = operand
+                        else:
+                            step += 1
+                else:
+                    indirect = opcode & INDIRECT
+                    opcode ^= indirect
+                    if opcode == COPY_TO:
+                        if accumulator is None:
+                            raise AccumulatorIsEmptyError("The accumulator is empty.")
+                        if not is_int_or_char(accumulator):
+                            raise CantStoreBadType()
+                        if indirect:
+                            pointer = tiles.get(operand)
+                            if pointer is None:
+                                raise MemoryTileIsEmptyError(operand, f"Tile {operand} is empty.")
+                            if type(pointer) is str:
+                                raise CantIndirectThroughLetter()
+                            operand = pointer
+                        tiles[operand] = accumulator
+                    else:
+                        if accumulator is None and (opcode == ADD or opcode == SUBTRACT):
+                            raise AccumulatorIsEmptyError("The accumulator is empty.")
+                        value = tiles.get(operand)
+                        if value is None:
+                            key = self._operand(step)
+                            raise MemoryTileIsEmptyError(key, f"Tile {key} is empty.")
+                        if indirect:
+                            if type(value) is str:
+                                raise CantIndirectThroughLetter()
+                            operand = value
+                            value = tiles.get(operand)
+                            if value is None:
+                                raise MemoryTileIsEmptyError(operand, f"Tile {operand} is empty.")
+                        if opcode == COPY_FROM:
+                            accumulator = value
+                        elif opcode == ADD:
+                            if type(value) is str or is_char(accumulator):
+                                raise IncompatibleTypesError("You can't add a letter.  What would that even mean?")
+                            accumulator += value
+                        elif opcode == SUBTRACT:
+                            if (type(value) is str) != is_char(accumulator):
+                                raise IncompatibleTypesError(
+                                    "You can't subtract (from) a letter.  What would that even mean?"
+                                )
+                            if type(value) is str:
+                                accumulator = ord(accumulator) - ord(value)
+                            else:
+                                accumulator -= value
+                        elif type(value) is str:
+                            if opcode == BUMP_UP:
+                                raise IncompatibleTypesError("You can't add to a letter.  What would that even mean?")
+                            raise IncompatibleTypesError(
+                                "You can't subtract from a letter.  What would that even mean?"
+                            )
+                        else:
+                            accumulator = value + 1 if opcode == BUMP_UP else value - 1
+                            tiles[operand] = accumulator
+                    step += 1
+                count += 1
+        finally:
+            computer.accumulator = accumulator
+            computer.program_counter = step
+            computer.total_steps_executed += count
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
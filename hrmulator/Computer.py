@@ -2,18 +2,158 @@
 A very simple computer that executes programs assembled from instances of the
 instructions implemented in Instructions.py.  Running such programs is easy,
 the trouble we go to is in printing everything (and using a little color).
+
+There is more than one way to run a program, chosen by `engine`:
+
+    "interpreter"   calls `execute` on each instruction in turn; this is the
+                    reference the other engines must agree with
+    "linked"        (the default) links the program first, see Linker.py, so
+                    that no step looks up a label while running, and runs
+                    counting loops in one go, see CountingLoops.py
+    "transpiled"    turns the whole program into one Python function, see
+                    Transpiler.py, that keeps the machine's state in locals
+    "bytecode"      encodes the program as a BytecodeProgram, see Bytecode.py,
+                    unless it already is one, and runs its dispatch loop
+    "jit"           runs like "linked", but compiles hot loops as they're
+                    found, see JIT.py
+
+With `fuse=True`, the "interpreter" and "linked" engines run a copy of the
+program in which common runs of instructions are fused into superinstructions,
+see Fusion.py.  The "transpiled" and "jit" engines get nothing from fusing, and
+ignore it.  Either way, `program` itself, which is what gets printed, is unchanged.
+
+With `detect_loops=True`, the "interpreter" and "linked" engines raise
+InfiniteLoopError as soon as the computer comes back round to a state it has
+been in before, instead of running forever; see LoopDetection.py.
+
+With `profile=True`, the "interpreter" and "linked" engines count every step
+they execute, in `profiler`, and `print_profile` shows where the time went;
+see Profiling.py.  Profiling runs the program unfused, without counting loops,
+so that every step is counted by itself.
+
+`add_observer` has the "interpreter" and "linked" engines tell an Observer
+about every step, every value in and out, every tile read or written, and
+every error, as they happen; see Observers.py.  Observing, like profiling,
+runs the program unfused, without counting loops.  A computer with no
+observers does nothing extra at all.
+
+`load_program` only assembles a program it hasn't seen before: its
+`assembly_cache`, `default_cache` unless it's given another, keeps the
+programs it has assembled, by their source; see AssemblyCache.py.
+
+With `metrics`, an ExecutorMetrics, a computer counts its runs, its steps,
+and its errors, and times its runs and its assembly, for a service to export;
+see Metrics.py.
+
+Computers can run at the same time, in separate threads, on any engine, as
+long as each has its own Memory and its own inbox.  They may share a program
+and its jump table, in either form, because running a program only ever
+reads them; everything that changes while running, including the linked,
+compiled, or traced steps, belongs to one computer.  Nothing at module level
+changes while running, except the Transpiler's cache of compiled code, which
+is safe to share; and so is the default AssemblyCache, which only changes when
+a program is loaded.  That holds on free-threaded builds of CPython, too, and in
+subinterpreters, where importing hrmulator has no side effects.  A Debugger,
+which talks to the terminal, is another matter.
+
+A program is linked once, not on every run: the linked steps are kept, and
+used again, for as long as the computer has the same program, and the same
+Memory, with the same labels and the same tiles.  Loading a program, giving
+the computer another memory, or re-labelling a tile, has it link again.
+(Steps watched for loops, profiled, or observed belong to one run, though.)
+Likewise, a program is transpiled once, for as long as it's the same program
+with the same labels; and the JIT keeps what it learned, how hot each loop
+is, and the traces it compiled, from one run to the next.
+
+Computers can also take turns, in one thread.  The "interpreter" and
+"linked" engines can run a program a slice at a time: `start` gets it ready,
+and each call to `resume` runs it for a few more steps, from wherever it left
+off.  Scheduler.py shares one thread out among many computers that way, and
+`run_async` shares an asyncio event loop, waiting for the inbox to fill up
+instead of stopping when it's empty; see Async.py.
+
+In between slices, `snapshot` takes a Snapshot of everything about a running
+computer: where it's got to, its accumulator, its inbox, its outbox, and its
+Memory.  Later on, `restore` puts it all back, on the same computer or on
+another running the same program, and `resume` carries on from there.  A
+snapshot is cheap: the tiles aren't copied, the first snapshot has the memory
+keep a journal of them instead, see JournaledTiles in Memory.py, so a
+snapshot is a mark in the journal, and a restore on the same computer winds
+back just the tiles that have changed since (a DenseMemory's list of tiles is
+copied, though); the labels are shared, since Memory copies them before
+changing them; and the outbox isn't copied at all, only its length is kept, since a computer only ever adds
+to it; a restored computer gets a new one, a copy of as much of it as there
+was.  The inbox isn't copied either: a list inbox becomes a ListInbox, see
+Streams.py, and a snapshot of it is just where it had got to, in a list it
+shares.  A BoxFile's inbox is shared the same way, but a stream can't be,
+and an outbox that isn't a list can't be snapshot at all.  So exploring every
+way a program could go, or trying something and backing out, costs far less
+than deep-copying whole computers.
 """
-from collections import defaultdict, deque
+from collections import defaultdict, deque, namedtuple
+from collections.abc import AsyncIterator, Iterator
 
 import colorama
 
-from .Assembler import Assembler
-from .Instructions import InboxIsEmptyError
-from .Memory import Memory
+from .AssemblyCache import default_cache
+from .Bytecode import BytecodeProgram
+from .CountingLoops import link_counting_loops
+from .Fusion import fuse
+from .Instructions import InboxIsEmptyError, OutboxIsClosedError
+from .JIT import TracingJIT
+from .Linker import Linker
+from .LoopDetection import HashedTiles, LoopDetector
+from .Memory import DenseMemory, Memory, ProfiledMemory
+from .Observers import Hooks
+from .Profiling import Profiler
+from .Streams import Inbox, ListInbox, StreamingInbox
+from .Transpiler import Transpiler
+
+ENGINES = {
+    # engine name: the method that implements it
+    "interpreter": "_run_interpreted",
+    "linked": "_run_linked",
+    "transpiled": "_run_transpiled",
+    "bytecode": "_run_bytecode",
+    "jit": "_run_jit",
+}
+
+LOOP_DETECTING_ENGINES = ("interpreter", "linked")
+
+PROFILING_ENGINES = ("interpreter", "linked")
+
+OBSERVING_ENGINES = ("interpreter", "linked")
+
+SLICED_ENGINES = {
+    # engine name: the method that makes a function to run a slice of it
+    "interpreter": "_interpreted_slices",
+    "linked": "_linked_slices",
+}
+
+Snapshot = namedtuple("Snapshot", "program_counter accumulator total_steps_executed inbox outbox outbox_length memory")
+
+# Why `resume` stopped
+FINISHED = "finished"  # the program is over
+PAUSED = "paused"  # it ran for as many steps as it was asked to
+WAITING = "waiting"  # the inbox is empty; it can go on if more values turn up
 
 
 class Computer:
-    def __init__(self):
+    def __init__(
+        self, engine="linked", fuse=False, detect_loops=False, profile=False, metrics=None, assembly_cache=None
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f'Unknown engine "{engine}", expected one of {tuple(ENGINES)}')
+        if detect_loops and engine not in LOOP_DETECTING_ENGINES:
+            raise ValueError(f'The "{engine}" engine can\'t detect loops, only {LOOP_DETECTING_ENGINES} can')
+        if profile and engine not in PROFILING_ENGINES:
+            raise ValueError(f'The "{engine}" engine can\'t profile, only {PROFILING_ENGINES} can')
+        self.engine = engine
+        self.fuse = fuse
+        self.detect_loops = detect_loops
+        self.profile = profile
+        self.metrics = metrics
+        self.assembly_cache = assembly_cache if assembly_cache is not None else default_cache
         self.program_counter = None
         self.total_steps_executed = None
         self.accumulator = None
@@ -23,18 +163,67 @@ class Computer:
         self.jump_table = None
         self.inbox = None
         self.outbox = None
+        self.outbox_sink = None
+        self._run_slice = None
+        self._reusable = {}  # what `_reuse` keeps between runs
+        self.loop_detector = None
+        self.profiler = None
+        self.observers = []
+
+    def add_observer(self, observer):
+        """
+        From the next run, or `start`, on, tell `observer`, an Observer, what
+        happens as the program runs; see Observers.py.
+        """
+        if self.engine not in OBSERVING_ENGINES:
+            raise ValueError(f'The "{self.engine}" engine can\'t be observed, only {OBSERVING_ENGINES} can')
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
 
     def set_inbox(self, inbox):
-        self.inbox = deque(inbox)
+        """
+        An iterator, or a generator, is read from lazily, as the program asks
+        for values; see Streams.py.  An async iterator is waited on by
+        `run_async`; see Async.py.  An Inbox is used just as it is.  Anything
+        else is copied, once, up front.
+        """
+        if isinstance(inbox, Inbox):
+            self.inbox = inbox
+        elif isinstance(inbox, AsyncIterator):
+            from .Async import AsyncInbox  # only import asyncio when it's wanted
 
-    def load_program(self, *, program_path=None, program_text=None):
-        asm = Assembler()
+            self.inbox = AsyncInbox(inbox)
+        elif isinstance(inbox, Iterator):
+            self.inbox = StreamingInbox(inbox)
+        else:
+            self.inbox = deque(inbox)
+
+    def set_outbox(self, outbox):
+        """
+        Have every run move its values to `outbox`, rather than to a new list;
+        see Streams.py.  `None` goes back to the list.
+        """
+        self.outbox_sink = outbox
+
+    def load_program(self, *, program_path=None, program_text=None, bytecode=False):
+        """
+        Assemble a program, or find it in the computer's AssemblyCache.  With
+        `bytecode=True`, keep it as a compact BytecodeProgram instead of a list
+        of instructions; either form runs on any engine.
+        """
         if program_text is not None:
-            self.program, self.jump_table = asm.assemble_program_text(program_text)
+            self.program, self.jump_table = self.assembly_cache.assemble(
+                program_text=program_text, bytecode=bytecode, metrics=self.metrics
+            )
             self.program_path = "inline"
         elif program_path is not None:
-            self.program, self.jump_table = asm.assemble_program_file(program_path)
+            self.program, self.jump_table = self.assembly_cache.assemble(
+                program_path=program_path, bytecode=bytecode, metrics=self.metrics
+            )
             self.program_path = program_path
+        self._reusable.clear()
 
     def _print_line(self, step_number, instruction):
         """
@@ -60,7 +249,15 @@ class Computer:
     def _print_label(self, step_number, label):
         print(f"{colorama.Fore.GREEN}{label}{colorama.Style.RESET_ALL}:")
 
-    def print_program(self, slice_to_print=None):
+    def print_program(self, slice_to_print=None, *, print_line=None, print_label=None):
+        """
+        Print the program listing; or else just `slice_to_print` of it.  Each
+        line is printed by `print_line`, and each label by `print_label`, which
+        default to `_print_line` and `_print_label`.
+        """
+        print_line = print_line or self._print_line
+        print_label = print_label or self._print_label
+
         # invert the jump table, so I can see where to print the labels
         labels = defaultdict(list)
         for label in self.jump_table:
@@ -82,21 +279,296 @@ class Computer:
             # print any labels that lead to this step;
             if i in labels:
                 for label in labels[i]:
-                    self._print_label(i, label)
-            self._print_line(i, instruction)
+                    print_label(i, label)
+            print_line(i, instruction)
+
+    def print_profile(self):
+        """
+        Print the program listing, with how many times each step was executed,
+        and how much of the total that was, on every line, and how much was
+        spent after every label; see Profiling.py.
+        """
+        profiler = self.profiler
+        self.print_program(print_line=profiler.print_line, print_label=profiler.print_label)
+        print()
+        profiler.print_summary()
 
     def run(self):
+        if self.metrics is not None:
+            self.metrics.run(self, self._run)
+        else:
+            self._run()
+
+    def _run(self):
+        self._start_run()
+        getattr(self, ENGINES[self.engine])()
+        self.program_counter = None
+
+    async def run_async(self, steps_per_slice=10000):
+        """
+        Run the program `steps_per_slice` steps at a time, letting the event
+        loop run in between, and waiting for more values whenever the inbox is
+        an AsyncInbox that's empty; see Async.py.
+        """
+        from .Async import run_async
+
+        await run_async(self, steps_per_slice)
+
+    def start(self):
+        """
+        Get ready to run the program, a slice at a time, with `resume`.
+        """
+        if self.engine not in SLICED_ENGINES:
+            raise ValueError(f'The "{self.engine}" engine can\'t run in slices, only {tuple(SLICED_ENGINES)} can')
+        self._start_run()
+        self._count_the_inbox()  # ready to be snapshot, or refilled
+        self._run_slice = getattr(self, SLICED_ENGINES[self.engine])()
+
+    def resume(self, steps):
+        """
+        Go on running the program from wherever it left off, for at most `steps`
+        more steps, and return why it stopped: FINISHED, PAUSED, or WAITING.
+        A superinstruction, or a counting loop run in one go, takes one step
+        of the `steps`, but counts them all in `total_steps_executed`.
+
+        When the inbox is empty, the program counter is left at the
+        `move_from_inbox`; if more values are put in the inbox, `resume` picks
+        up from there.  Once the program is FINISHED, the program counter is
+        None, just as after `run`.
+        """
+        why = self._run_slice(steps)
+        if why is FINISHED:
+            self.program_counter = None
+        return why
+
+    def snapshot(self):
+        """Return a Snapshot of this computer, as it is right now, for `restore`."""
+        self._count_the_inbox()
+        self._journal_the_tiles()
+        inbox = self.inbox
+        if inbox is not None:
+            inbox = inbox.copy()
+        outbox = self.outbox
+        if outbox is not None and type(outbox) is not list:
+            raise ValueError(f"Only a list outbox can be snapshot, not {outbox!r}")
+        return Snapshot(
+            self.program_counter,
+            self.accumulator,
+            self.total_steps_executed,
+            inbox,
+            outbox,
+            len(outbox or ()),
+            self.memory.snapshot(),
+        )
+
+    def restore(self, snapshot):
+        """
+        Put this computer back just as it was when `snapshot` was taken, of it
+        or of another computer running the same program.  The snapshot can be
+        restored again, any number of times.
+        """
+        self.program_counter = snapshot.program_counter
+        self.accumulator = snapshot.accumulator
+        self.total_steps_executed = snapshot.total_steps_executed
+        if snapshot.inbox is not None:
+            self.inbox = snapshot.inbox.copy()
+        if snapshot.outbox is not None:
+            # a new list: the old one may belong to other snapshots, too
+            self.outbox = snapshot.outbox[: snapshot.outbox_length]
+        self.memory.restore(snapshot.memory)
+        if self.loop_detector is not None:
+            # states seen on the way from the snapshot to here weren't seen on the way to it
+            self.loop_detector.forget()
+
+    def _start_run(self):
+        if isinstance(self.memory, ProfiledMemory) and self.engine not in PROFILING_ENGINES:
+            raise ValueError(f'The "{self.engine}" engine can\'t count tile accesses, only {PROFILING_ENGINES} can')
+        if self.detect_loops and isinstance(self.memory, DenseMemory):
+            raise ValueError("Loops can't be detected on the tiles of a DenseMemory, only on those of a Memory")
         self.program_counter = 0
         self.total_steps_executed = 0
         if self.inbox is None:
             self.inbox = deque([])
-        self.outbox = []
+        self.outbox = [] if self.outbox_sink is None else self.outbox_sink
+        if self.detect_loops:
+            self.memory.tiles = HashedTiles(self.memory.tiles)
+            self._count_the_inbox()
+
+    def _count_the_inbox(self):
+        """
+        Make a deque inbox a ListInbox: so that the LoopDetector can tell how
+        far along it is, even as values are appended to it; and so that a
+        snapshot can share it, rather than copy it.
+        """
+        if type(self.inbox) is deque:
+            self.inbox = ListInbox(self.inbox)
+
+    def _journal_the_tiles(self):
+        """
+        Have the memory keep a journal of its tiles, so that snapshots of them
+        are only marks, not copies; see `Memory.journal`.
+        """
+        tiles = self.memory.tiles
+        self.memory.journal()
+        if self.memory.tiles is not tiles and self._run_slice is not None:
+            # the steps of the run so far were linked against the old tiles
+            self._run_slice = getattr(self, SLICED_ENGINES[self.engine])()
+
+    def _every_step_counts(self):
+        """Whether each step must run by itself: unfused, and not in a counting loop run in one go."""
+        return self.profile or bool(self.observers) or isinstance(self.memory, ProfiledMemory)
+
+    def _program_to_run(self):
+        program = fuse(self.program) if self.fuse and not self._every_step_counts() else self.program
+        if self.detect_loops:
+            self.loop_detector = LoopDetector()
+            program = self.loop_detector.watch(program, self.jump_table)
+        if self.profile:
+            if self.profiler is None or self.profiler.program is not self.program:
+                self.profiler = Profiler(self.program, self.jump_table)
+            program = self.profiler.watch(program)
+        if self.observers:
+            program = Hooks(self.observers).watch(program, self.program)
+        return program
+
+    def _reuse(self, kind, key, make):
+        """
+        Return what `make()` returns; or, if every object in `key` is the very
+        one it was the last time `kind` was made, what it returned then.
+        """
+        if kind in self._reusable:
+            old_key, made = self._reusable[kind]
+            if len(old_key) == len(key) and all(old is new for old, new in zip(old_key, key)):
+                return made
+        made = make()
+        self._reusable[kind] = (key, made)
+        return made
+
+    def _linked_steps(self):
+        if self.detect_loops or self._every_step_counts():
+            # watched steps belong to this run
+            return Linker(self._program_to_run(), self.jump_table, self.memory).link()
+        memory = self.memory
+        # linked steps are bound to the labels, and the tiles, they were linked against
+        key = (self.program, self.jump_table, memory, memory.label_map, memory.tiles, self.fuse)
+        return self._reuse("linked", key, self._link)
+
+    def _link(self):
+        steps = Linker(self._program_to_run(), self.jump_table, self.memory).link()
+        link_counting_loops(steps, self.program, self.jump_table, self.memory)
+        return steps
+
+    def _interpreted_slices(self):
+        program = self._program_to_run()
+
+        def run_slice(steps):
+            try:
+                for _ in range(steps):
+                    if self.program_counter >= len(program):
+                        return FINISHED
+                    program[self.program_counter].execute(self)
+            except InboxIsEmptyError:
+                return WAITING
+            except OutboxIsClosedError:
+                return FINISHED
+            return FINISHED if self.program_counter >= len(program) else PAUSED
+
+        return run_slice
+
+    def _linked_slices(self):
+        steps = self._linked_steps()
+        end = len(steps)
+        uncounted = not self.observers  # observed steps count themselves, before their hooks
+
+        def run_slice(steps_per_slice):
+            # as in _run_linked, but with a limit on the count
+            step = self.program_counter
+            count = 0
+            try:
+                while step < end:
+                    if count == steps_per_slice:
+                        return PAUSED
+                    step = steps[step](self)
+                    count += 1
+            except InboxIsEmptyError:
+                return WAITING
+            except OutboxIsClosedError:
+                pass
+            finally:
+                self.program_counter = step
+                if uncounted:
+                    self.total_steps_executed += count
+            return FINISHED
+
+        return run_slice
+
+    def _run_interpreted(self):
+        program = self._program_to_run()
         try:
-            while self.program_counter < len(self.program):
-                self.program[self.program_counter].execute(self)
-        except InboxIsEmptyError:
+            while self.program_counter < len(program):
+                program[self.program_counter].execute(self)
+        except (InboxIsEmptyError, OutboxIsClosedError):
             pass
-        self.program_counter = None
+
+    def _run_linked(self):
+        steps = self._linked_steps()
+        end = len(steps)
+        step = self.program_counter
+        count = 0
+        uncounted = not self.observers  # observed steps count themselves, before their hooks
+        # Keep the program counter and the step count in locals while
+        # running, and only write them back on the way out, however we leave.
+        try:
+            while step < end:
+                step = steps[step](self)
+                count += 1
+        except (InboxIsEmptyError, OutboxIsClosedError):
+            pass
+        finally:
+            self.program_counter = step
+            if uncounted:
+                self.total_steps_executed += count
+
+    def _run_bytecode(self):
+        # the resolved program is bound to the labels of the memory
+        key = (self.program, self.jump_table, self.memory.label_map)
+        program, resolved = self._reuse("bytecode", key, self._resolve_bytecode)
+        try:
+            program.run(self, resolved)
+        except (InboxIsEmptyError, OutboxIsClosedError):
+            pass
+
+    def _resolve_bytecode(self):
+        program = self.program
+        if not isinstance(program, BytecodeProgram):
+            program = BytecodeProgram(program)
+        return program, program.resolve(self.jump_table, self.memory)
+
+    def _run_jit(self):
+        try:
+            self._jit().run(self)
+        except (InboxIsEmptyError, OutboxIsClosedError):
+            pass
+
+    def _jit(self):
+        """The JIT, with the heat and the traces of earlier runs of the same program, on the same tiles."""
+        memory = self.memory
+        key = (self.program, self.jump_table, memory, memory.label_map, memory.tiles)
+        return self._reuse("jit", key, lambda: TracingJIT(self.program, self.jump_table, memory))
+
+    def _run_transpiled(self):
+        if self.program_counter:
+            run = self._transpile()  # for this entry, just this once
+        else:
+            # the function reads the tiles as it runs, but it's bound to the labels
+            run = self._reuse("transpiled", (self.program, self.jump_table, self.memory.label_map), self._transpile)
+        try:
+            run(self)
+        except (InboxIsEmptyError, OutboxIsClosedError):
+            pass
+
+    def _transpile(self):
+        return Transpiler(self.program, self.jump_table, self.memory, entry=self.program_counter).compile()
 
     def print_run_program(self, *, program_path=None, program_text=None, inbox=None, memory=None):
         if program_path is not None or program_text is not None:
@@ -111,9 +583,10 @@ class Computer:
         self.print_program()
         print()
 
-        printable_inbox = list(self.inbox or [])
+        printable_inbox = self.inbox if isinstance(self.inbox, Inbox) else list(self.inbox or [])
         # copy our inbox, a deque, into a list; because
         # the deque will be consumed before we are ready to print
+        # (an Inbox might never end, so it prints as itself)
 
         self.run()
 
@@ -0,0 +1,210 @@
+"""
+An awful lot of HRM programs count a tile down to zero, or up to zero, one
+step at a time:
+
+    COUNT_DOWN:
+        bump_down counter
+        jump_if_zero_to DONE
+        move_to_outbox
+        jump_to COUNT_DOWN
+
+Give that loop a counter of 1000 and it takes 3998 steps, every one of which
+we can predict from the counter alone.  So, when the linked engine reaches the
+head of such a loop, it doesn't go round it at all: it works out how many
+times the loop would go round, and jumps straight to the loop's exit with
+memory, the accumulator, the outbox, and the step count exactly as they'd
+have been.
+
+    >>> from hrmulator.Assembler import Assembler
+    >>> from hrmulator.Memory import Memory
+    >>> program, jump_table = Assembler().assemble_program_text('''
+    ... COUNT_DOWN:
+    ...     bump_down counter
+    ...     jump_if_zero_to DONE
+    ...     move_to_outbox
+    ...     jump_to COUNT_DOWN
+    ... DONE:
+    ...     move_to_outbox''')
+    >>> [str(loop) for loop in find_counting_loops(program, jump_table, Memory(labels={'counter': 0}))]
+    ['counting loop at step 0, bump_down 0 until zero, 1 outputs per trip, exit to step 4']
+
+A counting loop starts with `bump_up` or `bump_down` on a tile, immediately
+tests the result with `jump_if_zero_to` or `jump_if_negative_to`, and ends
+with a `jump_to` back to its start.  In between, it may only do things whose
+effect is known once the counter is: `move_to_outbox` (of the counter),
+`copy_from` the counter, `copy_to` any tile, and `no_op`.
+
+When the counter isn't a number, or the loop outputs to an Outbox that might
+close part way round (see Streams.py), or the loop would never end (counting down
+from zero until zero, say), the head of the loop simply executes as it always
+does, and whatever would happen, happens.
+"""
+from .Instructions import (
+    BumpDown,
+    BumpUp,
+    CopyFrom,
+    CopyTo,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    MoveToOutbox,
+    NoOp,
+    NoSuchJumpDestinationError,
+    resolve_destination,
+)
+from .Streams import Outbox
+
+
+class CountingLoop:
+    def __init__(self, head, tile, delta, exit_test, exit_step, outputs, stores, trip_length):
+        self.head = head
+        self.tile = tile
+        self.delta = delta  # +1 for bump_up, -1 for bump_down
+        self.exit_test = exit_test  # JumpIfZero or JumpIfNegative
+        self.exit_step = exit_step
+        self.outputs = outputs  # how many times each trip outputs the counter
+        self.stores = stores  # the tiles each trip copies the counter to
+        self.trip_length = trip_length  # in steps, for every trip but the last
+
+    def __str__(self):
+        bump = "bump_up" if self.delta > 0 else "bump_down"
+        until = "zero" if self.exit_test is JumpIfZero else "negative"
+        return (
+            f"counting loop at step {self.head}, {bump} {self.tile} until {until}, "
+            f"{self.outputs} outputs per trip, exit to step {self.exit_step}"
+        )
+
+    def trips(self, value):
+        """
+        How many times the loop bumps a counter that starts at `value`, or None
+        if it never stops.
+        """
+        if self.exit_test is JumpIfZero:
+            trips = -value * self.delta
+            return trips if trips >= 1 else None
+        if self.delta < 0:
+            return max(value + 1, 1)
+        return 1 if value + 1 < 0 else None
+
+    def link(self, fallback):
+        """
+        Return a linked step for the loop's head.  It runs the whole loop at
+        once, when it can, and otherwise calls `fallback`, the head's ordinary
+        linked step.
+        """
+        tile = self.tile
+        delta = self.delta
+        outputs = self.outputs
+        stores = self.stores
+        trip_length = self.trip_length
+        exit_step = self.exit_step
+        trips_for = self.trips
+
+        def counting_loop(computer):
+            tiles = computer.memory.tiles
+            value = tiles.get(tile)
+            if type(value) is int and not (outputs and isinstance(computer.outbox, Outbox)):
+                # (an Outbox may close part way round; let the loop go round
+                # step by step, so it stops in exactly the right place)
+                trips = trips_for(value)
+                if trips is not None:
+                    last = value + delta * trips
+                    if trips > 1:
+                        # every trip but the last goes all the way round
+                        counted = range(value + delta, last, delta)
+                        if outputs == 1:
+                            computer.outbox.extend(counted)
+                        elif outputs:
+                            computer.outbox.extend(n for n in counted for _ in range(outputs))
+                        for store in stores:
+                            tiles[store] = last - delta
+                    tiles[tile] = last
+                    computer.accumulator = last
+                    # the last trip is just the bump and the test; the caller
+                    # counts one step itself
+                    computer.total_steps_executed += (trips - 1) * trip_length + 1
+                    return exit_step
+            return fallback(computer)
+
+        return counting_loop
+
+
+def find_counting_loops(program, jump_table, memory):
+    """Return a CountingLoop for every counting loop in `program`."""
+    loops = []
+    for head in range(len(program)):
+        loop = _match(program, head, jump_table, memory)
+        if loop is not None:
+            loops.append(loop)
+    return loops
+
+
+def link_counting_loops(steps, program, jump_table, memory):
+    """
+    Replace, in the linked `steps` of `program`, the head of every counting
+    loop with a step that runs the whole loop in one go.
+    """
+    for loop in find_counting_loops(program, jump_table, memory):
+        steps[loop.head] = loop.link(steps[loop.head])
+    return steps
+
+
+def _match(program, head, jump_table, memory):
+    """Return the CountingLoop that starts at `head`, if there is one."""
+    bump = program[head]
+    if type(bump) not in (BumpUp, BumpDown) or bump.indirect or head + 1 >= len(program):
+        return None
+    test = program[head + 1]
+    if type(test) not in (JumpIfZero, JumpIfNegative):
+        return None
+    try:
+        tile = memory._resolve_key(bump.tile_index)
+    except KeyError:
+        return None
+    try:
+        exit_step = resolve_destination(test.destination_pc, jump_table, len(program))
+    except NoSuchJumpDestinationError:
+        return None  # the test raises, if and when it jumps
+
+    outputs = 0
+    stores = []
+    counter_in_accumulator = True
+    for step in range(head + 2, len(program)):
+        instruction = program[step]
+        kind = type(instruction)
+        if kind is Jump:
+            try:
+                if resolve_destination(instruction.destination_pc, jump_table, len(program)) != head:
+                    return None
+            except NoSuchJumpDestinationError:
+                return None
+            delta = 1 if type(bump) is BumpUp else -1
+            return CountingLoop(head, tile, delta, type(test), exit_step, outputs, stores, step - head + 1)
+        elif kind is NoOp:
+            pass
+        elif kind is MoveToOutbox and counter_in_accumulator:
+            outputs += 1
+            counter_in_accumulator = False
+        elif kind is CopyFrom and not instruction.indirect and _resolves_to(memory, instruction.tile_index, tile):
+            counter_in_accumulator = True
+        elif kind is CopyTo and not instruction.indirect and counter_in_accumulator:
+            try:
+                stores.append(memory._resolve_key(instruction.tile_index))
+            except KeyError:
+                return None
+        else:
+            return None
+    return None
+
+
+def _resolves_to(memory, key, tile):
+    try:
+        return memory._resolve_key(key) == tile
+    except KeyError:
+        return False
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -1,15 +1,24 @@
 import os
 import re
-import readline
 from collections import deque
 
 import colorama
 
 from .Computer import Computer
-from .Instructions import InboxIsEmptyError, Jump
+from .Instructions import InboxIsEmptyError, Jump, OutboxIsClosedError
 from .TypeTools import is_char
 
 
+def _readline():
+    """
+    Return the readline module.  It's imported here, when the debugger first
+    wants it, rather than at the top: it can't be imported in a subinterpreter.
+    """
+    import readline
+
+    return readline
+
+
 class Debugger(Computer):
 
     command_with_argument_re = re.compile(r"^[a-z]\s*(\w+)$")
@@ -25,7 +34,7 @@ class Debugger(Computer):
         home = os.path.expanduser("~")
         self.history_file = os.path.join(home, ".hrmulatorhistory")
         try:
-            readline.read_history_file(self.history_file)
+            _readline().read_history_file(self.history_file)
         except FileNotFoundError:
             pass
 
@@ -222,14 +231,14 @@ Commands:
                     self.temporary_breakpoints = set()
                     escape = self._menu()
                 self.program[self.program_counter].execute(self)
-        except InboxIsEmptyError:
+        except (InboxIsEmptyError, OutboxIsClosedError):
             pass
         if not escape:
             print()
             print("Program ran to completion.  Post-mortem:")
             self._menu()
         self.program_counter = None
-        readline.write_history_file(self.history_file)
+        _readline().write_history_file(self.history_file)
 
     def print_run_program(self, *, program_path=None, program_text=None, inbox=None, memory=None):
         self.program_counter = 0
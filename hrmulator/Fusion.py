@@ -0,0 +1,116 @@
+"""
+Some runs of instructions turn up in nearly every HRM program: `copy_from X`,
+`add Y`, `copy_to Z`; `bump_down X`, `jump_if_zero_to L`; `move_from_inbox`,
+`move_to_outbox`.  Fusing such a run into a single Superinstruction means the
+computer dispatches once for the whole run instead of once per step.
+
+    >>> from hrmulator.Assembler import Assembler
+    >>> program, jump_table = Assembler().assemble_program_text('''
+    ... START:
+    ...     move_from_inbox
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> fused = fuse(program)
+    >>> print(fused[0])
+    move_from_inbox; move_to_outbox
+    >>> fused[1] is program[1]
+    True
+
+The fused program is the same length as the original, and only the first step
+of each run is replaced; so jumps, even jumps into the middle of a run, still
+land where they should.  The original program is left alone: it's what gets
+printed, and what the Debugger steps through.  Fusion is purely a matter of
+execution speed.
+
+A Superinstruction counts one step for each instruction it's made of, and
+raises exactly what the original instructions would have raised, at the step
+where they would have raised it.  When it's linked, its parts are compiled
+together into a single function by the Transpiler.  That works because every
+instruction either raises before it changes anything, or doesn't raise at all;
+so when a part of a superinstruction raises, the superinstruction just returns
+the step number of that part, and lets the computer execute it (and fail)
+again, all by itself.
+"""
+from .Instructions import (
+    AbstractInstruction,
+    Add,
+    BumpDown,
+    BumpUp,
+    CopyFrom,
+    CopyTo,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    MoveFromInbox,
+    MoveToOutbox,
+    Subtract,
+)
+from .Transpiler import Transpiler
+
+# Runs of instructions worth fusing, longest first.  Only the last
+# instruction of a run may be a jump.
+FUSIONS = [
+    (CopyFrom, Add, CopyTo),
+    (CopyFrom, Subtract, CopyTo),
+    (MoveFromInbox, MoveToOutbox),
+    (MoveFromInbox, CopyTo),
+    (CopyFrom, MoveToOutbox),
+    (CopyFrom, Add),
+    (CopyFrom, Subtract),
+    (Add, CopyTo),
+    (Subtract, CopyTo),
+    (BumpUp, JumpIfZero),
+    (BumpDown, JumpIfZero),
+    (BumpUp, JumpIfNegative),
+    (BumpDown, JumpIfNegative),
+    (CopyFrom, JumpIfZero),
+    (CopyFrom, JumpIfNegative),
+    (Subtract, JumpIfZero),
+    (Subtract, JumpIfNegative),
+    (MoveToOutbox, Jump),
+]
+
+
+class Superinstruction(AbstractInstruction):
+    """Two or more instructions, executed with a single dispatch."""
+
+    symbol = "superinstruction"
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __str__(self):
+        return "; ".join(str(part) for part in self.parts)
+
+    def colored_str(self):
+        return "; ".join(part.colored_str() for part in self.parts)
+
+    def execute(self, computer):
+        for part in self.parts:
+            part.execute(computer)
+
+    def link(self, step, linker):
+        transpiler = Transpiler(linker.program, linker.jump_table, linker.memory)
+        return transpiler.compile_fragment(step, self.parts)
+
+
+def fuse(program):
+    """Return a copy of `program` with every run in FUSIONS fused."""
+    fused = list(program)
+    step = 0
+    while step < len(program):
+        for fusion in FUSIONS:
+            parts = program[step : step + len(fusion)]
+            if len(parts) == len(fusion) and all(type(part) is class_ for part, class_ in zip(parts, fusion)):
+                fused[step] = Superinstruction(parts)
+                step += len(fusion)
+                break
+        else:
+            step += 1
+    return fused
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
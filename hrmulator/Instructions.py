@@ -23,6 +23,12 @@ symbol lookup needed in the assembler.  The `execute` function does the main
 work.  `__init__` and `has_argument` cooperate to collect the argument in the
 assembler.  The `__str__` function does the job of building a printable and
 machine readable instruction out of `symbol`.
+
+`link` is `execute`'s faster twin.  Given the instruction's own step number and
+a Linker (see Linker.py), it resolves tile labels and jump destinations once,
+and returns a function that takes the computer, does the work, and returns the
+next step number.  It leaves `program_counter` and `total_steps_executed` to
+whoever is calling it.
 """
 import colorama
 import termcolor
@@ -38,6 +44,10 @@ class InboxIsEmptyError(InstructionError):
     pass
 
 
+class OutboxIsClosedError(InstructionError):
+    pass
+
+
 class AccumulatorIsEmptyError(InstructionError):
     pass
 
@@ -50,6 +60,21 @@ class NoSuchJumpDestinationError(InstructionError):
     pass
 
 
+def resolve_destination(destination, jump_table, program_length):
+    """
+    Turn the argument of a jump, a label or a raw step number, into a step
+    number that is actually inside the program.
+    """
+    result = destination
+    if result in jump_table:
+        result = jump_table[result]
+    if type(result) is not int:
+        raise NoSuchJumpDestinationError(result, f'The label "{result}" does not appear in the program.')
+    elif not 0 <= result < program_length:
+        raise NoSuchJumpDestinationError(result, f"Step number {result} is outside the range of the program.")
+    return result
+
+
 class AbstractInstruction:
     """Base class for all instructions."""
 
@@ -61,6 +86,23 @@ class AbstractInstruction:
     def colored_str(self):
         return self.__str__()
 
+    def link(self, step, linker):
+        """
+        Return a function that executes this instruction, as the step numbered
+        `step`, and returns the next step number.
+
+        This default works for any instruction at all, because it simply calls
+        `execute`.  Concrete instructions override it with something faster.
+        """
+
+        def linked(computer):
+            computer.program_counter = step
+            self.execute(computer)
+            computer.total_steps_executed -= 1  # the caller counts steps
+            return computer.program_counter
+
+        return linked
+
     def _assert_accumulator_is_not_empty(self, computer):
         if computer.accumulator is None:
             raise AccumulatorIsEmptyError("The accumulator is empty.")
@@ -79,6 +121,14 @@ class NoOp(AbstractInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link(self, step, linker):
+        next_step = step + 1
+
+        def no_op(computer):
+            return next_step
+
+        return no_op
+
 
 class MoveFromInbox(AbstractInstruction):
     """
@@ -101,6 +151,18 @@ class MoveFromInbox(AbstractInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link(self, step, linker):
+        next_step = step + 1
+
+        def move_from_inbox(computer):
+            inbox = computer.inbox
+            if inbox is None or not len(inbox):
+                raise InboxIsEmptyError("The inbox is empty.")
+            computer.accumulator = inbox.popleft()
+            return next_step
+
+        return move_from_inbox
+
 
 class MoveToOutbox(AbstractInstruction):
     symbol = "move_to_outbox"
@@ -112,6 +174,19 @@ class MoveToOutbox(AbstractInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link(self, step, linker):
+        next_step = step + 1
+
+        def move_to_outbox(computer):
+            accumulator = computer.accumulator
+            if accumulator is None:
+                raise AccumulatorIsEmptyError("The accumulator is empty.")
+            computer.outbox.append(accumulator)
+            computer.accumulator = None
+            return next_step
+
+        return move_to_outbox
+
 
 class AbstractTileInstruction(AbstractInstruction):
     has_argument = True
@@ -129,6 +204,17 @@ class AbstractTileInstruction(AbstractInstruction):
         s = "{} [{}]" if self.indirect else "{} {}"
         return s.format(self.symbol, tile_str)
 
+    def link(self, step, linker):
+        """
+        Resolve the tile, then hand off to `link_tile`.  If the tile's label
+        is unknown, fall back to `execute`, which will raise the KeyError if
+        and when this step is actually reached.
+        """
+        try:
+            return self.link_tile(step, linker.memory)
+        except KeyError:
+            return super().link(step, linker)
+
 
 class CopyFrom(AbstractTileInstruction):
     symbol = "copy_from"
@@ -138,6 +224,16 @@ class CopyFrom(AbstractTileInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link_tile(self, step, memory):
+        next_step = step + 1
+        read = memory.reader(self.tile_index, indirect=self.indirect)
+
+        def copy_from(computer):
+            computer.accumulator = read()
+            return next_step
+
+        return copy_from
+
 
 class CopyTo(AbstractTileInstruction):
     symbol = "copy_to"
@@ -148,6 +244,19 @@ class CopyTo(AbstractTileInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link_tile(self, step, memory):
+        next_step = step + 1
+        write = memory.writer(self.tile_index, indirect=self.indirect)
+
+        def copy_to(computer):
+            accumulator = computer.accumulator
+            if accumulator is None:
+                raise AccumulatorIsEmptyError("The accumulator is empty.")
+            write(accumulator)
+            return next_step
+
+        return copy_to
+
 
 class Add(AbstractTileInstruction):
     symbol = "add"
@@ -161,6 +270,22 @@ class Add(AbstractTileInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link_tile(self, step, memory):
+        next_step = step + 1
+        read = memory.reader(self.tile_index, indirect=self.indirect)
+
+        def add(computer):
+            accumulator = computer.accumulator
+            if accumulator is None:
+                raise AccumulatorIsEmptyError("The accumulator is empty.")
+            value_to_add = read()
+            if is_char(value_to_add) or is_char(accumulator):
+                raise IncompatibleTypesError("You can't add a letter.  What would that even mean?")
+            computer.accumulator = accumulator + value_to_add
+            return next_step
+
+        return add
+
 
 class Subtract(AbstractTileInstruction):
     symbol = "subtract"
@@ -178,6 +303,26 @@ class Subtract(AbstractTileInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link_tile(self, step, memory):
+        next_step = step + 1
+        read = memory.reader(self.tile_index, indirect=self.indirect)
+
+        def subtract(computer):
+            accumulator = computer.accumulator
+            if accumulator is None:
+                raise AccumulatorIsEmptyError("The accumulator is empty.")
+            value_to_subtract = read()
+            value_to_subtract_is_char = is_char(value_to_subtract)
+            if value_to_subtract_is_char != is_char(accumulator):
+                raise IncompatibleTypesError("You can't subtract (from) a letter.  What would that even mean?")
+            if value_to_subtract_is_char:
+                value_to_subtract = ord(value_to_subtract)
+                accumulator = ord(accumulator)
+            computer.accumulator = accumulator - value_to_subtract
+            return next_step
+
+        return subtract
+
 
 class BumpUp(AbstractTileInstruction):
     """
@@ -197,6 +342,22 @@ class BumpUp(AbstractTileInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link_tile(self, step, memory):
+        next_step = step + 1
+        read = memory.reader(self.tile_index, indirect=self.indirect)
+        write = memory.writer(self.tile_index, indirect=self.indirect)
+
+        def bump_up(computer):
+            value = read()
+            if is_char(value):
+                raise IncompatibleTypesError("You can't add to a letter.  What would that even mean?")
+            value += 1
+            write(value)
+            computer.accumulator = value
+            return next_step
+
+        return bump_up
+
 
 class BumpDown(AbstractTileInstruction):
     """
@@ -216,6 +377,22 @@ class BumpDown(AbstractTileInstruction):
         computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link_tile(self, step, memory):
+        next_step = step + 1
+        read = memory.reader(self.tile_index, indirect=self.indirect)
+        write = memory.writer(self.tile_index, indirect=self.indirect)
+
+        def bump_down(computer):
+            value = read()
+            if is_char(value):
+                raise IncompatibleTypesError("You can't subtract from a letter.  What would that even mean?")
+            value -= 1
+            write(value)
+            computer.accumulator = value
+            return next_step
+
+        return bump_down
+
 
 class Jump(AbstractInstruction):
     """Jump (unconditionally) to the supplied program step."""
@@ -239,19 +416,30 @@ class Jump(AbstractInstruction):
         self.destination_pc = destination_pc
 
     def _lookup_destination(self, computer):
-        result = self.destination_pc
-        if result in computer.jump_table:
-            result = computer.jump_table[result]
-        if type(result) is not int:
-            raise NoSuchJumpDestinationError(result, f'The label "{result}" does not appear in the program.')
-        elif not 0 <= result < len(computer.program):
-            raise NoSuchJumpDestinationError(result, f"Step number {result} is outside the range of the program.")
-        return result
+        return resolve_destination(self.destination_pc, computer.jump_table, len(computer.program))
 
     def execute(self, computer):
         computer.program_counter = self._lookup_destination(computer)
         computer.total_steps_executed += 1
 
+    def link(self, step, linker):
+        """
+        Resolve the destination, then hand off to `link_destination`.  If
+        there's no such destination, fall back to `execute`, which will raise
+        the NoSuchJumpDestinationError if and when the jump is actually taken.
+        """
+        try:
+            destination = linker.resolve_destination(self.destination_pc)
+        except NoSuchJumpDestinationError:
+            return super().link(step, linker)
+        return self.link_destination(step, destination)
+
+    def link_destination(self, step, destination):
+        def jump_to(computer):
+            return destination
+
+        return jump_to
+
 
 class JumpIfZero(Jump):
     """
@@ -268,6 +456,17 @@ class JumpIfZero(Jump):
             computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link_destination(self, step, destination):
+        next_step = step + 1
+
+        def jump_if_zero_to(computer):
+            accumulator = computer.accumulator
+            if accumulator is None:
+                raise AccumulatorIsEmptyError("The accumulator is empty.")
+            return destination if accumulator == 0 else next_step
+
+        return jump_if_zero_to
+
 
 class JumpIfNegative(Jump):
     """
@@ -288,6 +487,17 @@ class JumpIfNegative(Jump):
             computer.program_counter += 1
         computer.total_steps_executed += 1
 
+    def link_destination(self, step, destination):
+        next_step = step + 1
+
+        def jump_if_negative_to(computer):
+            accumulator = computer.accumulator
+            if accumulator is None:
+                raise AccumulatorIsEmptyError("The accumulator is empty.")
+            return destination if accumulator < 0 else next_step
+
+        return jump_if_negative_to
+
 
 INSTRUCTION_CATALOG = [
     NoOp,
@@ -0,0 +1,98 @@
+"""
+Most of the steps of an HRM program are spent going round some small loop.
+The tracing JIT runs a program exactly the way the linked engine does (see
+Linker.py), except that it keeps count of how often each backward jump lands
+on the same step.  Once one of those loop heads is hot, the JIT records the
+steps the program actually takes from the head until it gets back there, and
+has the Transpiler compile that trace into a single function.  The trace
+function goes round the loop for as long as each conditional jump goes the
+same way it went while recording, and hands control back to the linked steps
+as soon as one doesn't.
+
+The compiled trace simply replaces the linked step at the loop's head, so the
+main loop needs no extra bookkeeping to use it.  Step counts, the program
+counter, and errors come out exactly as they do from the interpreter; see
+`Transpiler.compile_trace` for how.
+
+    >>> from hrmulator.Assembler import Assembler
+    >>> from hrmulator.Computer import Computer
+    >>> from hrmulator.Memory import Memory
+    >>> computer = Computer(engine="jit")
+    >>> computer.memory = Memory(values={0: 1000})
+    >>> computer.load_program(program_text='''
+    ... LOOP:
+    ...     bump_down 0
+    ...     jump_if_zero_to DONE
+    ...     jump_to LOOP
+    ... DONE:
+    ...     move_to_outbox''')
+    >>> computer.run()
+    >>> computer.outbox, computer.total_steps_executed
+    ([0], 3000)
+"""
+from .Linker import Linker
+from .Transpiler import Transpiler
+
+HOT_LOOP_THRESHOLD = 50
+# How many times a backward jump must land on a step before it's a loop head
+# worth tracing.
+
+MAX_TRACE_LENGTH = 500
+# Recording gives up on a loop that takes more steps than this to come round.
+
+
+class TracingJIT:
+    def __init__(self, program, jump_table, memory):
+        self.linked = Linker(program, jump_table, memory).link()
+        self.steps = list(self.linked)
+        # `linked` stays as it is; `steps` gets traces installed at loop heads.
+
+        self.heat = [0] * len(self.steps)
+        self.transpiler = Transpiler(program, jump_table, memory)
+        self.traces = {}
+        # maps loop heads to their (step, next step) traces, for the curious
+
+    def run(self, computer):
+        """Run from `computer.program_counter`, just like the linked engine."""
+        linked = self.linked
+        steps = self.steps
+        heat = self.heat
+        end = len(steps)
+        step = computer.program_counter
+        count = 0
+        try:
+            while step < end:
+                next_step = steps[step](computer)
+                count += 1
+                if next_step <= step and heat[next_step] is not None:
+                    heat[next_step] += 1
+                    if heat[next_step] >= HOT_LOOP_THRESHOLD:
+                        # Record, while executing, one trip round the loop.
+                        head = step = next_step
+                        trace = []
+                        while True:
+                            next_step = linked[step](computer)
+                            count += 1
+                            trace.append((step, next_step))
+                            if next_step == head:
+                                steps[head] = self.transpiler.compile_trace(trace)
+                                self.traces[head] = trace
+                                break
+                            if (
+                                next_step >= end
+                                or len(trace) >= MAX_TRACE_LENGTH
+                                or steps[next_step] is not linked[next_step]
+                            ):
+                                break  # not a loop we can trace
+                            step = next_step
+                        heat[head] = None  # traced or not, never again
+                step = next_step
+        finally:
+            computer.program_counter = step
+            computer.total_steps_executed += count
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
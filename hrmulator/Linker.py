@@ -0,0 +1,63 @@
+"""
+The Assembler hands back a program that still talks in labels: `copy_to sum`,
+`jump_to START`.  That's exactly what you want to print, but executing it
+means looking up `sum` in the memory's label map and `START` in the jump table
+every single time the step runs.  Linking does all of those lookups once, up
+front:
+
+    >>> from hrmulator.Assembler import Assembler
+    >>> from hrmulator.Memory import Memory
+    >>> program, jump_table = Assembler().assemble_program_text('''
+    ... START:
+    ...     move_from_inbox
+    ...     copy_to sum
+    ...     jump_to START''')
+    >>> steps = Linker(program, jump_table, Memory(labels={'sum': 0})).link()
+    >>> len(steps)
+    3
+
+Each of the `steps` is a function that takes the computer, executes one
+instruction, and returns the number of the next step to execute.  They don't
+touch `program_counter` or `total_steps_executed`; that's the caller's job
+(see `Computer.run`).
+
+A jump to somewhere that doesn't exist, like a tile label that doesn't exist,
+links to a step that simply executes the instruction; so it raises only if and
+when it's actually reached, and taken, just as it would in the interpreter:
+
+    >>> program, jump_table = Assembler().assemble_program_text('jump_to NOWHERE')
+    >>> steps = Linker(program, jump_table, Memory()).link()
+    >>> from hrmulator.Computer import Computer
+    >>> computer = Computer()
+    >>> computer.program, computer.jump_table = program, jump_table
+    >>> steps[0](computer)
+    Traceback (most recent call last):
+        ...
+    hrmulator.Instructions.NoSuchJumpDestinationError: ('NOWHERE', 'The label "NOWHERE" does not appear in the program.')
+
+A linked program is bound to the particular `Memory` it was linked against.
+Give the computer a different memory, or re-label a tile, and you must link
+again.
+"""
+from .Instructions import resolve_destination
+
+
+class Linker:
+    def __init__(self, program, jump_table, memory):
+        self.program = program
+        self.jump_table = jump_table
+        self.memory = memory
+
+    def resolve_destination(self, destination):
+        """Used by the jump instructions, while they link."""
+        return resolve_destination(destination, self.jump_table, len(self.program))
+
+    def link(self):
+        """Return the list of linked steps, one for each instruction."""
+        return [instruction.link(step, self) for step, instruction in enumerate(self.program)]
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
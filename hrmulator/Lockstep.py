@@ -0,0 +1,353 @@
+"""
+The lockstep executor runs one program over a great many inboxes at the same
+time, in a single process, with NumPy.  Every run is a "lane", and the state of
+all the lanes lives in arrays: one program counter, one accumulator, and one
+row of floor tiles per lane.  Each time round, the lanes are grouped by their
+program counter, and each group executes its instruction all at once.  HRM
+programs are small and most inboxes go the same way through them, so there
+are only ever a few groups, however many lanes there are.
+
+    >>> results = run_lockstep(
+    ...     program_text='''
+    ...     START:
+    ...         move_from_inbox
+    ...         jump_if_zero_to START
+    ...         move_to_outbox
+    ...         jump_to START''',
+    ...     inboxes=[[1, 0, 2], [], [0, 0, 'A']],
+    ... )
+    >>> for result in results:
+    ...     print(result.outbox, result.steps, result.error)
+    [1, 2] 10 None
+    [] 0 None
+    ['A'] 8 None
+
+A lane finishes when its inbox runs dry, or it runs off the end of the
+program.  A lane that's about to do anything the arrays can't, like raise an
+error, or store a value on a tile outside the floor, is taken out of the
+lockstep: the executor's Computer is set up exactly as the lane was, and
+finishes the run, with `engine`, "linked" by default, or "interpreter"; see
+`Computer.start`.  The program is linked just once, for every lane that
+leaves.  That's also where any error comes from, so errors are exactly the
+ones the other engines raise.  A lane whose inbox
+holds something that can't be encoded in the arrays runs that way from the
+start.
+
+Values are kept tagged, as 64-bit integers, see Values.py, with EMPTY for an
+empty tile or accumulator: so the game's arithmetic is NumPy's, and telling
+letters from integers is a bit test on the same array.  The arithmetic stays
+well clear of overflow: a lane about to add or bump a tagged value bigger
+than `LARGEST_VALUE` leaves the lockstep, and Python's own integers take
+over.
+
+The results are BatchResults, just like run_batch's, see Batch.py.  This is
+the only part of hrmulator that needs NumPy.
+"""
+
+import copy
+
+import numpy as np
+
+from .AssemblyCache import default_cache
+from .Batch import BatchResult
+from .Bytecode import (
+    ADD,
+    BUMP_DOWN,
+    BUMP_UP,
+    COPY_FROM,
+    COPY_TO,
+    JUMP,
+    JUMP_IF_NEGATIVE,
+    JUMP_IF_ZERO,
+    MOVE_FROM_INBOX,
+    MOVE_TO_OUTBOX,
+    OPCODES,
+    SUBTRACT,
+    UNLINKED,
+)
+from .Computer import PAUSED, SLICED_ENGINES, Computer
+from .Instructions import Jump, NoSuchJumpDestinationError, resolve_destination
+from .Memory import Memory
+from .TypeTools import is_int_or_char
+from .Values import EMPTY, ONE, decode, encode
+
+LARGEST_VALUE = 2**62
+# Tagged values smaller than this, added or subtracted, can't overflow 64 bits.
+
+MAX_FLOOR_WIDTH = 4096
+# A floor wider than this, in tiles, is too expensive to copy into every lane;
+# instead, every lane runs on the Computer.
+
+STEPS_PER_SLICE = 1 << 20
+
+
+def run_lockstep(*, program_path=None, program_text=None, memory=None, inboxes, engine="linked"):
+    """
+    Run one program against each of `inboxes`, all at once, and return a list
+    of BatchResults, in the same order.
+    """
+    program, jump_table = default_cache.assemble(program_path=program_path, program_text=program_text)
+    if memory is None:
+        memory = Memory()
+    return Lockstep(program, jump_table, memory, engine).run(inboxes)
+
+
+class Lockstep:
+    def __init__(self, program, jump_table, memory, engine="linked"):
+        if engine not in SLICED_ENGINES:
+            raise ValueError(f'The "{engine}" engine can\'t finish a lane, only {tuple(SLICED_ENGINES)} can')
+        self.program = program
+        self.jump_table = jump_table
+        self.memory = memory
+
+        # Every lane that leaves the lockstep finishes on this one computer.
+        self.computer = Computer(engine=engine)
+        self.computer.program, self.computer.jump_table = program, jump_table
+        self.computer.memory = copy.deepcopy(memory)
+        self.start_memory = self.computer.memory.snapshot()
+
+        # Resolve every operand once, just like the bytecode engine; a step
+        # that can't be resolved is UNLINKED, and every lane that gets there
+        # leaves the lockstep to raise whatever it raises.
+        self.opcodes = []
+        self.operands = []
+        self.indirect = []
+        tiles = set(memory.tiles) | set(memory.label_map.values())
+        for instruction in program:
+            opcode = OPCODES[type(instruction)]
+            operand = 0
+            if isinstance(instruction, Jump):
+                try:
+                    operand = resolve_destination(instruction.destination_pc, jump_table, len(program))
+                except NoSuchJumpDestinationError:
+                    opcode = UNLINKED
+            elif instruction.has_argument:
+                try:
+                    operand = memory._resolve_key(instruction.tile_index)
+                    tiles.add(operand)
+                except KeyError:
+                    opcode = UNLINKED
+            self.opcodes.append(opcode)
+            self.operands.append(operand)
+            self.indirect.append(getattr(instruction, "indirect", False))
+
+        self.first_tile = min(tiles, default=0)
+        self.floor_width = max(tiles, default=0) - self.first_tile + 1
+        # Column c of the floor holds tile `first_tile + c`.
+
+    def run(self, inboxes):
+        """Run every one of `inboxes` to the end, and return their BatchResults."""
+        self.inboxes = inboxes = [list(inbox) for inbox in inboxes]
+        lanes = len(inboxes)
+        self.program_counter = np.zeros(lanes, dtype=np.int64)
+        self.steps = np.zeros(lanes, dtype=np.int64)
+        self.accumulator = np.full(lanes, EMPTY, dtype=np.int64)
+        self.running = np.ones(lanes, dtype=bool)
+        self.outputs = []  # (lanes, values) for each group that moved to the outbox
+        self.evicted = {}  # lane number: the BatchResult of the rest of its run
+
+        # Every inbox, end to end, in one array.
+        lengths = np.array([len(inbox) for inbox in inboxes], dtype=np.int64)
+        self.inbox_end = np.cumsum(lengths)
+        self.inbox_start = self.inbox_end - lengths
+        self.inbox_next = self.inbox_start.copy()
+        self.inbox_values = np.zeros(int(lengths.sum()), dtype=np.int64)
+
+        self.floor = np.full((lanes, self.floor_width), EMPTY, dtype=np.int64)
+        self.floor_encoded = self.floor_width <= MAX_FLOOR_WIDTH
+        for tile, value in self.memory.tiles.items():
+            tagged = _encode(value)
+            self.floor_encoded = self.floor_encoded and tagged is not None
+            if self.floor_encoded:
+                self.floor[:, tile - self.first_tile] = tagged
+        if not self.floor_encoded:
+            self._evict(np.flatnonzero(self.running))
+
+        for lane, inbox in enumerate(inboxes):
+            start = self.inbox_start[lane]
+            for offset, value in enumerate(inbox):
+                tagged = _encode(value)
+                if tagged is None:
+                    self._evict(np.array([lane]))
+                    break
+                self.inbox_values[start + offset] = tagged
+
+        end = len(self.opcodes)
+        self.running &= self.program_counter < end
+        active = np.flatnonzero(self.running)
+        while active.size:
+            # Group the running lanes by program counter, and step each group.
+            order = np.argsort(self.program_counter[active], kind="stable")
+            active = active[order]
+            program_counters = self.program_counter[active]
+            starts = np.flatnonzero(np.diff(program_counters, prepend=-1))
+            for start, stop in zip(starts, np.append(starts[1:], active.size)):
+                self._step(int(program_counters[start]), active[start:stop])
+            self.running &= self.program_counter < end
+            active = np.flatnonzero(self.running)
+
+        return self._results()
+
+    def _step(self, step, lanes):
+        """Execute step number `step` in each of `lanes`; all of them are at `step`."""
+        opcode = self.opcodes[step]
+        operand = self.operands[step]
+        if opcode == UNLINKED:
+            self._evict(lanes)
+            return
+
+        if opcode == MOVE_FROM_INBOX:
+            empty = self.inbox_next[lanes] >= self.inbox_end[lanes]
+            self.running[lanes[empty]] = False
+            lanes = lanes[~empty]
+            next_value = self.inbox_next[lanes]
+            self.accumulator[lanes] = self.inbox_values[next_value]
+            self.inbox_next[lanes] = next_value + 1
+        elif opcode == MOVE_TO_OUTBOX:
+            lanes = self._evict_where(lanes, self.accumulator[lanes] == EMPTY)
+            self.outputs.append((lanes, self.accumulator[lanes]))
+            self.accumulator[lanes] = EMPTY
+        elif opcode >= JUMP:
+            if opcode == JUMP:
+                self.program_counter[lanes] = operand
+            else:
+                accumulator = self.accumulator[lanes]
+                if opcode == JUMP_IF_ZERO:
+                    # no letter is the tagged 0
+                    lanes, accumulator = self._evict_where(lanes, accumulator == EMPTY, accumulator)
+                    taken = accumulator == 0
+                else:
+                    # comparing a letter to zero is a TypeError
+                    lanes, accumulator = self._evict_where(lanes, _not_an_integer(accumulator), accumulator)
+                    taken = accumulator < 0
+                self.program_counter[lanes] = np.where(taken, operand, step + 1)
+            self.steps[lanes] += 1
+            return
+        elif opcode >= COPY_FROM:
+            lanes = self._step_tile(opcode, operand, self.indirect[step], lanes)
+        self.program_counter[lanes] = step + 1
+        self.steps[lanes] += 1
+
+    def _step_tile(self, opcode, operand, indirect, lanes):
+        """Execute a tile instruction, and return the lanes that completed it."""
+        column = np.full(lanes.size, operand - self.first_tile)
+        if indirect:
+            tagged = self.floor[lanes, column]
+            pointer = (tagged >> 1) - self.first_tile
+            lanes, column = self._evict_where(
+                lanes,
+                _not_an_integer(tagged) | (pointer < 0) | (pointer >= self.floor_width),
+                pointer,
+            )
+
+        if opcode == COPY_TO:
+            lanes, column = self._evict_where(lanes, self.accumulator[lanes] == EMPTY, column)
+            self.floor[lanes, column] = self.accumulator[lanes]
+            return lanes
+
+        value = self.floor[lanes, column]
+        if opcode == COPY_FROM:
+            lanes, column, value = self._evict_where(lanes, value == EMPTY, column, value)
+            self.accumulator[lanes] = value
+        elif opcode == ADD or opcode == SUBTRACT:
+            accumulator = self.accumulator[lanes]
+            if opcode == ADD:
+                bad = _not_an_integer(accumulator) | _not_an_integer(value)
+            else:
+                # two letters subtract to the tagged difference of their `ord`s
+                bad = (accumulator == EMPTY) | (value == EMPTY) | ((accumulator ^ value) & 1 == 1)
+            bad |= (np.abs(accumulator) >= LARGEST_VALUE) | (np.abs(value) >= LARGEST_VALUE)
+            lanes, accumulator, value = self._evict_where(lanes, bad, accumulator, value)
+            self.accumulator[lanes] = accumulator + value if opcode == ADD else accumulator - value
+        else:
+            lanes, column, value = self._evict_where(
+                lanes, _not_an_integer(value) | (np.abs(value) >= LARGEST_VALUE), column, value
+            )
+            value = value + ONE if opcode == BUMP_UP else value - ONE
+            self.floor[lanes, column] = value
+            self.accumulator[lanes] = value
+        return lanes
+
+    def _evict_where(self, lanes, mask, *others):
+        """
+        Evict the lanes where `mask` is true.  Return the rest, along with the
+        matching entries of each of `others`.
+        """
+        if not mask.any():
+            return (lanes, *others) if others else lanes
+        self._evict(lanes[mask])
+        keep = ~mask
+        if not others:
+            return lanes[keep]
+        return (lanes[keep], *(other[keep] for other in others))
+
+    def _evict(self, lanes):
+        """Take `lanes` out of the lockstep, and finish each on the computer."""
+        computer = self.computer
+        for lane in lanes.tolist():
+            if not self.running[lane]:
+                continue
+            self.running[lane] = False
+            consumed = int(self.inbox_next[lane] - self.inbox_start[lane])
+            computer.set_inbox(self.inboxes[lane][consumed:])
+            computer.start()
+            # The tiles are put back in place, so the program stays linked.
+            computer.memory.restore(self.start_memory)
+            if self.floor_encoded:
+                tiles = computer.memory.tiles
+                tiles.clear()
+                for column in np.flatnonzero(self.floor[lane] != EMPTY).tolist():
+                    tiles[self.first_tile + column] = decode(int(self.floor[lane, column]))
+            computer.accumulator = _decode(self.accumulator[lane])
+            computer.program_counter = int(self.program_counter[lane])
+            computer.total_steps_executed = int(self.steps[lane])
+            try:
+                why = PAUSED
+                while why is PAUSED:
+                    why = computer.resume(STEPS_PER_SLICE)
+                error = None
+            except Exception as e:
+                error = e
+            # the outbox is prefixed with the lane's lockstep outbox, in `_results`
+            self.evicted[lane] = BatchResult(computer.outbox, computer.total_steps_executed, error)
+
+    def _results(self):
+        outboxes = [[] for _ in self.inboxes]
+        if self.outputs:
+            lanes = np.concatenate([lanes for lanes, _ in self.outputs])
+            values = np.concatenate([values for _, values in self.outputs])
+            order = np.argsort(lanes, kind="stable")
+            for lane, value in zip(lanes[order].tolist(), values[order].tolist()):
+                outboxes[lane].append(decode(value))
+
+        results = []
+        for lane, outbox in enumerate(outboxes):
+            evicted = self.evicted.get(lane)
+            if evicted is None:
+                results.append(BatchResult(outbox, int(self.steps[lane]), None))
+            else:
+                results.append(evicted._replace(outbox=outbox + evicted.outbox))
+        return results
+
+
+def _encode(value):
+    """Return the tagged `value`, or None if it won't fit in a lane."""
+    if not is_int_or_char(value):
+        return None
+    tagged = encode(value)
+    return tagged if abs(tagged) < LARGEST_VALUE else None
+
+
+def _decode(tagged):
+    return None if tagged == EMPTY else decode(int(tagged))
+
+
+def _not_an_integer(tagged):
+    """Where `tagged`, an array, holds a letter, or nothing at all."""
+    return (tagged == EMPTY) | (tagged & 1 == 1)
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,248 @@
+"""
+A program that never stops, without ever emptying its inbox, will keep
+`Computer.run` busy forever.  Lots of those programs go round and round
+through exactly the same states: the same step, the same accumulator, the same
+tiles, and the same inbox.  Once a computer has been in the same state twice,
+it will be again, and again, forever; so the loop detector watches for that,
+and raises InfiniteLoopError as soon as it sees it.
+
+    >>> from hrmulator.Computer import Computer
+    >>> from hrmulator.Memory import Memory
+    >>> computer = Computer(detect_loops=True)
+    >>> computer.memory = Memory(values={0: 0})
+    >>> computer.set_inbox([1, 2, 3])
+    >>> computer.load_program(program_text='''
+    ... START:
+    ...     copy_from 0
+    ...     jump_if_zero_to START
+    ...     move_from_inbox''')
+    >>> computer.run()
+    Traceback (most recent call last):
+        ...
+    hrmulator.LoopDetection.InfiniteLoopError: (0, 1, 'The program loops forever, somewhere from step 0 to step 1.')
+
+A list outbox isn't part of the state: whatever goes into it never comes back
+out, so a program that fills it up, the same way, forever, is stuck too.  But
+an Outbox that can close (see Streams.py) may end the run the next time
+anything goes into it; so for one of those, how many values it's been given
+is part of the state, and a program that fills it up forever isn't stuck.
+
+The detector only looks at the state when a jump goes backwards, because
+there's no going round in circles without one; jumps that can only go forwards
+aren't watched at all.  It keeps the states it has
+seen in a table of at most `MAX_STATES`, which it empties when it's full, and
+whenever a value is taken from the inbox, or given to an Outbox: no state from
+before that can ever come round again.  A loop that takes longer than that to come back round
+won't be noticed, and neither will a loop that never repeats a state, say,
+one that counts up forever.
+
+Hashing every tile at every backward jump would be slow, so the tiles keep
+their own hash, HashedTiles, brought up to date a little at every change.  Two
+different floors may, very rarely, share a hash.  So a state that seems to
+repeat is only a suspect: the detector takes a full copy of it, and raises
+only when that exact state comes round again.
+
+Only the "interpreter" and "linked" engines can detect loops, and only on the
+tiles of a Memory, not a DenseMemory (see Memory.py), which are in a list.
+"""
+from .Instructions import (
+    AbstractInstruction,
+    Jump,
+    NoSuchJumpDestinationError,
+    resolve_destination,
+)
+from .Memory import JournaledTiles
+from .Streams import Inbox, Outbox
+
+MAX_STATES = 4096
+# The most states the detector remembers; also, how many backward jumps it
+# waits for a suspect to come round again before deciding it was a mistake.
+
+
+class InfiniteLoopError(Exception):
+    def __init__(self, first_step, last_step):
+        self.first_step = first_step
+        self.last_step = last_step
+        super().__init__(
+            first_step, last_step, f"The program loops forever, somewhere from step {first_step} to step {last_step}."
+        )
+
+    def __reduce__(self):
+        # so that it can come back from a worker process, see Batch.py
+        return type(self), (self.first_step, self.last_step)
+
+
+class HashedTiles(dict):
+    """
+    The tiles of a Memory, as a dictionary that keeps the hash of its contents,
+    in `hash`, up to date as tiles are set.
+    """
+
+    def __init__(self, tiles):
+        super().__init__(tiles)
+        self.hash = 0
+        for item in self.items():
+            self.hash ^= hash(item)
+
+    def __setitem__(self, index, value):
+        old_value = self.get(index)
+        if old_value is None:
+            self.hash ^= hash((index, value))
+        elif old_value != value:
+            self.hash ^= hash((index, old_value)) ^ hash((index, value))
+        dict.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self.hash ^= hash((index, self[index]))
+        dict.__delitem__(self, index)
+
+    def clear(self):
+        dict.clear(self)
+        self.hash = 0
+
+    def update(self, tiles):
+        for index, value in tiles.items():
+            self[index] = value
+
+    def __reduce__(self):
+        # copy and pickle the tiles; the hash is worked out again from scratch
+        return HashedTiles, (dict(self),)
+
+    def journaled(self):
+        """Return these tiles, keeping a journal as well as the hash, see `Memory.journal`."""
+        return JournaledHashedTiles(self)
+
+
+class JournaledHashedTiles(JournaledTiles, HashedTiles):
+    unjournaled = HashedTiles
+
+
+class LoopDetector:
+    def __init__(self):
+        self.seen = set()
+        self.suspect = None  # (state, a copy of the tiles) to watch for
+        self.countdown = 0  # how many more backward jumps to watch for it
+        self.first_step = self.last_step = None  # the steps gone through since the suspect
+        self.position = None  # where the inbox, and an Outbox, were, for every state in `seen`
+
+    def forget(self):
+        """Forget every state seen so far."""
+        self.seen.clear()
+        self.suspect = None
+
+    def check(self, computer, jump_step, destination):
+        """
+        Called when the jump at `jump_step` is about to go back to
+        `destination`.  Raise InfiniteLoopError if the computer has been in
+        this state before.
+        """
+        tiles = computer.memory.tiles
+        inbox = computer.inbox
+        outbox = computer.outbox
+        # how far along the inbox is: a stream's length is only what it's read ahead
+        position = (
+            inbox.position() if isinstance(inbox, Inbox) else len(inbox),
+            outbox.count if isinstance(outbox, Outbox) else None,
+        )
+        if position != self.position:
+            self.forget()
+            self.position = position
+        state = (destination, computer.accumulator, position, tiles.hash)
+        if self.suspect is not None:
+            self.first_step = min(self.first_step, destination)
+            self.last_step = max(self.last_step, jump_step)
+            if state == self.suspect[0] and tiles == self.suspect[1]:
+                raise InfiniteLoopError(self.first_step, self.last_step)
+            self.countdown -= 1
+            if not self.countdown:
+                self.suspect = None
+        elif state in self.seen:
+            self.suspect = (state, dict(tiles))
+            self.countdown = MAX_STATES
+            self.first_step, self.last_step = destination, jump_step
+        if len(self.seen) >= MAX_STATES:
+            self.seen.clear()
+        self.seen.add(state)
+
+    def watch(self, program, jump_table):
+        """
+        Return a copy of `program` in which every step that can jump
+        backwards, a jump or a Superinstruction (see Fusion.py) that ends with
+        one, is a WatchedJump.
+        """
+        watched = list(program)
+        for step, instruction in enumerate(program):
+            parts = getattr(instruction, "parts", [instruction])
+            jump_step = step + len(parts) - 1
+            if isinstance(parts[-1], Jump) and _destination(parts[-1], jump_table, len(program)) <= jump_step:
+                watched[step] = WatchedJump(instruction, jump_step, self)
+        return watched
+
+
+def _destination(jump, jump_table, program_length):
+    """Where `jump` goes, or -1 if nowhere, to be on the safe side; it raises when it's run."""
+    try:
+        return resolve_destination(jump.destination_pc, jump_table, program_length)
+    except NoSuchJumpDestinationError:
+        return -1
+
+
+class WatchedJump(AbstractInstruction):
+    """
+    A jump, or a superinstruction that ends with one, that has its
+    LoopDetector check the state whenever it jumps backwards.
+
+    If the check raises, it's as if the jump itself raised: the computer is
+    left pointing at the jump, without counting it.  A superinstruction gets
+    there the same way it does for any other error, see Fusion.py: it hands
+    back the jump's step number, and lets the jump go round again, and raise,
+    all by itself.
+    """
+
+    def __init__(self, instruction, jump_step, detector):
+        self.instruction = instruction
+        self.jump_step = jump_step
+        self.detector = detector
+
+    def __str__(self):
+        return str(self.instruction)
+
+    def colored_str(self):
+        return self.instruction.colored_str()
+
+    def execute(self, computer):
+        step = computer.program_counter
+        self.instruction.execute(computer)
+        if computer.program_counter <= self.jump_step:
+            try:
+                self.detector.check(computer, self.jump_step, computer.program_counter)
+            except InfiniteLoopError:
+                computer.program_counter = self.jump_step
+                computer.total_steps_executed -= 1
+                if step == self.jump_step:
+                    raise
+
+    def link(self, step, linker):
+        linked = self.instruction.link(step, linker)
+        jump_step = self.jump_step
+        check = self.detector.check
+
+        def watched_jump(computer):
+            next_step = linked(computer)
+            if next_step <= jump_step:
+                try:
+                    check(computer, jump_step, next_step)
+                except InfiniteLoopError:
+                    if step == jump_step:
+                        raise
+                    computer.total_steps_executed -= 1  # the caller counts one step
+                    return jump_step
+            return next_step
+
+        return watched_jump
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
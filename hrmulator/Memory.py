@@ -69,8 +69,48 @@ the game works:
     hrmulator.Memory.MemoryTileIsEmptyError: (3, 'Tile 3 is empty.')
 
 Of course I don't support slices.  The game doesn't use them, so I don't need them.
+
+The game's floors are small, and never grow, so a DenseMemory keeps the tiles
+of a floor of `size` tiles in a list, instead of a dictionary.  It's a Memory
+in every other way, except that every tile must be on the floor:
+
+    >>> m = DenseMemory(labels={'zero': 9}, values={'zero': 0}, size=10)
+    >>> m[9], m.get('zero')
+    (0, 0)
+    >>> m[10] = 1
+    Traceback (most recent call last):
+        ...
+    hrmulator.Memory.NoSuchTileError: (10, 'There is no tile 10; the floor has only 10 tiles.')
+
+An integer index is used without looking it up in the labels, and the
+functions that `reader` and `writer` return index the list directly, so the
+"interpreter" and "linked" engines run about a third faster on a DenseMemory.
+The other engines use its tiles through the same methods as a dictionary's,
+see DenseTiles, which is slower than a dictionary; they're better off with a
+Memory.  Loops can't be detected on a DenseMemory; see LoopDetection.py.
+
+To see which tiles a program uses most, and how, give it a ProfiledMemory
+instead.  It counts every read and write of every tile, direct or indirect,
+how many times each tile is used as a pointer, and how long each value sits
+on its tile before it's read: the read-after-write distance, counted in tile
+accesses.  `print_heat_map` prints it all, busiest tile first:
+
+    >>> m = ProfiledMemory(labels={'index': 5}, values={'index': 7})
+    >>> m.set('index', 'A', indirect=True)
+    >>> m.get(7)
+    'A'
+    >>> m.accesses[7].writes, m.accesses[7].indirect_writes, m.accesses[5].pointer_uses
+    (1, 1, 1)
+    >>> m.accesses[7].read_after_write
+    Counter({1: 1})
+
+Fused superinstructions and counting loops use the tiles directly, so a
+computer with a ProfiledMemory runs without either, as it does with
+`profile=True`; see Profiling.py.  Only the "interpreter" and "linked"
+engines go through `get` and `set`, or `reader` and `writer`, at all; the
+others raise ValueError rather than count nothing.
 """
-from collections import OrderedDict, defaultdict
+from collections import Counter, OrderedDict, defaultdict, namedtuple
 
 import termcolor
 
@@ -89,11 +129,27 @@ class CantIndirectThroughLetter(MemoryError):
     def __init__(self):
         super().__init__("A letter does not address any tile.")
 
+    def __reduce__(self):
+        # it takes no arguments, so it can come back from a worker process, see Batch.py
+        return type(self), ()
+
 
 class CantStoreBadType(MemoryError):
     def __init__(self):
         super().__init__("A memory tile may only hold an integer or a single character.")
 
+    def __reduce__(self):
+        # it takes no arguments, so it can come back from a worker process, see Batch.py
+        return type(self), ()
+
+
+class NoSuchTileError(MemoryError):
+    pass
+
+
+TilesMark = namedtuple("TilesMark", "tiles frame")
+# A Memory's snapshot of its JournaledTiles: those tiles, and where they'd got to.
+
 
 class Memory:
     """
@@ -142,11 +198,66 @@ class Memory:
         return key
 
     def label_tile(self, key, label):
-        """So you can apply labels even after construction-time."""
-        self.label_map[label] = self._resolve_key(key)
+        """
+        So you can apply labels even after construction-time.
+
+        The label map is copied before it's changed, never changed in place, so
+        that snapshots can share it.
+        """
+        index = self._resolve_key(key)
+        self.label_map = OrderedDict(self.label_map)
+        self.label_map[label] = index
+
+    def journal(self):
+        """
+        Keep a journal of the changes to the tiles from now on, so that
+        `snapshot` needn't copy them; see JournaledTiles.  The tiles are
+        replaced, so anything linked against the old ones has to be linked
+        again.
+        """
+        tiles = self.tiles
+        if not isinstance(tiles, JournaledTiles):
+            self.tiles = tiles.journaled() if hasattr(tiles, "journaled") else JournaledTiles(tiles)
+
+    def snapshot(self):
+        """
+        Return the tiles and the labels, as they are right now, for `restore`.
+
+        JournaledTiles, see `journal`, are only marked, in time that depends on
+        how many tiles have changed since the last snapshot, not on how many
+        there are.  Other tiles are copied; they only hold integers and
+        letters, which never change, so a shallow copy of them is a complete
+        one.  Either way, the label map is shared, not copied, see
+        `label_tile`.
+        """
+        tiles = self.tiles
+        if isinstance(tiles, JournaledTiles):
+            return TilesMark(tiles, tiles.mark()), self.label_map
+        return dict(tiles), self.label_map
+
+    def restore(self, snapshot):
+        """
+        Put back the tiles and labels from `snapshot`.  The tiles are put back
+        in place, so that programs already linked against this memory, see
+        `reader` and `writer`, go on working.  Tiles marked by this memory's
+        own snapshots are wound back to the mark, changing only the tiles that
+        have changed since.
+        """
+        tiles, self.label_map = snapshot
+        if type(tiles) is TilesMark:
+            if tiles.tiles is self.tiles:
+                self.tiles.rewind(tiles.frame)
+                return
+            tiles = tiles.tiles.contents_at(tiles.frame)
+        self.tiles.clear()
+        self.tiles.update(tiles)
 
     def __getitem__(self, key):
         """A convenience method, [] for when access is not indirect."""
+        return self._tile(key)
+
+    def _tile(self, key):
+        """The value on the tile `key`; what `get` and `set` read, and no one counts."""
         value = self.tiles.get(self._resolve_key(key), None)
         if value is None:
             raise MemoryTileIsEmptyError(key, f"Tile {key} is empty.")
@@ -158,12 +269,12 @@ class Memory:
 
         ...because __getitem__ can't take an additional parameter.
         """
-        value = self.__getitem__(key)
+        value = self._tile(key)
         if indirect:
             if is_char(value):
                 raise CantIndirectThroughLetter()
-            value = self.__getitem__(value)
-            # use `__getitem__` so we check for MemoryTileIsEmptyError
+            value = self._tile(value)
+            # use `_tile` so we check for MemoryTileIsEmptyError
         return value
 
     def __setitem__(self, key, value):
@@ -184,13 +295,86 @@ class Memory:
         # the index of the direct tile
 
         if indirect:
-            key = self.__getitem__(key)
+            key = self._tile(key)
             # whose value is the index of the indirect tile
 
             if is_char(key):
                 raise CantIndirectThroughLetter()
         self.tiles[key] = value
 
+    def reader(self, key, *, indirect=False):
+        """
+        Return a function of no arguments that does what `get` does for `key`.
+
+        The label is resolved right now, once, instead of on every call; so
+        this is what linked programs use (see Linker.py).  An unknown label
+        raises KeyError here, at link-time.  Everything else raises exactly
+        what `get` would have raised, but not until the function is called.
+        """
+        index = self._resolve_key(key)
+        tiles = self.tiles
+
+        if not indirect:
+
+            def read():
+                value = tiles.get(index)
+                if value is None:
+                    raise MemoryTileIsEmptyError(key, f"Tile {key} is empty.")
+                return value
+
+        else:
+
+            def read():
+                pointer = tiles.get(index)
+                if pointer is None:
+                    raise MemoryTileIsEmptyError(key, f"Tile {key} is empty.")
+                if is_char(pointer):
+                    raise CantIndirectThroughLetter()
+                value = tiles.get(pointer)
+                if value is None:
+                    raise MemoryTileIsEmptyError(pointer, f"Tile {pointer} is empty.")
+                return value
+
+        return read
+
+    def writer(self, key, *, indirect=False):
+        """
+        Return a function of one argument that does what `set` does for `key`.
+
+        The counterpart of `reader`, with the same rules about when things are
+        resolved and when they raise.
+        """
+        index = self._resolve_key(key)
+        tiles = self.tiles
+
+        if not indirect:
+
+            def write(value):
+                if not is_int_or_char(value):
+                    raise CantStoreBadType()
+                tiles[index] = value
+
+        else:
+
+            def write(value):
+                if not is_int_or_char(value):
+                    raise CantStoreBadType()
+                pointer = tiles.get(index)
+                if pointer is None:
+                    raise MemoryTileIsEmptyError(index, f"Tile {index} is empty.")
+                if is_char(pointer):
+                    raise CantIndirectThroughLetter()
+                tiles[pointer] = value
+
+        return write
+
+    def _labels_by_index(self):
+        """Invert the label map, so we can lookup labels by index."""
+        labels = defaultdict(list)
+        for label in self.label_map:
+            labels[self.label_map[label]].append(label)
+        return labels
+
     def debug_print(self, key=None):
         """
         Print everything interesting on all the tiles; or else a single tile.
@@ -200,10 +384,7 @@ class Memory:
         the program listing.
         """
 
-        # invert the label map, so we can lookup labels by index
-        labels = defaultdict(list)
-        for label in self.label_map:
-            labels[self.label_map[label]].append(label)
+        labels = self._labels_by_index()
 
         def print_one(key):
             """Pretty-print a single key, its labels if any, and its value."""
@@ -241,6 +422,471 @@ class Memory:
             print_one(key)
 
 
+class _Frame:
+    """
+    The changes made to JournaledTiles from one mark to the next: what each
+    tile changed held before, and, once the next mark is made, after; None
+    for an empty tile.
+    """
+
+    __slots__ = ("parent", "depth", "before", "after")
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.before = {}
+        self.after = None
+
+
+class JournaledTiles(dict):
+    """
+    The tiles of a Memory, as a dictionary that notes what every tile held
+    before it first changed, since the last `mark`.  A mark closes the
+    changes so far into a frame, and the frames make a tree, each one coming
+    after the mark it started from.  So `rewind` can wind the tiles back to
+    any mark, from wherever they are, by undoing the frames back to where
+    the two branches meet, and then redoing those on the way to the mark.
+    Searches, which go back again and again to nearby marks, change only a
+    few tiles each time.
+
+        >>> tiles = JournaledTiles({0: 5})
+        >>> start = tiles.mark()
+        >>> tiles[1] = 'A'
+        >>> branch = tiles.mark()
+        >>> tiles[0] = 6
+        >>> tiles.rewind(start)
+        >>> tiles
+        {0: 5}
+        >>> tiles.rewind(branch)
+        >>> tiles
+        {0: 5, 1: 'A'}
+    """
+
+    unjournaled = dict  # what a copy of them is
+
+    def __init__(self, tiles):
+        super().__init__(tiles)
+        self.frame = _Frame(None)  # the changes since the last mark
+
+    def __setitem__(self, index, value):
+        before = self.frame.before
+        if index not in before:
+            before[index] = self.get(index)
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        before = self.frame.before
+        if index not in before:
+            before[index] = self.get(index)
+        super().__delitem__(index)
+
+    def clear(self):
+        for index in list(self):
+            del self[index]
+
+    def update(self, tiles):
+        for index, value in tiles.items():
+            self[index] = value
+
+    def mark(self):
+        """Return a mark of the tiles, as they are right now, for `rewind`."""
+        frame = self.frame
+        if not frame.before and frame.parent is not None:
+            return frame.parent  # nothing has changed since that mark
+        frame.after = {index: self.get(index) for index in frame.before}
+        self.frame = _Frame(frame)
+        return frame
+
+    def rewind(self, mark):
+        """Put the tiles back, in place, just as they were at `mark`."""
+        back, forward = self._path_to(mark)
+        for frame in back:
+            self._put(frame.before)
+        for frame in forward:
+            self._put(frame.after)
+        self.frame = _Frame(mark)
+
+    def contents_at(self, mark):
+        """Return a dictionary of the tiles as they were at `mark`, leaving them alone."""
+        contents = dict(self)
+        back, forward = self._path_to(mark)
+        for values in [frame.before for frame in back] + [frame.after for frame in forward]:
+            for index, value in values.items():
+                if value is None:
+                    contents.pop(index, None)
+                else:
+                    contents[index] = value
+        return contents
+
+    def _path_to(self, mark):
+        """Return the frames to undo, newest first, and then to redo, oldest first, to get to `mark`."""
+        frame = self.frame
+        back = []
+        forward = []
+        while frame.depth > mark.depth:
+            back.append(frame)
+            frame = frame.parent
+        while mark.depth > frame.depth:
+            forward.append(mark)
+            mark = mark.parent
+        while frame is not mark:
+            back.append(frame)
+            frame = frame.parent
+            forward.append(mark)
+            mark = mark.parent
+        forward.reverse()
+        return back, forward
+
+    def _put(self, values):
+        """Set the tiles to `values`, without noting it."""
+        for index, value in values.items():
+            if value is not None:
+                super().__setitem__(index, value)
+            elif index in self:
+                super().__delitem__(index)
+
+    def __reduce__(self):
+        # a copy, or a pickled one, of the tiles only, without the journal
+        return self.unjournaled, (dict(self),)
+
+
+FLOOR_SIZE = 25  # the most tiles any floor in the game has
+
+
+class DenseTiles:
+    """
+    The tiles of a DenseMemory: `cells`, a list with a place for every tile on
+    the floor, holding its value, or None if it's empty.
+
+    It has the methods of the dictionary of a Memory's tiles, that the engines
+    use, and they treat it the same way: an empty tile is one that isn't
+    there, so `get` returns None for it, and `len`, `in`, iterating, and
+    `items` skip it.  But every index must be on the floor: `get`, `[]`, and
+    setting a tile raise NoSuchTileError for one that isn't.
+    """
+
+    def __init__(self, size):
+        self.cells = [None] * size
+
+    def _no_such_tile(self, index):
+        return NoSuchTileError(index, f"There is no tile {index}; the floor has only {len(self.cells)} tiles.")
+
+    def get(self, index, default=None):
+        cells = self.cells
+        if type(index) is not int:
+            return default  # a letter, say: it's the caller that knows what to raise
+        if not 0 <= index < len(cells):
+            raise self._no_such_tile(index)
+        value = cells[index]
+        return default if value is None else value
+
+    def __getitem__(self, index):
+        value = self.get(index)
+        if value is None:
+            raise KeyError(index)
+        return value
+
+    def __setitem__(self, index, value):
+        if type(index) is not int or not 0 <= index < len(self.cells):
+            raise self._no_such_tile(index)
+        self.cells[index] = value
+
+    def __contains__(self, index):
+        return type(index) is int and 0 <= index < len(self.cells) and self.cells[index] is not None
+
+    def __iter__(self):
+        return (index for index, value in enumerate(self.cells) if value is not None)
+
+    def __len__(self):
+        return len(self.cells) - self.cells.count(None)
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [value for value in self.cells if value is not None]
+
+    def items(self):
+        return [(index, value) for index, value in enumerate(self.cells) if value is not None]
+
+    def clear(self):
+        self.cells[:] = [None] * len(self.cells)  # in place, see Memory.restore
+
+    def update(self, tiles):
+        for index, value in tiles.items():
+            self[index] = value
+
+    def __eq__(self, other):
+        if not isinstance(other, (dict, DenseTiles)):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    def __repr__(self):
+        return f"DenseTiles({dict(self.items())}, size={len(self.cells)})"
+
+
+class DenseMemory(Memory):
+    """
+    A Memory for a floor of a fixed number of tiles, `size`, kept in a list
+    rather than a dictionary, see DenseTiles.
+
+    An integer index is used as it is, without being looked up in the labels;
+    and the functions that `reader` and `writer` return, for linked programs,
+    index the list directly.  A tile off the floor raises NoSuchTileError,
+    when it's read or written, and so does labeling one.
+    """
+
+    def __init__(self, labels=None, values=None, size=FLOOR_SIZE):
+        super().__init__(labels)
+        self.tiles = DenseTiles(size)
+        for index in self.label_map.values():
+            self._check(index)
+        if values is not None:
+            for k, v in values.items():
+                self.__setitem__(k, v)
+
+    def _check(self, index):
+        if not 0 <= index < len(self.tiles.cells):
+            raise self.tiles._no_such_tile(index)
+
+    def _resolve_key(self, key):
+        if type(key) is int:
+            return key
+        return super()._resolve_key(key)
+
+    def label_tile(self, key, label):
+        self._check(self._resolve_key(key))
+        super().label_tile(key, label)
+
+    def journal(self):
+        pass  # a snapshot copies the list of cells, which is quick enough
+
+    def snapshot(self):
+        return list(self.tiles.cells), self.label_map
+
+    def restore(self, snapshot):
+        cells, self.label_map = snapshot
+        self.tiles.cells[:] = cells
+
+    def _tile(self, key):
+        index = key if type(key) is int else self._resolve_key(key)
+        cells = self.tiles.cells
+        if not 0 <= index < len(cells):
+            raise self.tiles._no_such_tile(index)
+        value = cells[index]
+        if value is None:
+            raise MemoryTileIsEmptyError(key, f"Tile {key} is empty.")
+        return value
+
+    def reader(self, key, *, indirect=False):
+        index = self._resolve_key(key)
+        tiles = self.tiles
+        cells = tiles.cells
+        size = len(cells)
+
+        if not 0 <= index < size:
+
+            def read():
+                raise tiles._no_such_tile(index)
+
+        elif not indirect:
+
+            def read():
+                value = cells[index]
+                if value is None:
+                    raise MemoryTileIsEmptyError(key, f"Tile {key} is empty.")
+                return value
+
+        else:
+
+            def read():
+                pointer = cells[index]
+                if pointer is None:
+                    raise MemoryTileIsEmptyError(key, f"Tile {key} is empty.")
+                if type(pointer) is str:
+                    raise CantIndirectThroughLetter()
+                if not 0 <= pointer < size:
+                    raise tiles._no_such_tile(pointer)
+                value = cells[pointer]
+                if value is None:
+                    raise MemoryTileIsEmptyError(pointer, f"Tile {pointer} is empty.")
+                return value
+
+        return read
+
+    def writer(self, key, *, indirect=False):
+        index = self._resolve_key(key)
+        tiles = self.tiles
+        cells = tiles.cells
+        size = len(cells)
+
+        if not 0 <= index < size:
+
+            def write(value):
+                if not is_int_or_char(value):
+                    raise CantStoreBadType()
+                raise tiles._no_such_tile(index)
+
+        elif not indirect:
+
+            def write(value):
+                if type(value) is not int and not (type(value) is str and len(value) == 1):
+                    raise CantStoreBadType()
+                cells[index] = value
+
+        else:
+
+            def write(value):
+                if type(value) is not int and not (type(value) is str and len(value) == 1):
+                    raise CantStoreBadType()
+                pointer = cells[index]
+                if pointer is None:
+                    raise MemoryTileIsEmptyError(index, f"Tile {index} is empty.")
+                if type(pointer) is str:
+                    raise CantIndirectThroughLetter()
+                if not 0 <= pointer < size:
+                    raise tiles._no_such_tile(pointer)
+                cells[pointer] = value
+
+        return write
+
+
+class TileAccesses:
+    """Everything a ProfiledMemory counts about one tile."""
+
+    def __init__(self):
+        self.reads = 0  # including `indirect_reads`
+        self.indirect_reads = 0  # reads through a pointer
+        self.writes = 0  # including `indirect_writes`
+        self.indirect_writes = 0  # writes through a pointer
+        self.pointer_uses = 0  # reads of this tile, as the pointer for an indirect access
+        self.read_after_write = Counter()  # distance: how many reads were that many accesses after a write
+
+    def total(self):
+        return self.reads + self.writes + self.pointer_uses
+
+    def __repr__(self):
+        return (
+            f"<{self.reads} reads ({self.indirect_reads} indirect), "
+            f"{self.writes} writes ({self.indirect_writes} indirect), {self.pointer_uses} pointer uses>"
+        )
+
+
+class ProfiledMemory(Memory):
+    """
+    A Memory that counts, in `accesses`, every tile access that goes through
+    `get`, `set`, `reader`, or `writer`, or through [], which is `get` and
+    `set` without `indirect`.
+    """
+
+    def __init__(self, labels=None, values=None):
+        self.reset_profile()
+        super().__init__(labels, values)
+        self.reset_profile()  # the tiles it starts with aren't the program's writes
+
+    def reset_profile(self):
+        self.accesses = defaultdict(TileAccesses)  # index: its TileAccesses
+        self.clock = 0  # how many accesses so far
+        self.last_written = {}  # index: the clock when it was last written
+
+    def _read(self, index, indirect):
+        self.clock += 1
+        accesses = self.accesses[index]
+        accesses.reads += 1
+        accesses.indirect_reads += indirect
+        written = self.last_written.get(index)
+        if written is not None:
+            accesses.read_after_write[self.clock - written] += 1
+
+    def _write(self, index, indirect):
+        self.clock += 1
+        accesses = self.accesses[index]
+        accesses.writes += 1
+        accesses.indirect_writes += indirect
+        self.last_written[index] = self.clock
+
+    def _use_pointer(self, index):
+        self.clock += 1
+        self.accesses[index].pointer_uses += 1
+        return self.tiles[index]
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def get(self, key, *, indirect=False):
+        value = super().get(key, indirect=indirect)
+        index = self._resolve_key(key)
+        self._read(self._use_pointer(index) if indirect else index, indirect)
+        return value
+
+    def set(self, key, value, *, indirect=False):
+        index = self._resolve_key(key)
+        pointer = self.tiles.get(index)
+        super().set(key, value, indirect=indirect)
+        if indirect:
+            self.clock += 1
+            self.accesses[index].pointer_uses += 1
+            index = pointer
+        self._write(index, indirect)
+
+    def reader(self, key, *, indirect=False):
+        read = super().reader(key, indirect=indirect)
+        index = self._resolve_key(key)
+
+        def profiled_read():
+            value = read()
+            self._read(self._use_pointer(index) if indirect else index, indirect)
+            return value
+
+        return profiled_read
+
+    def writer(self, key, *, indirect=False):
+        write = super().writer(key, indirect=indirect)
+        index = self._resolve_key(key)
+        tiles = self.tiles
+
+        def profiled_write(value):
+            pointer = tiles.get(index)
+            write(value)
+            if indirect:
+                self.clock += 1
+                self.accesses[index].pointer_uses += 1
+                self._write(pointer, True)
+            else:
+                self._write(index, False)
+
+        return profiled_write
+
+    def print_heat_map(self):
+        """
+        Print what's been counted for every tile that's been used, busiest
+        first, with its labels, in color, like `debug_print`.
+        """
+        labels = self._labels_by_index()
+        print("           tile  accesses   reads (indirect)  writes (indirect)  pointer  mean read-after-write")
+        for index, accesses in sorted(self.accesses.items(), key=lambda item: (-item[1].total(), item[0])):
+            name = f"{index:2d}" + (f"({', '.join(labels[index])})" if index in labels else "")
+            distances = accesses.read_after_write
+            reads = sum(distances.values())
+            mean = f"{sum(d * n for d, n in distances.items()) / reads:.1f}" if reads else "-"
+            print(
+                "{}{} {:>9} {:>7} ({:>7}) {:>7} ({:>7}) {:>8} {:>22}".format(
+                    " " * max(0, 15 - len(name)),
+                    termcolor.colored(name, "blue"),
+                    accesses.total(),
+                    accesses.reads,
+                    accesses.indirect_reads,
+                    accesses.writes,
+                    accesses.indirect_writes,
+                    accesses.pointer_uses,
+                    mean,
+                )
+            )
+
+
 if __name__ == "__main__":
     import doctest
 
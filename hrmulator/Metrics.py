@@ -0,0 +1,321 @@
+"""
+A service that runs programs all day wants to know how it's doing: how many
+runs, how many steps a second, how long a run takes, and how they fail.  Give
+a computer an ExecutorMetrics, and it keeps count, in a Registry that prints
+itself in the OpenMetrics text format, the one Prometheus scrapes:
+
+    >>> from hrmulator.Computer import Computer
+    >>> metrics = ExecutorMetrics()
+    >>> computer = Computer(metrics=metrics)
+    >>> computer.load_program(program_text='''
+    ... START:
+    ...     move_from_inbox
+    ...     add 0
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> computer.set_inbox([1, 2])
+    >>> computer.run()
+    Traceback (most recent call last):
+        ...
+    hrmulator.Memory.MemoryTileIsEmptyError: (0, 'Tile 0 is empty.')
+    >>> computer.memory[0] = 10
+    >>> computer.set_inbox([1, 2])
+    >>> computer.run()
+    >>> print(metrics.registry.exposition(), end='')  # doctest: +ELLIPSIS
+    # TYPE hrmulator_runs counter
+    # HELP hrmulator_runs Runs, however they ended.
+    hrmulator_runs_total 2
+    # TYPE hrmulator_steps counter
+    # HELP hrmulator_steps Steps executed.
+    hrmulator_steps_total 9
+    # TYPE hrmulator_errors counter
+    # HELP hrmulator_errors Runs that failed, by the type of error.
+    hrmulator_errors_total{type="MemoryTileIsEmptyError"} 1
+    ...
+    # TYPE hrmulator_run_seconds histogram
+    # HELP hrmulator_run_seconds How long each run took.
+    hrmulator_run_seconds_bucket{le="0.0001"} ...
+    ...
+    hrmulator_run_seconds_count 2
+    ...
+    # EOF
+
+These are the metrics, all named `hrmulator_...`:
+
+    runs                counter     every run, however it ended
+    steps               counter     the steps they executed
+    errors              counter     the runs that failed, by `type`
+    instructions        counter     the instructions executed, by `opcode`;
+                                    only for computers with `profile=True`,
+                                    from their Profiler (see Profiling.py)
+    steps_per_second    gauge       steps, over the time spent running them
+    run_seconds         histogram   how long each run took
+    assembly_seconds    histogram   how long each program took to assemble,
+                                    when `load_program` didn't find it in the
+                                    AssemblyCache (see AssemblyCache.py)
+
+A run that ends because its inbox is empty, or its outbox has closed, hasn't
+failed.  Only `run` is counted, and `run_batch`, given `metrics`, see
+Batch.py, which counts the runs in every worker, whatever the backend; runs
+taken a slice at a time, with `resume`, aren't.  Nothing is counted while a
+program runs, only before and after, so a computer with metrics is no slower
+for it; without, it doesn't even look.
+
+Any number of computers, in any number of threads, can share one
+ExecutorMetrics.  `Registry.write` writes the lot to a file, for a node
+exporter's textfile collector, say; `Registry.serve` answers for it over HTTP,
+on a port of this machine.
+"""
+import http.server
+import math
+import os
+import tempfile
+import threading
+import time
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+RUN_SECONDS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+ASSEMBLY_SECONDS_BUCKETS = (0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 1.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+class Metric:
+    """Base class for metrics.  Subclasses implement `samples`."""
+
+    kind = None
+
+    def __init__(self, name, help, lock):
+        self.name = name
+        self.help = help
+        self.lock = lock  # the Registry's, held while changing a value
+
+    def exposition(self):
+        lines = [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {self.help}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """
+    A count that only goes up; with a `label`, one count for each value of
+    it.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help, lock, label=None):
+        super().__init__(name, help, lock)
+        self.label = label
+        self.values = {} if label else {None: 0}
+
+    def inc(self, amount=1, label_value=None):
+        with self.lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def value(self, label_value=None):
+        return self.values.get(label_value, 0)
+
+    def samples(self):
+        for label_value, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+            labels = [(self.label, label_value)] if self.label else []
+            yield "_total", labels, value
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, lock):
+        super().__init__(name, help, lock)
+        self.value = 0
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+    def samples(self):
+        yield "", [], self.value
+
+
+class Histogram(Metric):
+    """
+    Counts of the values observed, in `buckets` by how big they are, and their
+    sum.  The buckets are upper bounds, inclusive, and there's always one
+    more, for everything.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, lock, buckets):
+        super().__init__(name, help, lock)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.counts = [0] * len(self.buckets)  # not cumulative: each bucket counts only its own
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for bucket, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        with self.lock:
+            self.counts[bucket] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield "_bucket", [("le", _format_value(float(bound)))], cumulative
+        yield "_sum", [], self.sum
+        yield "_count", [], self.count
+
+
+class Registry:
+    """Metrics, by name, in the order they were made."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def _get(self, metric_class, name, help, *args):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, help, self.lock, *args)
+        if type(metric) is not metric_class:
+            raise ValueError(f'"{name}" is already a {metric.kind}')
+        return metric
+
+    def counter(self, name, help, label=None):
+        """Return the Counter called `name`, made the first time it's asked for."""
+        return self._get(Counter, name, help, label)
+
+    def gauge(self, name, help):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help, buckets=RUN_SECONDS_BUCKETS):
+        return self._get(Histogram, name, help, buckets)
+
+    def exposition(self):
+        """Return every metric, in the OpenMetrics text format."""
+        with self.lock:
+            lines = [line for metric in self.metrics.values() for line in metric.exposition()]
+        return "\n".join(lines + ["# EOF"]) + "\n"
+
+    def write(self, path):
+        """
+        Write `exposition` to the file `path`, all at once: anything reading
+        it sees either the old metrics or the new, never half of each.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.exposition())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def serve(self, port=0, host="127.0.0.1"):
+        """
+        Answer GET requests, for any path, with `exposition`, from a thread of
+        its own, until the server that's returned is `shutdown`.  With port
+        0, any free port will do; it's in `server.server_address`.
+        """
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.exposition().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # a scrape every few seconds would fill the log
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="hrmulator metrics", daemon=True).start()
+        return server
+
+
+class ExecutorMetrics:
+    """The metrics that computers keep, see above, in `registry`."""
+
+    def __init__(self, registry=None):
+        self.registry = registry = registry if registry is not None else Registry()
+        self.runs = registry.counter("hrmulator_runs", "Runs, however they ended.")
+        self.steps = registry.counter("hrmulator_steps", "Steps executed.")
+        self.errors = registry.counter("hrmulator_errors", "Runs that failed, by the type of error.", label="type")
+        self.instructions = registry.counter(
+            "hrmulator_instructions", "Instructions executed by profiled runs, by opcode.", label="opcode"
+        )
+        self.steps_per_second = registry.gauge("hrmulator_steps_per_second", "Steps, over the time spent running.")
+        self.run_seconds = registry.histogram("hrmulator_run_seconds", "How long each run took.")
+        self.assembly_seconds = registry.histogram(
+            "hrmulator_assembly_seconds", "How long each program took to assemble.", ASSEMBLY_SECONDS_BUCKETS
+        )
+
+    def record_run(self, steps, seconds, error=None):
+        self.runs.inc()
+        self.steps.inc(steps)
+        if error is not None:
+            self.errors.inc(label_value=type(error).__name__)
+        self.run_seconds.observe(seconds)
+        if self.run_seconds.sum:
+            self.steps_per_second.set(self.steps.value() / self.run_seconds.sum)
+
+    def run(self, computer, run):
+        """Call `run()`, to run `computer`, and record how it went."""
+        profiler = computer.profiler if computer.profile else None
+        counts = list(profiler.counts) if profiler is not None else None
+        error = None
+        start = time.perf_counter()
+        try:
+            run()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.record_run(computer.total_steps_executed or 0, seconds, error)
+            if computer.profile:
+                self._record_instructions(computer.profiler, counts if computer.profiler is profiler else None)
+
+    def _record_instructions(self, profiler, counts_before):
+        """Count the instructions `profiler` has counted since it had `counts_before`."""
+        by_opcode = {}
+        for step, count in enumerate(profiler.counts):
+            if counts_before is not None:
+                count -= counts_before[step]
+            if count:
+                symbol = profiler.program[step].symbol
+                by_opcode[symbol] = by_opcode.get(symbol, 0) + count
+        for symbol, count in by_opcode.items():
+            self.instructions.inc(count, label_value=symbol)
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,209 @@
+"""
+An Observer watches a computer run: it's told about every step, every value
+taken from the inbox or moved to the outbox, every tile read or written, and
+every error, as it happens.
+
+    >>> from hrmulator.Computer import Computer
+    >>> class Transcript(Observer):
+    ...     def on_inbox(self, computer, value):
+    ...         print('in:', value)
+    ...     def on_outbox(self, computer, value):
+    ...         print('out:', value)
+    ...     def on_write(self, computer, index, value):
+    ...         print(f'tile {index} = {value}')
+    >>> computer = Computer()
+    >>> computer.add_observer(Transcript())
+    >>> computer.load_program(program_text='''
+    ... START:
+    ...     move_from_inbox
+    ...     copy_to 0
+    ...     bump_up 0
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> computer.set_inbox([1, 5])
+    >>> computer.run()
+    in: 1
+    tile 0 = 1
+    tile 0 = 2
+    out: 2
+    in: 5
+    tile 0 = 5
+    tile 0 = 6
+    out: 6
+
+An observer overrides whichever of Observer's methods it wants to hear about,
+and no others; it's only ever called for those.  They're called once the
+instruction has done its work, in this order:
+
+    on_read(computer, index, value)     for each tile the instruction read,
+                                        the pointer first, for indirect access;
+                                        an indirect copy_to reads only that
+    on_write(computer, index, value)    for the tile it wrote
+    on_inbox(computer, value)           for the value it took from the inbox
+    on_outbox(computer, value)          for the value it moved to the outbox
+    on_step(computer, step, instruction)
+                                        for the step itself, with the program
+                                        counter already moved on
+
+    on_error(computer, error)           when the instruction raises, instead
+                                        of all the above, with the program
+                                        counter at the step that failed;
+                                        though not when the inbox runs dry, or
+                                        the outbox closes, which is how
+                                        programs normally stop
+
+A computer with no observers runs just as fast as it ever did: nothing is
+checked, or even looked at, on the way.  With observers, it runs the program
+unfused, without counting loops (see Fusion.py and CountingLoops.py), so
+that every step is seen by itself.  Only the "interpreter" and "linked"
+engines can be observed.
+"""
+from .Instructions import (
+    AbstractInstruction,
+    Add,
+    BumpDown,
+    BumpUp,
+    CopyFrom,
+    CopyTo,
+    InboxIsEmptyError,
+    MoveFromInbox,
+    MoveToOutbox,
+    OutboxIsClosedError,
+    Subtract,
+)
+
+EVENTS = ("on_read", "on_write", "on_inbox", "on_outbox", "on_step", "on_error")
+
+TILE_READERS = (CopyFrom, Add, Subtract, BumpUp, BumpDown)
+TILE_WRITERS = (CopyTo, BumpUp, BumpDown)
+
+
+class Observer:
+    """Base class for observers; see above.  Every method does nothing."""
+
+    def on_read(self, computer, index, value):
+        pass
+
+    def on_write(self, computer, index, value):
+        pass
+
+    def on_inbox(self, computer, value):
+        pass
+
+    def on_outbox(self, computer, value):
+        pass
+
+    def on_step(self, computer, step, instruction):
+        pass
+
+    def on_error(self, computer, error):
+        pass
+
+
+class Hooks:
+    """
+    For each event in EVENTS, the list of the methods to call for it: the
+    ones `observers` override.
+    """
+
+    def __init__(self, observers):
+        for event in EVENTS:
+            do_nothing = getattr(Observer, event)
+            setattr(
+                self,
+                event,
+                [
+                    getattr(observer, event)
+                    for observer in observers
+                    if getattr(type(observer), event, do_nothing) is not do_nothing
+                ],
+            )
+
+    def watch(self, program, original):
+        """
+        Return a copy of `program`, a version of `original`, in which every
+        step is an ObservedStep.
+        """
+        return [ObservedStep(instruction, step, original[step], self) for step, instruction in enumerate(program)]
+
+
+class ObservedStep(AbstractInstruction):
+    """
+    An instruction that calls its hooks once it's executed; or when it
+    raises.  It only does the work for the events that have hooks.
+    """
+
+    def __init__(self, instruction, step, original, hooks):
+        self.instruction = instruction
+        self.step = step
+        self.original = original  # the instruction in the original program, unwrapped
+        self.hooks = hooks
+
+    def __str__(self):
+        return str(self.instruction)
+
+    def colored_str(self):
+        return self.instruction.colored_str()
+
+    def execute(self, computer):
+        self._observe(self.instruction.execute)(computer)
+
+    def link(self, step, linker):
+        return self._observe(self.instruction.link(step, linker))
+
+    def _observe(self, run):
+        """Return a function that calls `run(computer)`, and the hooks."""
+        step = self.step
+        original = self.original
+        hooks = self.hooks
+        kind = type(original)
+        indirect = getattr(original, "indirect", False)
+        reads_tile = kind in TILE_READERS
+        on_read = hooks.on_read if reads_tile or indirect else []  # an indirect write reads its pointer
+        on_write = hooks.on_write if kind in TILE_WRITERS else []
+        on_inbox = hooks.on_inbox if kind is MoveFromInbox else []
+        on_outbox = hooks.on_outbox if kind is MoveToOutbox else []
+        on_step = hooks.on_step
+        on_error = hooks.on_error
+        tiles_watched = bool(on_read or on_write)
+
+        def observed(computer):
+            accumulator = computer.accumulator
+            try:
+                if tiles_watched:
+                    tiles = computer.memory.tiles
+                    pointer = index = computer.memory._resolve_key(original.tile_index)
+                    if indirect:
+                        index = tiles.get(pointer)
+                    value_read = tiles.get(index)
+                result = run(computer)
+            except (InboxIsEmptyError, OutboxIsClosedError):
+                raise
+            except Exception as e:
+                if on_error:
+                    computer.program_counter = step  # as for `on_step`, where hooks can see it
+                for hook in on_error:
+                    hook(computer, e)
+                raise
+            if result is not None:
+                # linked, it returns the next step, and the engine keeps the
+                # program counter to itself, so put it where hooks can see it;
+                # the engine leaves counting observed steps to them, too
+                computer.program_counter = result
+                computer.total_steps_executed += 1
+            for hook in on_read:
+                if indirect:
+                    hook(computer, pointer, tiles[pointer])
+                if reads_tile:
+                    hook(computer, index, value_read)
+            for hook in on_write:
+                hook(computer, index, tiles[index])
+            for hook in on_inbox:
+                hook(computer, computer.accumulator)
+            for hook in on_outbox:
+                hook(computer, accumulator)
+            for hook in on_step:
+                hook(computer, step, original)
+            return result
+
+        return observed
@@ -0,0 +1,126 @@
+"""
+Test inboxes often come in families: each one a longer version of another, or
+several that start out the same way.  Running them one by one runs the
+program over each shared beginning again and again.  `run_shared` runs it
+over each shared beginning just once:
+
+    >>> from hrmulator.Memory import Memory
+    >>> results = run_shared(
+    ...     program_text='''
+    ...     START:
+    ...         move_from_inbox
+    ...         jump_if_zero_to START
+    ...         move_to_outbox
+    ...         jump_to START''',
+    ...     memory=Memory(),
+    ...     inboxes=[[1, 0, 2], [1, 0], [1, 0, 2, 'A'], [], [1, 0, 3]],
+    ... )
+    >>> for result in results:
+    ...     print(result.outbox, result.steps, result.error)
+    [1, 2] 10 None
+    [1] 6 None
+    [1, 2, 'A'] 14 None
+    [] 0 None
+    [1, 3] 10 None
+
+It arranges the inboxes in a trie, and gives a computer the values along
+each of its branches one at a time.  A program can't tell how many values are
+left in its inbox until it asks for one, so until it does, it does exactly
+the same for every inbox that starts the same way.  When it asks, and the
+trie branches, the computer is snapshot, see `Computer.snapshot`, and each
+branch carries on from the snapshot.  So the program only runs as many steps
+as it takes for the whole trie, rather than for every inbox, from the start.
+
+The results are the same BatchResults that `run_batch` returns, see Batch.py,
+with the same outboxes, the same step counts, and the same errors as
+separate runs would have.  A run that stops, or fails, before it gets to the
+end of a shared beginning stops, or fails, the same way for every inbox that
+starts like that; those inboxes share the exception, too.
+
+As with `run_batch`, every run starts from `memory` just as it was given, and
+`memory` itself is left alone.  Only the "interpreter" and "linked" engines
+can share the work, see `Computer.start`.  Everything runs in this process.
+"""
+import copy
+
+from .AssemblyCache import default_cache
+from .Batch import BatchResult
+from .Computer import PAUSED, WAITING, Computer
+from .Memory import Memory
+
+STEPS_PER_SLICE = 1 << 20
+
+
+class _Node:
+    """A node in the trie of inboxes."""
+
+    def __init__(self):
+        self.children = {}  # the next value: the node it leads to
+        self.ends = []  # the positions of the inboxes that end here
+
+
+def run_shared(*, program_path=None, program_text=None, memory=None, inboxes, engine="linked", detect_loops=False):
+    """
+    Run one program against each of `inboxes`, sharing the work for the
+    values they start with in common, and return a list of BatchResults.
+    """
+    program, jump_table = default_cache.assemble(program_path=program_path, program_text=program_text)
+    computer = Computer(engine=engine, detect_loops=detect_loops)
+    computer.program, computer.jump_table = program, jump_table
+    computer.memory = copy.deepcopy(memory if memory is not None else Memory())
+
+    root = _Node()
+    count = 0
+    for count, inbox in enumerate(inboxes, 1):
+        node = root
+        for value in inbox:
+            node = node.children.setdefault(value, _Node())
+        node.ends.append(count - 1)
+    results = [None] * count
+    if not count:
+        return results
+
+    computer.set_inbox([])
+    computer.start()
+    # Depth first, so that a branch's snapshot is restored only after
+    # everything after the branch before it is done.
+    stack = [(None, None, root)]
+    while stack:
+        snapshot, value, node = stack.pop()
+        if snapshot is not None:
+            computer.restore(snapshot)
+        if node is not root:
+            computer.inbox.append(value)
+        try:
+            why = PAUSED
+            while why is PAUSED:
+                why = computer.resume(STEPS_PER_SLICE)
+            error = None
+        except Exception as e:
+            error = e
+        if error is None and why is WAITING:
+            # the inbox is empty: this is where the inboxes that end here stop
+            for index in node.ends:
+                results[index] = BatchResult(list(computer.outbox), computer.total_steps_executed, None)
+            snapshot = computer.snapshot() if len(node.children) > 1 else None
+            for value, child in node.children.items():
+                stack.append((snapshot, value, child))
+        else:
+            # every inbox that starts this way stops, or fails, right here
+            for index in _ends_below(node):
+                results[index] = BatchResult(list(computer.outbox), computer.total_steps_executed, error)
+    return results
+
+
+def _ends_below(node):
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        yield from node.ends
+        nodes.extend(node.children.values())
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
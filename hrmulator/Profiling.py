@@ -0,0 +1,164 @@
+"""
+To make a program faster, first find out where it spends its time.  With
+`profile=True`, a computer counts how many times it executes each step of its
+program, and how many times each conditional jump is taken:
+
+    >>> from hrmulator.Computer import Computer
+    >>> computer = Computer(profile=True)
+    >>> computer.load_program(program_text='''
+    ... START:
+    ...     move_from_inbox
+    ...     jump_if_zero_to START
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> computer.set_inbox([1, 0, 2, 0, 0])
+    >>> computer.run()
+    >>> computer.profiler.counts, computer.profiler.taken
+    ([5, 5, 2, 2], [0, 3, 0, 0])
+    >>> computer.profiler.by_label()
+    {'START': 14}
+
+The counts add up over every run, until the program is loaded again, or
+`computer.profiler` is set to None.  `by_label` rolls them up by label: every
+step counts towards the label it comes after, and steps before any label count
+towards None.  `Computer.print_profile` prints it all, as a program listing
+with every line annotated.
+
+A jump to the very next step can't be told apart from not jumping, so it
+counts as not taken.
+
+Profiling counts every step by itself, so it ignores `fuse`, and doesn't run
+counting loops in one go, see CountingLoops.py; every count is a step
+`total_steps_executed` counts, too.  Only the "interpreter" and "linked"
+engines can profile.  Without `profile`, nothing is counted, and nothing is
+slowed down.
+"""
+import colorama
+
+from .Instructions import AbstractInstruction, JumpIfNegative, JumpIfZero
+
+
+class Profiler:
+    def __init__(self, program, jump_table):
+        self.program = program
+        self.jump_table = jump_table
+        self.counts = [0] * len(program)  # how many times each step was executed
+        self.taken = [0] * len(program)  # how many times each conditional jump jumped
+
+    def watch(self, program):
+        """
+        Return a copy of `program`, a version of this profiler's, in which
+        every step is a ProfiledStep.
+        """
+        return [
+            ProfiledStep(instruction, step, isinstance(original, (JumpIfZero, JumpIfNegative)), self)
+            for step, (instruction, original) in enumerate(zip(program, self.program))
+        ]
+
+    def total(self):
+        return sum(self.counts)
+
+    def by_label(self):
+        """Return a dictionary of the steps executed after each label."""
+        starts = {}
+        for label, step in self.jump_table.items():
+            starts.setdefault(step, []).append(label)
+        rollup = {}
+        labels = [None]
+        for step, count in enumerate(self.counts):
+            labels = starts.get(step, labels)
+            for label in labels:
+                rollup[label] = rollup.get(label, 0) + count
+        if not rollup.get(None):
+            rollup.pop(None, None)
+        return rollup
+
+    def _percent(self, count):
+        total = self.total()
+        return 100 * count / total if total else 0.0
+
+    def print_line(self, step_number, instruction):
+        """The counterpart of `Computer._print_line`, for `Computer.print_profile`."""
+        step = step_number - 1
+        count = self.counts[step]
+        if isinstance(self.program[step], (JumpIfZero, JumpIfNegative)):
+            jumps = f"taken {self.taken[step]}"
+        else:
+            jumps = ""
+        print(
+            "{:>10} {:5.1f}% {:>14}  {}{:03d}:{} {}".format(
+                count,
+                self._percent(count),
+                jumps,
+                colorama.Style.DIM,
+                step_number,
+                colorama.Style.RESET_ALL,
+                instruction.colored_str(),
+            )
+        )
+
+    def print_label(self, step_number, label):
+        """The counterpart of `Computer._print_label`, for `Computer.print_profile`."""
+        count = self.by_label()[label]
+        print(
+            f"{count:>10} {self._percent(count):5.1f}% {'':>14}  {colorama.Fore.GREEN}{label}{colorama.Style.RESET_ALL}:"
+        )
+
+    def print_summary(self):
+        """Print the labels, busiest first, and the total."""
+        for label, count in sorted(self.by_label().items(), key=lambda item: -item[1]):
+            print(f"{count:>10} {self._percent(count):5.1f}%  {label if label is not None else '(before any label)'}")
+        print(f"{self.total():>10} steps in all")
+
+
+class ProfiledStep(AbstractInstruction):
+    """An instruction that has its Profiler count every time it's executed."""
+
+    def __init__(self, instruction, step, conditional, profiler):
+        self.instruction = instruction
+        self.step = step
+        self.conditional = conditional
+        self.profiler = profiler
+
+    def __str__(self):
+        return str(self.instruction)
+
+    def colored_str(self):
+        return self.instruction.colored_str()
+
+    def execute(self, computer):
+        step = self.step
+        self.instruction.execute(computer)
+        self.profiler.counts[step] += 1
+        if self.conditional and computer.program_counter != step + 1:
+            self.profiler.taken[step] += 1
+
+    def link(self, step, linker):
+        linked = self.instruction.link(step, linker)
+        counts = self.profiler.counts
+        taken = self.profiler.taken
+        not_taken = step + 1
+
+        if not self.conditional:
+
+            def profiled_step(computer):
+                next_step = linked(computer)
+                counts[step] += 1
+                return next_step
+
+        else:
+
+            def profiled_step(computer):
+                next_step = linked(computer)
+                counts[step] += 1
+                if next_step != not_taken:
+                    taken[step] += 1
+                return next_step
+
+        return profiled_step
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,134 @@
+"""
+A Scheduler runs any number of computers in one thread, taking turns, so that
+one program that takes forever doesn't hold up all the others.  Each turn,
+it picks the computer that has had the least of its fair share of steps so
+far, and lets it run for a slice of `quantum` steps; see `Computer.resume`.
+
+    >>> import itertools
+    >>> from hrmulator.Computer import Computer
+    >>> def new_computer(inbox):
+    ...     computer = Computer()
+    ...     computer.load_program(program_text='''
+    ...     START:
+    ...         move_from_inbox
+    ...         jump_if_zero_to START
+    ...         move_to_outbox
+    ...         jump_to START''')
+    ...     computer.set_inbox(inbox)
+    ...     return computer
+    >>> scheduler = Scheduler(quantum=100)
+    >>> quick = scheduler.add(new_computer([1, 0, 2]))
+    >>> endless = scheduler.add(new_computer(itertools.repeat(0)), budget=1000)
+    >>> scheduler.run()
+    >>> quick.computer.outbox, quick.steps, quick.error
+    ([1, 2], 10, None)
+    >>> endless.steps, endless.error
+    (1000, StepBudgetExceededError(1000, 'The program took more than 1000 steps.'))
+
+Every computer is added with a `priority`, 1 by default: over time, a
+computer with priority 3 gets three times the steps of one with priority 1,
+for as long as both have steps left to run.  What each computer has had is
+counted in its Task: `steps`, the steps it has run, and `slices`, how many
+turns it has had.  A computer that's added late starts level with the
+others, rather than getting to catch up on all the turns it missed.
+
+A computer can be given a `budget` of steps; one that's still going when
+it's spent them all is stopped, with a StepBudgetExceededError.  (A slice
+may go over the budget by a few steps, when it ends with a superinstruction or
+a counting loop run in one go.)  A computer that fails, for that reason or
+any other, doesn't stop the rest: its Task holds the exception.
+
+A computer is finished when its program stops, or its inbox runs dry.  Only
+computers on the "interpreter" and "linked" engines can be scheduled.
+"""
+import heapq
+import itertools
+
+from .Computer import FINISHED, PAUSED, WAITING
+
+
+class StepBudgetExceededError(Exception):
+    def __init__(self, budget):
+        self.budget = budget
+        super().__init__(budget, f"The program took more than {budget} steps.")
+
+
+class Task:
+    """A computer, as the Scheduler sees it, with what it has had so far."""
+
+    def __init__(self, computer, priority, budget):
+        if priority <= 0:
+            raise ValueError(f"A priority must be more than 0, not {priority}")
+        self.computer = computer
+        self.priority = priority
+        self.budget = budget
+        self.steps = 0
+        self.slices = 0
+        self.finished = False
+        self.error = None
+
+    def __repr__(self):
+        state = "finished" if self.finished else "running"
+        return f"<task, {state} after {self.steps} steps in {self.slices} slices>"
+
+
+class Scheduler:
+    def __init__(self, quantum=1000):
+        self.quantum = quantum
+        # (share, order added, task) of every task that isn't finished,
+        # where share is the steps a task has had, over its priority
+        self.ready = []
+        self.order = itertools.count()
+        self.tasks = []
+
+    def add(self, computer, *, priority=1, budget=None):
+        """Start `computer` running its program, and return its Task."""
+        task = Task(computer, priority, budget)
+        computer.start()
+        share = self.ready[0][0] if self.ready else 0
+        heapq.heappush(self.ready, (share, next(self.order), task))
+        self.tasks.append(task)
+        return task
+
+    def run_slice(self):
+        """
+        Give the computer that's had the least of its share a turn.  Return
+        False if there are none left to run.
+        """
+        if not self.ready:
+            return False
+        share, order, task = heapq.heappop(self.ready)
+        computer = task.computer
+        steps = self.quantum
+        if task.budget is not None:
+            steps = min(steps, task.budget - task.steps)
+        try:
+            why = computer.resume(steps)
+        except Exception as e:
+            why = FINISHED
+            task.error = e
+        steps_run = computer.total_steps_executed - task.steps
+        task.steps = computer.total_steps_executed
+        task.slices += 1
+        if why is PAUSED and task.budget is not None and task.steps >= task.budget:
+            why = FINISHED
+            task.error = StepBudgetExceededError(task.budget)
+        if why is PAUSED:
+            heapq.heappush(self.ready, (share + steps_run / task.priority, order, task))
+        else:
+            # FINISHED, or WAITING for an inbox that nothing will fill
+            task.finished = True
+            if why is WAITING:
+                computer.program_counter = None  # as `run` leaves it
+        return True
+
+    def run(self):
+        """Run every computer until it's finished."""
+        while self.run_slice():
+            pass
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
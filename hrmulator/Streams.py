@@ -0,0 +1,213 @@
+"""
+Normally, a computer's inbox is a list, copied into a deque by `set_inbox`, and
+its outbox is a list that `run` fills up.  Neither has to be.  Give
+`set_inbox` an iterator, or a generator, and the computer pulls values from
+it one at a time, only as `move_from_inbox` asks for them:
+
+    >>> import itertools
+    >>> from hrmulator.Computer import Computer
+    >>> computer = Computer()
+    >>> computer.load_program(program_text='''
+    ... START:
+    ...     move_from_inbox
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> computer.set_inbox(itertools.count())
+    >>> computer.set_outbox(BoundedOutbox(5))
+    >>> computer.run()
+    >>> computer.outbox.values, computer.total_steps_executed
+    ([0, 1, 2, 3, 4], 13)
+
+That inbox never runs dry, and the run only stops because the outbox has had
+enough.  An outbox is anything with `append` and `extend`: a list, a
+`deque(maxlen=n)` that keeps only the last n values, or one of the Outboxes
+here.  An Outbox can close: it raises OutboxIsClosedError, and the run ends
+right there, just the way it ends when `move_from_inbox` finds nothing left.
+That last `move_to_outbox` isn't counted as a step, but the value it moved
+has been delivered all the same.
+
+    BoundedOutbox       keeps values in a list, and closes once it has
+                        `limit` of them
+    CallbackOutbox      calls a function with each value, and closes when
+                        the function returns True
+    GeneratorOutbox     sends each value into a generator, and closes when
+                        the generator returns
+
+So long as neither the inbox nor the outbox holds on to what goes through
+them, a run takes the same memory whether it moves ten values or ten million.
+"""
+from .Instructions import OutboxIsClosedError
+
+
+class Inbox:
+    """
+    Base class for inboxes that a computer takes just as they are, rather than
+    copying them: they hand out values with `popleft`, and their length is
+    zero once there are no more.  See also MappedInbox, in BoxFiles.py, and
+    AsyncInbox, in Async.py.
+    """
+
+    def position(self):
+        """How far along the inbox is; it goes up as values are taken."""
+        return self.taken
+
+    def copy(self):
+        """
+        Return a new inbox that hands out the same values as this one, from
+        here on, without taking them from this one.
+        """
+        raise ValueError(f"{self!r} can't be copied")
+
+
+class StreamingInbox(Inbox):
+    """
+    An inbox that takes its values from an iterator, one at a time, as they
+    are asked for.
+
+    The length of a StreamingInbox is 0 once the iterator is exhausted, and
+    otherwise the number of values read ahead, which is never more than one.
+    """
+
+    def __init__(self, values):
+        self.values = iter(values)
+        self.ahead = []
+        self.taken = 0  # how many values `popleft` has handed out
+
+    def __len__(self):
+        if not self.ahead:
+            for value in self.values:
+                self.ahead.append(value)
+                break
+        return len(self.ahead)
+
+    def popleft(self):
+        if not self.__len__():
+            raise IndexError("pop from an empty inbox")
+        self.taken += 1
+        return self.ahead.pop()
+
+    def __iter__(self):
+        """Iterate over the values read ahead; the rest are still in the stream."""
+        return iter(self.ahead)
+
+    def __repr__(self):
+        return f"<a stream, {self.taken} values taken>"
+
+
+class ListInbox(Inbox):
+    """
+    An inbox of values in a list, that more can be appended to, like a deque,
+    but that counts the values it hands out, so that its `position` only ever
+    goes up.  (A deque's length goes down, and back up again, as values are
+    taken and appended.)
+
+    Copies share the list: each has its own place in it, and its own end.
+    Whichever appends first, at the end of the list, appends in place; any
+    other copies its remaining values into a list of its own first.  So a copy
+    costs next to nothing, and so does going back to one, see
+    `Computer.restore`.
+    """
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.next = 0  # where the next value is, in `values`
+        self.stop = len(self.values)  # where this inbox ends, in `values`
+        self.taken = 0  # how many values `popleft` has handed out
+
+    def __len__(self):
+        return self.stop - self.next
+
+    def popleft(self):
+        if self.next == self.stop:
+            raise IndexError("pop from an empty inbox")
+        value = self.values[self.next]
+        self.next += 1
+        self.taken += 1
+        return value
+
+    def append(self, value):
+        if self.stop != len(self.values):
+            # another copy has appended to the list since this one was made
+            self.values = self.values[self.next : self.stop]
+            self.next, self.stop = 0, len(self.values)
+        self.values.append(value)
+        self.stop += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def copy(self):
+        inbox = ListInbox.__new__(ListInbox)
+        inbox.values, inbox.next, inbox.stop, inbox.taken = self.values, self.next, self.stop, self.taken
+        return inbox
+
+    def __iter__(self):
+        return iter(self.values[self.next : self.stop])
+
+    def __repr__(self):
+        return f"ListInbox({self.values[self.next : self.stop]!r})"
+
+
+class Outbox:
+    """
+    Base class for outboxes that can close.  Subclasses implement `accept`,
+    which returns True once they've had enough.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self.count = 0  # how many values it's been given, closed or not
+
+    def append(self, value):
+        self.count += 1
+        if self.closed or self.accept(value):
+            self.closed = True
+            raise OutboxIsClosedError("The outbox is closed.")
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+
+class BoundedOutbox(Outbox):
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.values = []
+
+    def accept(self, value):
+        self.values.append(value)
+        return len(self.values) >= self.limit
+
+    def __repr__(self):
+        return repr(self.values)
+
+
+class CallbackOutbox(Outbox):
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def accept(self, value):
+        return self.callback(value) is True
+
+
+class GeneratorOutbox(Outbox):
+    def __init__(self, generator):
+        super().__init__()
+        self.generator = generator
+        next(generator)  # run it up to its first `yield`, ready for `send`
+
+    def accept(self, value):
+        try:
+            self.generator.send(value)
+        except StopIteration:
+            return True
+        return False
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,276 @@
+"""
+A trace file records every step of a run, in a compact binary form, so that
+a run that went wrong can be picked apart afterwards, without running it
+again.  A TraceWriter is an Observer (see Observers.py) that records the
+steps of the computer it's given:
+
+    >>> import os, tempfile
+    >>> from hrmulator.Computer import Computer
+    >>> from hrmulator.Memory import Memory
+    >>> path = os.path.join(tempfile.mkdtemp(), "run.hrmtrace")
+    >>> computer = Computer()
+    >>> computer.memory = Memory(values={0: 0})
+    >>> computer.load_program(program_text='''
+    ... START:
+    ...     move_from_inbox
+    ...     add 0
+    ...     copy_to 0
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> computer.set_inbox([1, 2, 'A'])
+    >>> with TraceWriter(path, computer):
+    ...     computer.run()
+    Traceback (most recent call last):
+        ...
+    hrmulator.Instructions.IncompatibleTypesError: You can't add a letter.  What would that even mean?
+    >>> with TraceFile(path) as trace:
+    ...     print(len(trace), trace.error, trace.program_counter)
+    ...     print(trace[2])
+    ...     print(trace.state_at(7))
+    11 IncompatibleTypesError 1
+    TraceRecord(step=2, accumulator=1, tile_index=0, tile_value=1)
+    TraceState(program_counter=2, accumulator=3, total_steps_executed=7, tiles={0: 1}, outbox=[1])
+
+Each step is one record of four signed 64-bit integers: the step executed,
+the accumulator after it, and the index of the tile it wrote, and the value
+it wrote there, or -1 and 0 if it wrote none.  Values are stored as in a box
+file, an integer n as 2n, and a letter c as 2·ord(c) + 1, with one more
+value, EMPTY, for an empty accumulator; see Values.py.  The file is:
+
+    MAGIC   the state to start from   records...   error   trailer   MAGIC
+
+where the state to start from is the number of tiles that aren't empty, the
+index and the value of each, then the accumulator, the program counter, and
+the steps executed so far; the error is the name of the type of exception the
+run failed with, if it did, in UTF-8, padded to a multiple of 8 bytes; and
+the trailer is the number of records, the program counter the run ended at,
+and the length of the error.  All numbers are little-endian.
+
+The writer fills a preallocated array with records, and writes it out to the
+file every `chunk_steps` steps; so a trace takes the same memory, however
+long the run.  A TraceFile reads a trace file through `mmap`, so even a trace
+of many millions of steps opens in no time.  Its records are decoded as
+they're asked for; `state_at` plays the writes back to find the state after
+any number of steps, from the nearest checkpoint before it.  A checkpoint is
+kept every CHECKPOINT_STEPS steps, the first time they're played back, so
+finding any state costs at most that many steps, once the run has been played
+back as far as it.
+
+Tracing, like observing in general, runs the program unfused, without
+counting loops, so every step gets its record.  Make the TraceWriter just
+before the run: it records the state the computer is in then as the state to
+start from.  The outbox isn't part of it; `state_at` only knows what was
+moved to the outbox during the run.  (Only move_to_outbox empties the
+accumulator.)
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+from . import Values
+from .BoxFiles import _little_endian, _view
+from .Observers import Observer
+from .Values import EMPTY
+
+MAGIC = b"HRMTRC01"
+
+FIELDS = 4  # the number of integers in a record
+
+NO_TILE = -1  # the tile index of a step that wrote no tile
+
+CHUNK_STEPS = 1 << 16
+
+CHECKPOINT_STEPS = 1 << 12
+
+TraceRecord = namedtuple("TraceRecord", "step accumulator tile_index tile_value")
+
+TraceState = namedtuple("TraceState", "program_counter accumulator total_steps_executed tiles outbox")
+
+
+def encode(value):
+    return EMPTY if value is None else Values.encode(value)
+
+
+def decode(number):
+    return None if number == EMPTY else Values.decode(number)
+
+
+class TraceWriter(Observer):
+    """
+    Records the steps of `computer` in the trace file `path`, from now until
+    it's closed.
+    """
+
+    def __init__(self, path, computer, chunk_steps=CHUNK_STEPS):
+        self.path = path
+        self.computer = computer
+        self.buffer = array("q", bytes(8 * FIELDS * chunk_steps))
+        self.used = 0  # how many integers of `buffer` are records not yet written
+        self.count = 0  # how many records, written or not
+        self.tile_index = NO_TILE  # the tile the step being executed wrote, if it wrote one
+        self.tile_value = 0
+        self.program_counter = computer.program_counter or 0
+        self.error = None
+        computer.add_observer(self)  # first: it raises for an engine that can't be observed
+        self.file = None
+        try:
+            self.file = open(path, "wb")
+            self.file.write(MAGIC)
+            tiles = computer.memory.tiles
+            start = array("q", [len(tiles)])
+            for index, value in tiles.items():
+                start.extend((index, encode(value)))
+            start.extend((encode(computer.accumulator), self.program_counter, computer.total_steps_executed or 0))
+            self.file.write(_little_endian(start))
+        except BaseException:
+            # leave neither an observer, nor half a trace file, behind
+            computer.remove_observer(self)
+            if self.file is not None:
+                self.file.close()
+                os.remove(path)
+            raise
+
+    def on_write(self, computer, index, value):
+        self.tile_index = index
+        self.tile_value = encode(value)
+
+    def on_step(self, computer, step, instruction):
+        buffer = self.buffer
+        used = self.used
+        buffer[used] = step
+        accumulator = computer.accumulator
+        buffer[used + 1] = EMPTY if accumulator is None else encode(accumulator)
+        buffer[used + 2] = self.tile_index
+        buffer[used + 3] = self.tile_value
+        self.tile_index = NO_TILE
+        self.tile_value = 0
+        self.used = used + FIELDS
+        self.count += 1
+        self.program_counter = computer.program_counter
+        if self.used == len(buffer):
+            self.flush()
+
+    def on_error(self, computer, error):
+        self.error = type(error).__name__
+        self.program_counter = computer.program_counter
+
+    def flush(self):
+        """Write out the records so far."""
+        if sys.byteorder == "little":
+            self.file.write(memoryview(self.buffer)[: self.used])
+        else:
+            self.file.write(_little_endian(self.buffer[: self.used]))
+        self.used = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.computer.remove_observer(self)
+        self.flush()
+        error = (self.error or "").encode("utf-8")
+        self.file.write(error + bytes(-len(error) % 8))
+        self.file.write(struct.pack("<qqq", self.count, self.program_counter, len(error)))
+        self.file.write(MAGIC)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TraceFile:
+    """
+    A trace file, opened for reading; a read-only sequence of TraceRecords.
+
+    `start` is the TraceState the run started from, `program_counter` where
+    it ended, and `error` the name of the type of exception it failed with,
+    or None.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self.map)
+        if size < 2 * len(MAGIC) + 8 * 7 or self.map[: len(MAGIC)] != MAGIC or self.map[-len(MAGIC) :] != MAGIC:
+            self.map.close()
+            raise ValueError(path, f"{path} is not a trace file.")
+        trailer = size - len(MAGIC) - 24
+        self.count, self.program_counter, error_length = struct.unpack_from("<qqq", self.map, trailer)
+        error_start = trailer - error_length - (-error_length % 8)
+        self.error = self.map[error_start : error_start + error_length].decode("utf-8") or None
+
+        (tile_count,) = struct.unpack_from("<q", self.map, len(MAGIC))
+        records_start = len(MAGIC) + 8 * (1 + 2 * tile_count + 3)
+        start = _view(self.map, len(MAGIC) + 8, records_start, "q")
+        tiles = {start[i]: decode(start[i + 1]) for i in range(0, 2 * tile_count, 2)}
+        accumulator, program_counter, steps = (start[2 * tile_count + i] for i in range(3))
+        start.release()
+        self.start = TraceState(program_counter, decode(accumulator), steps, tiles, [])
+        self.records = _view(self.map, records_start, records_start + 8 * FIELDS * self.count, "q")
+        self.checkpoints = [(tiles, 0, accumulator)]
+        # the tiles, the length of the outbox, and the accumulator, encoded,
+        # after every CHECKPOINT_STEPS steps, as far as they've been played back
+        self.outbox = []  # what was moved to the outbox, as far as the last checkpoint
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        i = range(self.count)[index] * FIELDS
+        records = self.records
+        tile_index = records[i + 2]
+        if tile_index == NO_TILE:
+            return TraceRecord(records[i], decode(records[i + 1]), None, None)
+        return TraceRecord(records[i], decode(records[i + 1]), tile_index, decode(records[i + 3]))
+
+    def __iter__(self):
+        return (self[index] for index in range(self.count))
+
+    def state_at(self, steps):
+        """
+        Return the TraceState after the first `steps` steps of the run; 0 is
+        where it started, and `len(self)` where it ended.
+        """
+        if not 0 <= steps <= self.count:
+            raise IndexError(steps, f"The trace is of {self.count} steps, not {steps}.")
+        records = self.records
+        checkpoints = self.checkpoints
+        checkpoint = min(steps // CHECKPOINT_STEPS, len(checkpoints) - 1)
+        tiles, outbox_length, accumulator = checkpoints[checkpoint]
+        tiles = dict(tiles)
+        outbox = self.outbox[:outbox_length]
+        for step in range(checkpoint * CHECKPOINT_STEPS, steps):
+            i = step * FIELDS
+            next_accumulator = records[i + 1]
+            if next_accumulator == EMPTY and accumulator != EMPTY:
+                outbox.append(decode(accumulator))
+            accumulator = next_accumulator
+            if records[i + 2] != NO_TILE:
+                tiles[records[i + 2]] = decode(records[i + 3])
+            if step + 1 == len(checkpoints) * CHECKPOINT_STEPS:
+                checkpoints.append((dict(tiles), len(outbox), accumulator))
+                self.outbox.extend(outbox[len(self.outbox) :])
+        program_counter = records[steps * FIELDS] if steps < self.count else self.program_counter
+        return TraceState(program_counter, decode(accumulator), self.start.total_steps_executed + steps, tiles, outbox)
+
+    def close(self):
+        self.records.release()
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,503 @@
+"""
+Translate an assembled HRM program into the source of a single Python function,
+and compile that.  Where the linked engine (see Linker.py) still calls one
+function per step and keeps the accumulator on the computer, the transpiled
+function keeps the accumulator, the step number, and the step count in local
+variables, and only writes them back to the computer when it returns.
+
+The program is cut into basic blocks: straight runs of instructions that can
+only be entered at the top (step 0, jump destinations, and the step after any
+jump).  A `while` loop picks the block to run with a binary search on the step
+number, then runs the whole block inline:
+
+    >>> from hrmulator.Assembler import Assembler
+    >>> from hrmulator.Memory import Memory
+    >>> program, jump_table = Assembler().assemble_program_text('''
+    ... START:
+    ...     move_from_inbox
+    ...     move_to_outbox
+    ...     jump_to START''')
+    >>> print(Transpiler(program, jump_table, Memory()).source())
+    def transpiled(computer):
+        tiles = computer.memory.tiles
+        inbox = computer.inbox
+        outbox = computer.outbox
+        accumulator = computer.accumulator
+        step = computer.program_counter
+        count = 0
+        base = 0
+        try:
+            while step < 3:
+                base = count
+                # 000: move_from_inbox
+                if not inbox:
+                    raise InboxIsEmptyError("The inbox is empty.")
+                accumulator = inbox.popleft()
+                count += 1
+                # 001: move_to_outbox
+                if accumulator is None:
+                    raise AccumulatorIsEmptyError("The accumulator is empty.")
+                outbox.append(accumulator)
+                accumulator = None
+                count += 1
+                # 002: jump_to START
+                step = 0
+                count += 1
+        except BaseException:
+            step += count - base
+            raise
+        finally:
+            computer.accumulator = accumulator
+            computer.program_counter = step
+            computer.total_steps_executed += count
+    <BLANKLINE>
+
+Within a block `step` still holds the number of the block's first step, so
+when an instruction raises, `count - base` says how far into the block it got,
+and the computer is left pointing at the step that failed, exactly as the
+interpreter would leave it.
+
+Jump destinations and tile labels are resolved while transpiling, just like
+linking; and, just like linking, a jump to nowhere, or a tile label that isn't
+known, only raises if and when the step is reached.  The function is bound to the labels of the memory it was transpiled
+against, but not to the memory itself; compiled functions are cached by their
+source.
+
+The same machinery compiles the superinstructions of Fusion.py: a short,
+straight run of steps becomes one function in the style of a linked step (see
+Linker.py).  That's `compile_fragment`.  And it compiles the loops recorded by
+the JIT (see JIT.py), with guards on the way each jump went: that's
+`compile_trace`.
+"""
+from functools import lru_cache
+
+from .Instructions import (
+    AccumulatorIsEmptyError,
+    Add,
+    BumpDown,
+    BumpUp,
+    CopyFrom,
+    CopyTo,
+    InboxIsEmptyError,
+    IncompatibleTypesError,
+    Jump,
+    JumpIfNegative,
+    JumpIfZero,
+    MoveFromInbox,
+    MoveToOutbox,
+    NoOp,
+    NoSuchJumpDestinationError,
+    Subtract,
+    resolve_destination,
+)
+from .Memory import CantIndirectThroughLetter, CantStoreBadType, MemoryTileIsEmptyError
+from .TypeTools import is_char, is_int_or_char
+
+# Everything the generated source may refer to, besides its own locals.
+NAMESPACE = {
+    "AccumulatorIsEmptyError": AccumulatorIsEmptyError,
+    "CantIndirectThroughLetter": CantIndirectThroughLetter,
+    "CantStoreBadType": CantStoreBadType,
+    "InboxIsEmptyError": InboxIsEmptyError,
+    "IncompatibleTypesError": IncompatibleTypesError,
+    "MemoryTileIsEmptyError": MemoryTileIsEmptyError,
+    "NoSuchJumpDestinationError": NoSuchJumpDestinationError,
+    "is_char": is_char,
+    "is_int_or_char": is_int_or_char,
+}
+
+
+@lru_cache(maxsize=256)
+def compile_source(source, name="transpiled"):
+    """Compile the source of a transpiled program, return the function `name`."""
+    namespace = dict(NAMESPACE)
+    exec(compile(source, "<hrmulator.Transpiler>", "exec"), namespace)
+    return namespace[name]
+
+
+class Transpiler:
+    def __init__(self, program, jump_table, memory, entry=0):
+        """
+        `entry` is the step the function is expected to be started at; it has
+        to be the top of a block, so if you intend to start somewhere other
+        than step 0, say so here.
+        """
+        self.program = program
+        self.jump_table = jump_table
+        self.memory = memory
+        self.entry = entry
+        self.lines = None
+
+    def compile(self):
+        """Return a function that runs the program on a computer."""
+        return compile_source(self.source())
+
+    def source(self):
+        self.lines = []
+        self._emit(0, "def transpiled(computer):")
+        self._emit(1, "tiles = computer.memory.tiles")
+        self._emit(1, "inbox = computer.inbox")
+        self._emit(1, "outbox = computer.outbox")
+        self._emit(1, "accumulator = computer.accumulator")
+        self._emit(1, "step = computer.program_counter")
+        self._emit(1, "count = 0")
+        self._emit(1, "base = 0")
+        self._emit(1, "try:")
+        self._emit(2, f"while step < {len(self.program)}:")
+        self._emit(3, "base = count")
+        leaders = self._find_leaders()
+        if leaders:
+            self._emit_dispatch(leaders, 0, len(leaders), 3)
+        else:
+            self._emit(3, "pass")
+        self._emit(1, "except BaseException:")
+        self._emit(2, "step += count - base")
+        self._emit(2, "raise")
+        self._emit(1, "finally:")
+        self._emit(2, "computer.accumulator = accumulator")
+        self._emit(2, "computer.program_counter = step")
+        self._emit(2, "computer.total_steps_executed += count")
+        return "\n".join(self.lines) + "\n"
+
+    def compile_fragment(self, step, parts):
+        """
+        Return a linked step that executes `parts`, the instructions at `step`
+        and following, all at once.
+
+        Like any linked step it takes the computer, and returns the next step
+        number; it credits the computer with all but one of the steps it
+        executes, leaving the last to the caller.  If any part but the first
+        raises, the step quietly returns the number of the part that failed,
+        so that the caller can execute that part all by itself and have it
+        raise again.
+        """
+        return compile_source(self.fragment_source(step, parts), "make")(self.memory.tiles)
+
+    def fragment_source(self, step, parts):
+        self.lines = []
+        self._emit(0, "def make(tiles):")
+        self._emit(1, "def fragment(computer):")
+        if any(isinstance(part, MoveFromInbox) for part in parts):
+            self._emit(2, "inbox = computer.inbox")
+        if any(isinstance(part, MoveToOutbox) for part in parts):
+            self._emit(2, "outbox = computer.outbox")
+        self._emit(2, "accumulator = computer.accumulator")
+        self._emit(2, f"step = {step + len(parts)}")
+        self._emit(2, "count = 0")
+        self._emit(2, "try:")
+        for offset, part in enumerate(parts):
+            self._emit(3, f"# {step + offset:03d}: {self._describe(part)}")
+            self._emit_instruction(part, step + offset, 3)
+        self._emit(2, "except Exception:")
+        self._emit(3, "if not count:")
+        self._emit(4, "raise")
+        self._emit(3, "computer.accumulator = accumulator")
+        self._emit(3, "computer.total_steps_executed += count - 1")
+        self._emit(3, f"return {step} + count")
+        self._emit(2, "computer.accumulator = accumulator")
+        self._emit(2, f"computer.total_steps_executed += {len(parts) - 1}")
+        self._emit(2, "return step")
+        self._emit(1, "return fragment")
+        return "\n".join(self.lines) + "\n"
+
+    def compile_trace(self, trace):
+        """
+        Return a linked step that runs the loop recorded in `trace`, a list of
+        (step, next step) pairs that begins and ends at the loop's head, round
+        and round, for as long as every jump goes the way it went when it was
+        recorded.
+
+        It keeps the same bargain as `compile_fragment`: all but one of the
+        steps it executes are credited to the computer, and if an instruction
+        raises (other than the very first) it returns that instruction's step
+        number, to be executed all over again by the caller.
+        """
+        return compile_source(self.trace_source(trace), "make")(self.memory.tiles)
+
+    def trace_source(self, trace):
+        parts = [self.program[step] for step, next_step in trace]
+        self.lines = []
+        self._emit(0, "def make(tiles):")
+        self._emit(1, "def trace(computer):")
+        if any(isinstance(part, MoveFromInbox) for part in parts):
+            self._emit(2, "inbox = computer.inbox")
+        if any(isinstance(part, MoveToOutbox) for part in parts):
+            self._emit(2, "outbox = computer.outbox")
+        self._emit(2, "accumulator = computer.accumulator")
+        self._emit(2, "count = 0")
+        self._emit(2, "base = 0")
+        self._emit(2, "try:")
+        self._emit(3, "while True:")
+        self._emit(4, "base = count")
+        for (step, next_step), part in zip(trace, parts):
+            self._emit(4, f"# {step:03d}: {self._describe(part)}")
+            if isinstance(part, (JumpIfZero, JumpIfNegative)):
+                self._emit_guard(part, step, next_step, 4)
+            elif isinstance(part, Jump):
+                self._emit(4, "count += 1")
+            else:
+                self._emit_instruction(part, step, 4)
+        self._emit(2, "except Exception:")
+        self._emit(3, "if not count:")
+        self._emit(4, "raise")
+        self._emit(3, "computer.accumulator = accumulator")
+        self._emit(3, "computer.total_steps_executed += count - 1")
+        self._emit(3, f"return {tuple(step for step, next_step in trace)!r}[count - base]")
+        self._emit(2, "computer.accumulator = accumulator")
+        self._emit(2, "computer.total_steps_executed += count - 1")
+        self._emit(2, "return step")
+        self._emit(1, "return trace")
+        return "\n".join(self.lines) + "\n"
+
+    def _emit_guard(self, instruction, step, next_step, indent):
+        """A conditional jump that leaves the trace if it doesn't go to `next_step`."""
+        destination = self._destination(instruction)
+        condition = "accumulator == 0" if isinstance(instruction, JumpIfZero) else "accumulator < 0"
+        if destination is None:
+            # it can only have been recorded going on to the next step
+            self._emit_assert_accumulator_is_not_empty(indent)
+            self._emit(indent, f"if {condition}:")
+            self._emit_no_such_destination(instruction, indent + 1)
+            self._emit(indent, "count += 1")
+            return
+        if destination == step + 1:
+            # it goes to the same place either way
+            self._emit_assert_accumulator_is_not_empty(indent)
+            self._emit(indent, condition)
+            self._emit(indent, "count += 1")
+            return
+        if next_step == destination:
+            condition, exit_step = f"not ({condition})", step + 1
+        else:
+            exit_step = destination
+        self._emit_assert_accumulator_is_not_empty(indent)
+        self._emit(indent, f"if {condition}:")
+        self._emit(indent + 1, "count += 1")
+        self._emit(indent + 1, f"step = {exit_step}")
+        self._emit(indent + 1, "break")
+        self._emit(indent, "count += 1")
+
+    def _emit(self, indent, text):
+        self.lines.append("    " * indent + text)
+
+    def _destination(self, instruction):
+        """Return the step `instruction` jumps to, or None if there's no such step."""
+        try:
+            return resolve_destination(instruction.destination_pc, self.jump_table, len(self.program))
+        except NoSuchJumpDestinationError:
+            return None
+
+    def _emit_no_such_destination(self, instruction, indent):
+        """Raise just what the interpreter raises when `instruction` jumps to nowhere."""
+        try:
+            resolve_destination(instruction.destination_pc, self.jump_table, len(self.program))
+        except NoSuchJumpDestinationError as e:
+            self._emit(indent, f"raise NoSuchJumpDestinationError(*{e.args!r})")
+
+    def _find_leaders(self):
+        """Return the sorted step numbers at which a block begins."""
+        leaders = {self.entry} if self.entry < len(self.program) else set()
+        if self.program:
+            leaders.add(0)
+        for step, instruction in enumerate(self.program):
+            if isinstance(instruction, Jump):
+                destination = self._destination(instruction)
+                if destination is not None:
+                    leaders.add(destination)
+                if step + 1 < len(self.program):
+                    leaders.add(step + 1)
+        return sorted(leaders)
+
+    def _emit_dispatch(self, leaders, low, high, indent):
+        """Binary search on `step` for the block to run, then run it."""
+        if high - low == 1:
+            end = leaders[high] if high < len(leaders) else len(self.program)
+            self._emit_block(leaders[low], end, indent)
+            return
+        middle = (low + high) // 2
+        self._emit(indent, f"if step < {leaders[middle]}:")
+        self._emit_dispatch(leaders, low, middle, indent + 1)
+        self._emit(indent, "else:")
+        self._emit_dispatch(leaders, middle, high, indent + 1)
+
+    def _emit_block(self, start, end, indent):
+        for step in range(start, end):
+            instruction = self.program[step]
+            self._emit(indent, f"# {step:03d}: {self._describe(instruction)}")
+            self._emit_instruction(instruction, step, indent)
+        if not isinstance(self.program[end - 1], Jump):
+            self._emit(indent, f"step = {end}")
+
+    def _describe(self, instruction):
+        """Like `str`, but without the colors `Jump.__str__` puts around a label."""
+        if isinstance(instruction, Jump):
+            return f"{instruction.symbol} {instruction.destination_pc}"
+        return str(instruction)
+
+    def _emit_instruction(self, instruction, step, indent):
+        emitter = self.EMITTERS.get(type(instruction))
+        if emitter is None:
+            raise TypeError(
+                instruction,
+                f'Step {step}, "{self._describe(instruction)}", is a {type(instruction).__name__}, '
+                "which the transpiler doesn't know how to translate.",
+            )
+        tile_index = None
+        if hasattr(instruction, "tile_index"):
+            try:
+                tile_index = self.memory._resolve_key(instruction.tile_index)
+            except KeyError:
+                # Leave it to `execute` to raise the KeyError, along with
+                # anything else that's wrong, in the right order.
+                self._emit(indent, "computer.accumulator = accumulator")
+                self._emit(indent, f"computer.program[{step}].execute(computer)")
+                return
+        emitter(self, instruction, step, tile_index, indent)
+
+    def _emit_assert_accumulator_is_not_empty(self, indent):
+        self._emit(indent, "if accumulator is None:")
+        self._emit(indent + 1, 'raise AccumulatorIsEmptyError("The accumulator is empty.")')
+
+    def _emit_read(self, instruction, tile_index, indent):
+        """Leave the value of the tile in `value`, and for indirection its index in `pointer`."""
+        key = instruction.tile_index
+        if instruction.indirect:
+            self._emit(indent, f"pointer = tiles.get({tile_index})")
+            self._emit(indent, "if pointer is None:")
+            self._emit(indent + 1, f"raise MemoryTileIsEmptyError({key!r}, {f'Tile {key} is empty.'!r})")
+            self._emit(indent, "if type(pointer) is str:")
+            self._emit(indent + 1, "raise CantIndirectThroughLetter()")
+            self._emit(indent, "value = tiles.get(pointer)")
+            self._emit(indent, "if value is None:")
+            self._emit(indent + 1, 'raise MemoryTileIsEmptyError(pointer, f"Tile {pointer} is empty.")')
+        else:
+            self._emit(indent, f"value = tiles.get({tile_index})")
+            self._emit(indent, "if value is None:")
+            self._emit(indent + 1, f"raise MemoryTileIsEmptyError({key!r}, {f'Tile {key} is empty.'!r})")
+
+    def _emit_no_op(self, instruction, step, tile_index, indent):
+        self._emit(indent, "count += 1")
+
+    def _emit_move_from_inbox(self, instruction, step, tile_index, indent):
+        self._emit(indent, "if not inbox:")
+        self._emit(indent + 1, 'raise InboxIsEmptyError("The inbox is empty.")')
+        self._emit(indent, "accumulator = inbox.popleft()")
+        self._emit(indent, "count += 1")
+
+    def _emit_move_to_outbox(self, instruction, step, tile_index, indent):
+        self._emit_assert_accumulator_is_not_empty(indent)
+        self._emit(indent, "outbox.append(accumulator)")
+        self._emit(indent, "accumulator = None")
+        self._emit(indent, "count += 1")
+
+    def _emit_copy_from(self, instruction, step, tile_index, indent):
+        self._emit_read(instruction, tile_index, indent)
+        self._emit(indent, "accumulator = value")
+        self._emit(indent, "count += 1")
+
+    def _emit_copy_to(self, instruction, step, tile_index, indent):
+        self._emit_assert_accumulator_is_not_empty(indent)
+        self._emit(indent, "if not is_int_or_char(accumulator):")
+        self._emit(indent + 1, "raise CantStoreBadType()")
+        if instruction.indirect:
+            self._emit(indent, f"pointer = tiles.get({tile_index})")
+            self._emit(indent, "if pointer is None:")
+            self._emit(indent + 1, f"raise MemoryTileIsEmptyError({tile_index}, 'Tile {tile_index} is empty.')")
+            self._emit(indent, "if type(pointer) is str:")
+            self._emit(indent + 1, "raise CantIndirectThroughLetter()")
+            self._emit(indent, "tiles[pointer] = accumulator")
+        else:
+            self._emit(indent, f"tiles[{tile_index}] = accumulator")
+        self._emit(indent, "count += 1")
+
+    def _emit_add(self, instruction, step, tile_index, indent):
+        self._emit_assert_accumulator_is_not_empty(indent)
+        self._emit_read(instruction, tile_index, indent)
+        self._emit(indent, "if type(value) is str or is_char(accumulator):")
+        self._emit(indent + 1, 'raise IncompatibleTypesError("You can\'t add a letter.  What would that even mean?")')
+        self._emit(indent, "accumulator += value")
+        self._emit(indent, "count += 1")
+
+    def _emit_subtract(self, instruction, step, tile_index, indent):
+        self._emit_assert_accumulator_is_not_empty(indent)
+        self._emit_read(instruction, tile_index, indent)
+        self._emit(indent, "if type(value) is str:")
+        self._emit(indent + 1, "if not is_char(accumulator):")
+        self._emit(
+            indent + 2,
+            'raise IncompatibleTypesError("You can\'t subtract (from) a letter.  What would that even mean?")',
+        )
+        self._emit(indent + 1, "accumulator = ord(accumulator) - ord(value)")
+        self._emit(indent, "else:")
+        self._emit(indent + 1, "if is_char(accumulator):")
+        self._emit(
+            indent + 2,
+            'raise IncompatibleTypesError("You can\'t subtract (from) a letter.  What would that even mean?")',
+        )
+        self._emit(indent + 1, "accumulator -= value")
+        self._emit(indent, "count += 1")
+
+    def _emit_bump(self, instruction, tile_index, indent, operator, message):
+        self._emit_read(instruction, tile_index, indent)
+        self._emit(indent, "if type(value) is str:")
+        self._emit(indent + 1, f"raise IncompatibleTypesError({message!r})")
+        self._emit(indent, f"accumulator = value {operator} 1")
+        if instruction.indirect:
+            self._emit(indent, "tiles[pointer] = accumulator")
+        else:
+            self._emit(indent, f"tiles[{tile_index}] = accumulator")
+        self._emit(indent, "count += 1")
+
+    def _emit_bump_up(self, instruction, step, tile_index, indent):
+        self._emit_bump(instruction, tile_index, indent, "+", "You can't add to a letter.  What would that even mean?")
+
+    def _emit_bump_down(self, instruction, step, tile_index, indent):
+        self._emit_bump(
+            instruction, tile_index, indent, "-", "You can't subtract from a letter.  What would that even mean?"
+        )
+
+    def _emit_jump(self, instruction, step, tile_index, indent):
+        destination = self._destination(instruction)
+        if destination is None:
+            self._emit_no_such_destination(instruction, indent)
+            return
+        self._emit(indent, f"step = {destination}")
+        self._emit(indent, "count += 1")
+
+    def _emit_jump_if(self, instruction, step, indent, condition):
+        destination = self._destination(instruction)
+        self._emit_assert_accumulator_is_not_empty(indent)
+        if destination is None:
+            self._emit(indent, f"if {condition}:")
+            self._emit_no_such_destination(instruction, indent + 1)
+            self._emit(indent, f"step = {step + 1}")
+        else:
+            self._emit(indent, f"step = {destination} if {condition} else {step + 1}")
+        self._emit(indent, "count += 1")
+
+    def _emit_jump_if_zero(self, instruction, step, tile_index, indent):
+        self._emit_jump_if(instruction, step, indent, "accumulator == 0")
+
+    def _emit_jump_if_negative(self, instruction, step, tile_index, indent):
+        self._emit_jump_if(instruction, step, indent, "accumulator < 0")
+
+    EMITTERS = {
+        NoOp: _emit_no_op,
+        MoveFromInbox: _emit_move_from_inbox,
+        MoveToOutbox: _emit_move_to_outbox,
+        CopyFrom: _emit_copy_from,
+        CopyTo: _emit_copy_to,
+        Add: _emit_add,
+        Subtract: _emit_subtract,
+        BumpUp: _emit_bump_up,
+        BumpDown: _emit_bump_down,
+        Jump: _emit_jump,
+        JumpIfZero: _emit_jump_if_zero,
+        JumpIfNegative: _emit_jump_if_negative,
+    }
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,61 @@
+"""
+A value, an integer or a letter, as a single integer: an integer n is tagged
+as 2n, and a letter c as 2·ord(c) + 1.  The lowest bit says which it is.
+
+    >>> encode(5), encode(-3), encode('A')
+    (10, -6, 131)
+    >>> decode(10), decode(-6), decode(131)
+    (5, -3, 'A')
+
+The game's arithmetic works on tagged values just as they are; only the type
+checks are different, and they're a bit test:
+
+    adding          2a + 2b = 2(a + b), for two integers; `(a | b) & 1` is 0
+                    when the game allows it
+    subtracting     2a - 2b = 2(a - b), and for two letters, the integer the
+                    game says it is, (2·ord(c) + 1) - (2·ord(d) + 1) =
+                    2(ord(c) - ord(d)); `(a ^ b) & 1` is 0 when it's allowed
+    bumping         adds or subtracts ONE, the tagged 1
+    jumping         0 is the tagged 0, and a tagged integer is negative
+                    exactly when the integer is
+
+    >>> decode(encode('C') - encode('A')), decode(encode(7) - encode(-2))
+    (2, 9)
+
+Box files (see BoxFiles.py), trace files (see TraceFiles.py), and the lanes
+of the lockstep executor (see Lockstep.py) keep values this way, and nothing
+else does.  The engines themselves, "interpreter", "linked", "transpiled",
+"bytecode", and "jit", never see a tagged value: they keep the integers and
+letters themselves, which are what a computer's accumulator, inbox, and
+outbox, and a memory's tiles, hold for everyone else to see, and they check
+types just as they always have.  Values are only encoded, and decoded again,
+on the way in and out of the three above.
+"""
+
+ONE = 2  # the tagged 1
+
+EMPTY = -(2**63)
+# An empty tile, or accumulator, where tagged values are kept in 64 bits.  It's
+# the tagged -2**62, so it only stands for nothing where values stay smaller
+# than that; and it's even, like an integer, so it has to be checked for by
+# itself.
+
+
+def encode(value):
+    """Return the tagged `value`: an integer, or a single character."""
+    if type(value) is int:
+        return value << 1
+    if type(value) is str and len(value) == 1:
+        return ord(value) << 1 | 1
+    raise ValueError(value, "Only integers and single characters can be tagged.")
+
+
+def decode(tagged):
+    """Return the integer, or the letter, that `tagged` is."""
+    return chr(tagged >> 1) if tagged & 1 else tagged >> 1
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
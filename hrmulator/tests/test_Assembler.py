@@ -1,6 +1,15 @@
+import os
+import pickle
+import tempfile
 from unittest import TestCase
 
 import hrmulator
+from hrmulator.Assembler import (
+    ArgumentRequiredError,
+    SyntaxError,
+    UnexpectedArgumentError,
+    UnknownInstructionError,
+)
 
 
 class TestAssembler(TestCase):
@@ -40,3 +49,49 @@ class TestAssembler(TestCase):
         bad_assembly = """; gorf forble gitz"""
         with self.assertRaises(hrmulator.Assembler.SyntaxError):
             program, jump_table = self.assembler.assemble_program_text(bad_assembly)
+
+    def test_raises_syntax_error_for_an_indirect_place(self):
+        with self.assertRaises(hrmulator.Assembler.SyntaxError):
+            self.assembler.assemble_program_text("START:\njump_to [START]")
+
+    def test_everything_on_one_line(self):
+        program, jump_table = self.assembler.assemble_program_text(
+            "  START:  # the top\n\tCOPY_TO [ptr] # a\nadd 5\nLOOP:ignored\n  jump_if_zero_to   LOOP  \r"
+        )
+        self.assertEqual([(type(i).__name__, i.indirect) for i in program[:2]], [("CopyTo", True), ("Add", False)])
+        self.assertEqual((program[0].tile_index, program[1].tile_index, program[2].destination_pc), ("ptr", 5, "LOOP"))
+        self.assertEqual(dict(jump_table), {"START": 0, "LOOP": 2})
+
+    def test_errors_pickle(self):
+        error = pickle.loads(pickle.dumps(UnknownInstructionError(3, "fly")))
+        self.assertEqual((error.line_number, error.text, str(error)), (3, "fly", 'Unknown instruction, line 3: "fly"'))
+
+    def test_assemble_directory(self):
+        directory = tempfile.mkdtemp()
+        for name, text in (
+            ("good.hrm", "START:\nmove_from_inbox\nmove_to_outbox\njump_to START"),
+            ("bad.hrm", "copy_from\nmove_from_inbox 2\nno_op\nfly\n; gorf"),
+            ("notes.txt", "not a program"),
+        ):
+            with open(os.path.join(directory, name), "w") as f:
+                f.write(text)
+        os.mkdir(os.path.join(directory, "directory.hrm"))
+        bad, good = self.assembler.assemble_directory(directory)
+
+        self.assertEqual(good.path, os.path.join(directory, "good.hrm"))
+        self.assertEqual((len(good.program), dict(good.jump_table), good.errors), (3, {"START": 0}, []))
+        self.assertEqual((bad.program, bad.jump_table), (None, None))
+        self.assertEqual(
+            [(type(error), error.line_number) for error in bad.errors],
+            [(ArgumentRequiredError, 1), (UnexpectedArgumentError, 2), (UnknownInstructionError, 4), (SyntaxError, 5)],
+        )
+
+    def test_files_are_read_a_line_at_a_time(self):
+        text = "START:\n    copy_from [0]  # hi\n    jump_to START\n"
+        path = os.path.join(tempfile.mkdtemp(), "program.hrm")
+        with open(path, "w") as f:
+            f.write(text)
+        from_file = self.assembler.assemble_program_file(path)
+        from_text = self.assembler.assemble_program_text(text)
+        self.assertEqual([str(i) for i in from_file[0]], [str(i) for i in from_text[0]])
+        self.assertEqual(from_file[1], from_text[1])
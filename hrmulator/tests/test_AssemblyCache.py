@@ -0,0 +1,148 @@
+import copy
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from hrmulator.Assembler import Assembler, UnknownInstructionError
+from hrmulator.AssemblyCache import AssemblyCache, file_key, key, normalize
+from hrmulator.Bytecode import BytecodeProgram
+from hrmulator.Computer import Computer
+from hrmulator.Metrics import ExecutorMetrics
+from hrmulator.tests import test_integration_000
+
+COPY = """
+START:
+    move_from_inbox
+    move_to_outbox
+    jump_to START"""
+
+COPY_REFORMATTED = """
+
+# copy the inbox to the outbox
+START:      # the top
+\tmove_from_inbox
+    move_to_outbox   \r
+    jump_to    START
+"""
+
+
+class TestAssemblyCache(TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize(COPY), "START:\nmove_from_inbox\nmove_to_outbox\njump_to START")
+        self.assertEqual(key(COPY_REFORMATTED), key(COPY))
+        self.assertNotEqual(key(COPY.replace("START", "start")), key(COPY))
+
+    def test_hits_and_misses(self):
+        cache = AssemblyCache()
+        program, jump_table = cache.assemble(program_text=COPY)
+        for text in (COPY, COPY_REFORMATTED):
+            again, again_jump_table = cache.assemble(program_text=text)
+            self.assertEqual([str(i) for i in again], [str(i) for i in program])
+            self.assertEqual(again_jump_table, jump_table)
+        cache.assemble(program_text=test_integration_000.program_text)
+        self.assertEqual((cache.hits, cache.disk_hits, cache.misses), (2, 0, 2))
+
+    def test_every_caller_gets_its_own_program(self):
+        cache = AssemblyCache()
+        program, jump_table = cache.assemble(program_text=COPY)
+        program.pop()
+        jump_table["ELSEWHERE"] = 0
+        again, again_jump_table = cache.assemble(program_text=COPY)
+        self.assertEqual(len(again), 3)
+        self.assertEqual(list(again_jump_table), ["START"])
+
+    def test_bytecode_is_encoded_once(self):
+        cache = AssemblyCache()
+        bytecode, jump_table = cache.assemble(program_text=COPY, bytecode=True)
+        self.assertIsInstance(bytecode, BytecodeProgram)
+        self.assertIs(cache.assemble(program_text=COPY_REFORMATTED, bytecode=True)[0], bytecode)
+        self.assertIsInstance(cache.assemble(program_text=COPY)[0], list)
+        cache.clear()
+        self.assertIsNot(cache.assemble(program_text=COPY, bytecode=True)[0], bytecode)
+
+    def test_errors_are_not_kept(self):
+        cache = AssemblyCache()
+        for text, line_number in (("START:\nfly_away", 2), ("\n\nSTART:\nfly_away", 4)):
+            with self.assertRaises(UnknownInstructionError) as raised:
+                cache.assemble(program_text=text)
+            self.assertEqual(raised.exception.line_number, line_number)
+        self.assertEqual((cache.hits, cache.misses, len(cache.programs)), (0, 0, 0))
+
+    def test_least_recently_used_goes_first(self):
+        cache = AssemblyCache(maxsize=2)
+        for text in ("no_op", "move_from_inbox", "no_op", "move_to_outbox", "no_op", "move_from_inbox"):
+            cache.assemble(program_text=text)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(len(cache.programs), 2)
+
+        nothing_kept = AssemblyCache(maxsize=0)
+        nothing_kept.assemble(program_text=COPY)
+        nothing_kept.assemble(program_text=COPY)
+        self.assertEqual((nothing_kept.hits, nothing_kept.misses), (0, 2))
+
+    def test_directory_is_shared(self):
+        directory = tempfile.mkdtemp()
+        AssemblyCache(directory=directory).assemble(program_text=COPY)
+        other = AssemblyCache(directory=directory)
+        program, jump_table = other.assemble(program_text=COPY_REFORMATTED)
+        self.assertEqual([i.symbol for i in program], ["move_from_inbox", "move_to_outbox", "jump_to"])
+        self.assertEqual(jump_table, {"START": 0})
+        self.assertEqual((other.hits, other.disk_hits, other.misses), (0, 1, 0))
+        self.assertEqual([name for name in os.listdir(directory)], [f"{key(COPY)}.pickle"])
+
+    def test_unreadable_files_are_assembled_again(self):
+        directory = tempfile.mkdtemp()
+        with open(os.path.join(directory, f"{key(COPY)}.pickle"), "wb") as f:
+            f.write(b"not a pickle")
+        cache = AssemblyCache(directory=directory)
+        program, _ = cache.assemble(program_text=COPY)
+        self.assertEqual(len(program), 3)
+        self.assertEqual((cache.disk_hits, cache.misses), (0, 1))
+        self.assertEqual(AssemblyCache(directory=directory).assemble(program_text=COPY)[0][2].destination_pc, "START")
+
+    def test_files(self):
+        cache = AssemblyCache()
+        path = os.path.join(tempfile.mkdtemp(), "copy.hrm")
+        for text, length in ((COPY, 3), (COPY + "\n    no_op", 4), (COPY, 3)):
+            with open(path, "w") as f:
+                f.write(text)
+            self.assertEqual(len(cache.assemble(program_path=path)[0]), length)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_files_are_read_a_line_at_a_time(self):
+        path = os.path.join(tempfile.mkdtemp(), "copy.hrm")
+        with open(path, "w") as f:
+            f.write(COPY_REFORMATTED)
+        self.assertEqual(file_key(path), key(COPY))
+        cache = AssemblyCache()
+        with patch.object(Assembler, "assemble_program_text") as assemble_program_text:
+            program, jump_table = cache.assemble(program_path=path)
+        assemble_program_text.assert_not_called()
+        self.assertEqual(
+            [str(instruction) for instruction in program], [str(i) for i in cache.assemble(program_text=COPY)[0]]
+        )
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_only_assembling_is_timed(self):
+        metrics = ExecutorMetrics()
+        cache = AssemblyCache()
+        for text in (COPY, COPY_REFORMATTED, COPY):
+            cache.assemble(program_text=text, metrics=metrics)
+        self.assertEqual(metrics.assembly_seconds.count, 1)
+
+    def test_copies_start_out_empty(self):
+        cache = AssemblyCache(maxsize=5)
+        cache.assemble(program_text=COPY)
+        copied = copy.deepcopy(cache)
+        self.assertEqual((copied.maxsize, len(copied.programs)), (5, 0))
+
+    def test_computers_load_from_the_cache(self):
+        cache = AssemblyCache()
+        for _ in range(3):
+            computer = Computer(assembly_cache=cache)
+            computer.load_program(program_text=COPY)
+            computer.set_inbox([1, "A"])
+            computer.run()
+            self.assertEqual(computer.outbox, [1, "A"])
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
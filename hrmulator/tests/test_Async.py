@@ -0,0 +1,140 @@
+import asyncio
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.Async import AsyncInbox, AsyncOutbox
+from hrmulator.Instructions import AccumulatorIsEmptyError
+from hrmulator.LoopDetection import InfiniteLoopError
+from hrmulator.Memory import Memory
+from hrmulator.tests import test_integration_002
+
+COPY = """
+START:
+    move_from_inbox
+    move_to_outbox
+    jump_to START"""
+
+SPIN = """
+START:
+    copy_from 0
+    jump_if_zero_to START
+    move_from_inbox"""
+
+
+def new_computer(program_text, memory=None, **options):
+    computer = hrmulator.Computer(**options)
+    computer.memory = memory if memory is not None else Memory()
+    computer.load_program(program_text=program_text)
+    return computer
+
+
+class TestAsync(TestCase):
+    def test_every_way_agrees_with_run(self):
+        inbox = [30, -30, 0, 5]
+        expected = new_computer(test_integration_002.program_text, Memory(labels={"counter": 0}))
+        expected.set_inbox(inbox)
+        expected.run()
+        for engine in ("interpreter", "linked"):
+            for fuse in (False, True):
+                for steps_per_slice in (1, 7, 10000):
+                    computer = new_computer(
+                        test_integration_002.program_text, Memory(labels={"counter": 0}), engine=engine, fuse=fuse
+                    )
+
+                    async def values():
+                        for value in inbox:
+                            await asyncio.sleep(0)
+                            yield value
+
+                    computer.set_inbox(values())
+                    self.assertIsInstance(computer.inbox, AsyncInbox)
+                    asyncio.run(computer.run_async(steps_per_slice))
+                    self.assertEqual(computer.outbox, expected.outbox)
+                    self.assertEqual(computer.total_steps_executed, expected.total_steps_executed)
+                    self.assertIsNone(computer.program_counter)
+
+    def test_queues(self):
+        async def main():
+            requests, responses = asyncio.Queue(), asyncio.Queue(maxsize=1)
+            computer = new_computer(COPY)
+            computer.set_inbox(AsyncInbox(requests))
+            computer.set_outbox(AsyncOutbox(responses))
+            running = asyncio.create_task(computer.run_async())
+            answers = []
+            for value in range(5):
+                await requests.put(value)
+                answers.append(await responses.get())
+            # several values at once go through the bounded queue one at a time
+            for value in "ABC":
+                requests.put_nowait(value)
+            requests.put_nowait(None)
+            for _ in "ABC":
+                answers.append(await responses.get())
+            await running
+            return computer, answers
+
+        computer, answers = asyncio.run(main())
+        self.assertEqual(answers, [0, 1, 2, 3, 4, "A", "B", "C"])
+        self.assertEqual(computer.inbox.taken, 8)
+        self.assertEqual(computer.outbox.sent, 8)
+
+    def test_long_runs_take_turns(self):
+        log = []
+
+        async def ticker():
+            for _ in range(3):
+                log.append("tick")
+                await asyncio.sleep(0)
+
+        async def main():
+            computer = new_computer(COPY, engine="interpreter")
+            computer.set_inbox([0] * 1000)
+            await asyncio.gather(computer.run_async(steps_per_slice=100), ticker())
+            log.append(computer.total_steps_executed)
+
+        asyncio.run(main())
+        self.assertEqual(log, ["tick", "tick", "tick", 3000])
+
+    def test_coroutine_sink(self):
+        sent = []
+
+        async def send(value):
+            sent.append(value)
+
+        computer = new_computer(COPY)
+        computer.set_inbox("HRM")
+        computer.set_outbox(AsyncOutbox(send))
+        asyncio.run(computer.run_async())
+        self.assertEqual(sent, list("HRM"))
+
+    def test_output_is_sent_before_an_error(self):
+        sent = []
+
+        async def send(value):
+            sent.append(value)
+
+        computer = new_computer("move_from_inbox\nmove_to_outbox\nmove_to_outbox")
+        computer.set_inbox([1])
+        computer.set_outbox(AsyncOutbox(send))
+        with self.assertRaises(AccumulatorIsEmptyError):
+            asyncio.run(computer.run_async())
+        self.assertEqual(sent, [1])
+        self.assertEqual(computer.program_counter, 2)
+
+    def test_loop_detection(self):
+        computer = new_computer(SPIN, Memory(values={0: 0}), detect_loops=True)
+        computer.set_inbox(AsyncInbox(asyncio.Queue()))
+        with self.assertRaises(InfiniteLoopError):
+            asyncio.run(computer.run_async(steps_per_slice=3))
+
+    def test_unsupported_engine(self):
+        computer = new_computer(COPY, engine="transpiled")
+        with self.assertRaises(ValueError):
+            asyncio.run(computer.run_async())
+
+    def test_plain_run_does_not_wait(self):
+        queue = asyncio.Queue()
+        computer = new_computer(COPY)
+        computer.set_inbox(AsyncInbox(queue))
+        computer.run()
+        self.assertEqual(computer.outbox, [])
@@ -0,0 +1,125 @@
+import concurrent.futures
+import pickle
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+import hrmulator
+from hrmulator.Batch import run_batch
+from hrmulator.Instructions import AccumulatorIsEmptyError, IncompatibleTypesError
+from hrmulator.Linker import Linker
+from hrmulator.LoopDetection import InfiniteLoopError
+from hrmulator.Memory import (
+    CantIndirectThroughLetter,
+    CantStoreBadType,
+    Memory,
+    MemoryTileIsEmptyError,
+)
+from hrmulator.tests import test_integration_000
+
+
+class TestBatch(TestCase):
+    inboxes = [[3, 2, 0, 7], [], [4, 4, 4], [5, "A"], [-2, 9, 1, 1]]
+
+    def run_one(self, inbox):
+        computer = hrmulator.Computer()
+        computer.memory = test_integration_000.new_memory()
+        computer.set_inbox(inbox)
+        computer.load_program(program_text=test_integration_000.program_text)
+        try:
+            computer.run()
+            error = None
+        except Exception as e:
+            error = type(e)
+        return computer.outbox, computer.total_steps_executed, error
+
+    def assert_agrees_with_running_one_at_a_time(self, backend):
+        results = run_batch(
+            program_text=test_integration_000.program_text,
+            memory=test_integration_000.new_memory(),
+            inboxes=self.inboxes,
+            backend=backend,
+            max_workers=2,
+        )
+        self.assertEqual(len(results), len(self.inboxes))
+        for inbox, result in zip(self.inboxes, results):
+            outbox, steps, error = self.run_one(inbox)
+            self.assertEqual(result.outbox, outbox)
+            self.assertEqual(result.steps, steps)
+            self.assertIs(type(result.error) if result.error else None, error)
+
+    def test_agrees_with_running_one_at_a_time(self):
+        self.assert_agrees_with_running_one_at_a_time("process")
+
+    def test_thread_backend(self):
+        self.assert_agrees_with_running_one_at_a_time("thread")
+
+    @skipUnless(hasattr(concurrent.futures, "InterpreterPoolExecutor"), "needs Python 3.14")
+    def test_subinterpreter_backend(self):
+        self.assert_agrees_with_running_one_at_a_time("subinterpreter")
+
+    def test_errors_are_reported_per_inbox(self):
+        results = run_batch(
+            program_text=test_integration_000.program_text,
+            memory=test_integration_000.new_memory(),
+            inboxes=self.inboxes,
+            max_workers=2,
+            chunksize=1,
+        )
+        self.assertIsInstance(results[3].error, IncompatibleTypesError)
+        self.assertIsNone(results[4].error)
+
+    def test_every_error_comes_back_from_the_workers(self):
+        for program_text, error_type in (
+            ("move_from_inbox\ncopy_to 0\nadd 0", IncompatibleTypesError),
+            ("move_from_inbox\ncopy_to 0\ncopy_from [0]", CantIndirectThroughLetter),
+            ("copy_from 1", MemoryTileIsEmptyError),
+            ("move_to_outbox", AccumulatorIsEmptyError),
+            ("START:\ncopy_from 0\njump_if_zero_to START", InfiniteLoopError),
+        ):
+            results = run_batch(
+                program_text=program_text,
+                memory=Memory(values={0: 0}),
+                inboxes=[["A"], ["A"]],
+                max_workers=2,
+                chunksize=1,
+                detect_loops=True,
+            )
+            for result in results:
+                self.assertIsInstance(result.error, error_type, program_text)
+        self.assertEqual(results[0].error.args, InfiniteLoopError(0, 1).args)
+        self.assertIsInstance(pickle.loads(pickle.dumps(CantStoreBadType())), CantStoreBadType)
+
+    def test_each_run_starts_from_the_same_memory(self):
+        results = run_batch(
+            program_text="bump_up 0\nmove_to_outbox",
+            memory=Memory(values={0: 10}),
+            inboxes=[[]] * 6,
+            max_workers=2,
+            engine="interpreter",
+        )
+        self.assertEqual([result.outbox for result in results], [[11]] * 6)
+
+    def test_a_chunk_is_linked_once(self):
+        with patch.object(Linker, "link", autospec=True, side_effect=Linker.link) as link:
+            results = run_batch(
+                program_text="bump_up 0\nmove_to_outbox\ncopy_from 1\nmove_from_inbox\ncopy_to 1",
+                memory=Memory(values={0: 10}),
+                inboxes=[[5], [6], [7]],
+                backend="thread",
+                max_workers=1,
+                chunksize=3,
+            )
+        self.assertEqual(link.call_count, 1)
+        self.assertEqual([result.outbox for result in results], [[11]] * 3)
+        self.assertEqual({type(result.error) for result in results}, {MemoryTileIsEmptyError})
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            run_batch(program_text="move_from_inbox", inboxes=[[]], backend="carrier-pigeon")
+
+    def test_no_inboxes(self):
+        self.assertEqual(run_batch(program_text="move_from_inbox", inboxes=[]), [])
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            run_batch(program_text="move_from_inbox", inboxes=[[]], engine="warp-drive")
@@ -0,0 +1,112 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.BoxFiles import BoxFile, BoxFileWriter, MappedInbox, decode, encode
+from hrmulator.Computer import ENGINES
+from hrmulator.Memory import Memory
+from hrmulator.tests import test_integration_002
+
+
+class TestBoxFiles(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.inboxes_path = os.path.join(directory.name, "inboxes.hrmbox")
+        self.outboxes_path = os.path.join(directory.name, "outboxes.hrmbox")
+
+    def test_encoding(self):
+        for value in (0, 1, -1, 2**30 - 1, -(2**30), "A", "z", "é"):
+            self.assertEqual(decode(encode(value)), value)
+        for value in (2**30, -(2**30) - 1, "AB", "", 1.5, None):
+            with self.assertRaises(ValueError):
+                encode(value)
+
+    def test_round_trip(self):
+        boxes = [[1, -2, "A"], [], list(range(-500, 500)), ["Z"]]
+        with BoxFileWriter(self.inboxes_path) as writer:
+            for box in boxes:
+                writer.write(box)
+        with BoxFile(self.inboxes_path) as box_file:
+            self.assertEqual(len(box_file), len(boxes))
+            self.assertEqual([list(inbox) for inbox in box_file], boxes)
+            self.assertEqual(list(box_file[-1]), ["Z"])
+            with self.assertRaises(IndexError):
+                box_file[len(boxes)]
+
+    def test_empty_file(self):
+        with BoxFileWriter(self.inboxes_path):
+            pass
+        with BoxFile(self.inboxes_path) as box_file:
+            self.assertEqual(len(box_file), 0)
+
+    def test_not_a_box_file(self):
+        with open(self.inboxes_path, "wb") as f:
+            f.write(b"inbox: 1 2 3\n" * 10)
+        with self.assertRaises(ValueError):
+            BoxFile(self.inboxes_path)
+
+    def test_mapped_inbox(self):
+        with BoxFileWriter(self.inboxes_path) as writer:
+            writer.write([7, "B"])
+        with BoxFile(self.inboxes_path) as box_file:
+            inbox = box_file[0]
+            self.assertEqual(len(inbox), 2)
+            self.assertEqual(inbox.popleft(), 7)
+            self.assertEqual(list(inbox), ["B"])
+            self.assertEqual(inbox.popleft(), "B")
+            self.assertEqual(len(inbox), 0)
+            with self.assertRaises(IndexError):
+                inbox.popleft()
+
+    def test_copy(self):
+        with BoxFileWriter(self.inboxes_path) as writer:
+            writer.write([1, 2, 3])
+        with BoxFile(self.inboxes_path) as box_file:
+            inbox = box_file[0]
+            inbox.popleft()
+            copied = inbox.copy()
+            inbox.popleft()
+            self.assertEqual(list(copied), [2, 3])
+            self.assertEqual(list(inbox), [3])
+
+    def test_running_every_engine(self):
+        inboxes = [[30, -30, 0], [], [5, 5]]
+        with BoxFileWriter(self.inboxes_path) as writer:
+            for inbox in inboxes:
+                writer.write(inbox)
+        expected = []
+        for inbox in inboxes:
+            computer = hrmulator.Computer()
+            computer.memory = Memory(labels={"counter": 0})
+            computer.load_program(program_text=test_integration_002.program_text)
+            computer.set_inbox(inbox)
+            computer.run()
+            expected.append((computer.outbox, computer.total_steps_executed))
+        for engine in ENGINES:
+            for fuse in (False, True):
+                steps = []
+                with BoxFile(self.inboxes_path) as box_file, BoxFileWriter(self.outboxes_path) as writer:
+                    for inbox in box_file:
+                        computer = hrmulator.Computer(engine=engine, fuse=fuse)
+                        computer.memory = Memory(labels={"counter": 0})
+                        computer.load_program(program_text=test_integration_002.program_text)
+                        computer.set_inbox(inbox)
+                        self.assertIs(computer.inbox, inbox)
+                        computer.set_outbox(writer.outbox())
+                        computer.run()
+                        steps.append(computer.total_steps_executed)
+                with BoxFile(self.outboxes_path) as box_file:
+                    self.assertEqual(list(zip([list(outbox) for outbox in box_file], steps)), expected, engine)
+
+    def test_loop_detection(self):
+        with BoxFileWriter(self.inboxes_path) as writer:
+            writer.write([0] * 10000)
+        with BoxFile(self.inboxes_path) as box_file:
+            computer = hrmulator.Computer(detect_loops=True)
+            computer.load_program(program_text="START:\n    move_from_inbox\n    jump_to START")
+            computer.set_inbox(box_file[0])
+            computer.run()
+            self.assertIsInstance(computer.inbox, MappedInbox)
+            self.assertEqual(len(computer.inbox), 0)
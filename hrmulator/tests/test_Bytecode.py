@@ -0,0 +1,111 @@
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase
+from unittest.mock import patch
+
+import hrmulator
+from hrmulator.Assembler import Assembler
+from hrmulator.Bytecode import BytecodeProgram
+from hrmulator.Computer import ENGINES
+from hrmulator.Instructions import IncompatibleTypesError, NoSuchJumpDestinationError
+from hrmulator.Memory import Memory
+from hrmulator.tests import test_integration_000
+
+
+class TestBytecode(TestCase):
+    def setUp(self):
+        self.program, self.jump_table = Assembler().assemble_program_text(test_integration_000.program_text)
+
+    def new_computer(self, engine="bytecode"):
+        computer = hrmulator.Computer(engine=engine)
+        computer.memory = test_integration_000.new_memory()
+        computer.set_inbox([3, 2, 0, 7, 4, 4])
+        computer.load_program(program_text=test_integration_000.program_text, bytecode=True)
+        return computer
+
+    def test_decodes_to_the_same_program(self):
+        bytecode = BytecodeProgram(self.program)
+        self.assertEqual(len(bytecode), len(self.program))
+        self.assertEqual([str(i) for i in bytecode], [str(i) for i in self.program])
+        self.assertEqual([str(i) for i in bytecode[3:6]], [str(i) for i in self.program[3:6]])
+        self.assertEqual(str(bytecode[-1]), str(self.program[-1]))
+
+    def test_labels_are_interned(self):
+        other, _ = Assembler().assemble_program_text(test_integration_000.program_text)
+        first, second = BytecodeProgram(self.program), BytecodeProgram(other)
+        self.assertEqual(first.labels, second.labels)
+        for a, b in zip(first.labels, second.labels):
+            self.assertIs(a, b)
+
+    def test_operands_too_big_for_64_bits(self):
+        computer = hrmulator.Computer(engine="bytecode")
+        computer.memory = Memory(values={2**31: 5, 2**70: 6})
+        computer.load_program(
+            program_text=f"copy_from {2**31}\nadd {2**70}\njump_if_zero_to {2**70}\ncopy_to {2**63}",
+            bytecode=True,
+        )
+        self.assertEqual(computer.program[1].tile_index, 2**70)
+        computer.run()
+        self.assertEqual(computer.memory[2**63], 11)
+
+    def test_resolved_once(self):
+        computer = self.new_computer()
+        with patch.object(BytecodeProgram, "resolve", wraps=computer.program.resolve) as resolve:
+            for _ in range(3):
+                computer.set_inbox([3, 2])
+                computer.run()
+        self.assertEqual(resolve.call_count, 1)
+
+    def test_load_program_as_bytecode(self):
+        computer = self.new_computer()
+        self.assertIsInstance(computer.program, BytecodeProgram)
+        computer.run()
+        self.assertSequenceEqual(computer.outbox, [6, 0, 16])
+
+    def test_every_engine_runs_bytecode(self):
+        results = set()
+        for engine in ENGINES:
+            computer = self.new_computer(engine)
+            computer.run()
+            results.add((tuple(computer.outbox), computer.total_steps_executed))
+        self.assertEqual(len(results), 1)
+
+    def test_listing_is_unchanged(self):
+        listings = []
+        for bytecode in (False, True):
+            computer = hrmulator.Computer()
+            computer.load_program(program_text=test_integration_000.program_text, bytecode=bytecode)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                computer.print_program()
+            listings.append(output.getvalue())
+        self.assertEqual(listings[0], listings[1])
+
+    def test_errors_match_the_interpreter(self):
+        program_text = "move_from_inbox\ncopy_to [1]\nmove_from_inbox\nadd [0]"
+        results = []
+        for engine in ("interpreter", "bytecode"):
+            computer = hrmulator.Computer(engine=engine)
+            computer.memory = Memory(values={0: 5, 1: 6, 5: "A"})
+            computer.set_inbox([7, 1])
+            computer.load_program(program_text=program_text, bytecode=True)
+            with self.assertRaises(IncompatibleTypesError):
+                computer.run()
+            results.append((computer.program_counter, computer.total_steps_executed, computer.memory[6]))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[1], (3, 3, 7))
+
+    def test_bad_jump_fails_only_when_taken(self):
+        computer = hrmulator.Computer(engine="bytecode")
+        computer.set_inbox([1, 0])
+        computer.load_program(
+            program_text="""
+            START:
+                move_from_inbox
+                jump_if_zero_to NOWHERE
+                jump_to START""",
+            bytecode=True,
+        )
+        with self.assertRaises(NoSuchJumpDestinationError):
+            computer.run()
+        self.assertEqual((computer.program_counter, computer.total_steps_executed), (1, 4))
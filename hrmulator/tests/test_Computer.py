@@ -1,6 +1,15 @@
+import subprocess
+import sys
+import threading
+from collections import deque
 from unittest import TestCase
 
 import hrmulator
+from hrmulator.Assembler import Assembler
+from hrmulator.Bytecode import BytecodeProgram
+from hrmulator.Computer import ENGINES, FINISHED, PAUSED, WAITING
+from hrmulator.Memory import Memory
+from hrmulator.tests import test_integration_000, test_integration_002
 
 
 class TestComputer(TestCase):
@@ -27,3 +36,184 @@ class TestComputer(TestCase):
                     jump_to START"""
         )
         self.assertSequenceEqual(self.computer.outbox, [])
+
+    def test_resume(self):
+        for engine in ("interpreter", "linked"):
+            for fuse in (False, True):
+                computer = hrmulator.Computer(engine=engine, fuse=fuse)
+                computer.load_program(
+                    program_text="""
+                        START:
+                            move_from_inbox
+                            move_to_outbox
+                            jump_to START"""
+                )
+                computer.set_inbox([1, 2, 3])
+                computer.start()
+                self.assertEqual(computer.resume(2), PAUSED)
+                self.assertEqual(computer.outbox, [1])
+                self.assertEqual(computer.resume(100), WAITING)
+                self.assertEqual((computer.outbox, computer.total_steps_executed), ([1, 2, 3], 9))
+                self.assertEqual(computer.program_counter, 0)
+                computer.inbox.append(4)
+                self.assertEqual(computer.resume(100), WAITING)
+                self.assertEqual((computer.outbox, computer.total_steps_executed), ([1, 2, 3, 4], 12))
+
+    def test_resume_to_the_end(self):
+        computer = hrmulator.Computer()
+        computer.load_program(program_text="move_from_inbox\nmove_to_outbox")
+        computer.set_inbox([5])
+        computer.start()
+        self.assertEqual(computer.resume(1), PAUSED)
+        self.assertEqual(computer.resume(1), FINISHED)
+        self.assertIsNone(computer.program_counter)
+
+    def test_start_unsupported_engine(self):
+        with self.assertRaises(ValueError):
+            hrmulator.Computer(engine="bytecode").start()
+
+    def test_linked_once(self):
+        computer = hrmulator.Computer(fuse=True)
+        computer.memory = Memory(labels={"sum": 0})
+        computer.load_program(program_text="move_from_inbox\ncopy_to sum\nadd sum\nmove_to_outbox")
+        computer.set_inbox([1])
+        computer.run()
+        steps = computer._linked_steps()
+        computer.set_inbox([2])
+        computer.run()
+        self.assertIs(computer._linked_steps(), steps)
+        self.assertEqual(computer.outbox, [4])
+        computer.memory.label_tile(1, "sum")
+        self.assertIsNot(computer._linked_steps(), steps)
+        computer.set_inbox([3])
+        computer.run()
+        self.assertEqual((computer.outbox, computer.memory[1]), ([6], 3))
+        steps = computer._linked_steps()
+        computer.memory = Memory(labels={"sum": 2})
+        self.assertIsNot(computer._linked_steps(), steps)
+        steps = computer._linked_steps()
+        computer.load_program(program_text="move_from_inbox\ncopy_to sum\nadd sum\nmove_to_outbox")
+        self.assertIsNot(computer._linked_steps(), steps)
+
+
+class TestSnapshots(TestCase):
+    def new_computer(self, **options):
+        computer = hrmulator.Computer(**options)
+        computer.memory = Memory(labels={"counter": 0})
+        computer.load_program(program_text=test_integration_002.program_text)
+        computer.set_inbox([3, -2, 0, 4])
+        computer.start()
+        return computer
+
+    def state(self, computer):
+        return (
+            computer.program_counter,
+            computer.accumulator,
+            computer.total_steps_executed,
+            list(computer.inbox),
+            list(computer.outbox),
+            dict(computer.memory.tiles),
+        )
+
+    def test_restore_and_resume(self):
+        for engine in ("interpreter", "linked"):
+            for fuse in (False, True):
+                for detect_loops in (False, True):
+                    computer = self.new_computer(engine=engine, fuse=fuse, detect_loops=detect_loops)
+                    snapshots = []
+                    while computer.resume(3) is PAUSED:
+                        snapshots.append((computer.snapshot(), self.state(computer)))
+                    finished = self.state(computer)
+                    # restore them latest first, then earliest first, each time on a new path
+                    for snapshot, state in snapshots[::-1] + snapshots:
+                        computer.restore(snapshot)
+                        self.assertEqual(self.state(computer), state)
+                        while computer.resume(5) is PAUSED:
+                            pass
+                        self.assertEqual(self.state(computer), finished)
+
+    def test_restore_on_another_computer(self):
+        computer = self.new_computer()
+        computer.resume(10)
+        snapshot = computer.snapshot()
+        state = self.state(computer)
+        other = self.new_computer()
+        other.restore(snapshot)
+        self.assertEqual(self.state(other), state)
+        other.resume(1000)
+        self.assertEqual(self.state(computer), state)
+        self.assertEqual(other.outbox, [3, 2, 1, 0, -2, -1, 0, 0, 4, 3, 2, 1, 0])
+
+    def test_the_inbox_is_shared_not_copied(self):
+        computer = self.new_computer()
+        computer.inbox.extend(range(10000))
+        computer.resume(10)
+        snapshot = computer.snapshot()
+        self.assertIs(snapshot.inbox.values, computer.inbox.values)
+        computer.inbox.append(7)
+        computer.resume(10)
+        computer.restore(snapshot)
+        self.assertEqual(len(computer.inbox), len(snapshot.inbox))
+        computer.inbox.append(8)
+        self.assertEqual(list(computer.inbox)[-1], 8)
+
+    def test_the_tiles_are_journaled_not_copied(self):
+        for engine in ("interpreter", "linked"):
+            computer = self.new_computer(engine=engine)
+            computer.resume(10)
+            snapshot = computer.snapshot()
+            tiles = computer.memory.tiles
+            self.assertIs(snapshot.memory[0].tiles, tiles)
+            state = self.state(computer)
+            computer.resume(10)
+            self.assertIs(computer.snapshot().memory[0].tiles, tiles)
+            computer.restore(snapshot)
+            self.assertIs(computer.memory.tiles, tiles)
+            self.assertEqual(self.state(computer), state)
+            while computer.resume(10) is PAUSED:
+                pass
+            self.assertEqual(computer.outbox, [3, 2, 1, 0, -2, -1, 0, 0, 4, 3, 2, 1, 0])
+
+    def test_cant_snapshot(self):
+        computer = self.new_computer()
+        computer.set_inbox(iter([1, 2]))
+        with self.assertRaises(ValueError):
+            computer.snapshot()
+        computer = self.new_computer()
+        computer.outbox = deque()
+        with self.assertRaises(ValueError):
+            computer.snapshot()
+
+
+class TestComputersInThreads(TestCase):
+    def run_one(self, engine, program, jump_table, inbox):
+        computer = hrmulator.Computer(engine=engine)
+        computer.program, computer.jump_table = program, jump_table
+        computer.memory = test_integration_000.new_memory()
+        computer.set_inbox(inbox)
+        computer.run()
+        return computer.outbox, computer.total_steps_executed
+
+    def test_computers_sharing_a_program(self):
+        program, jump_table = Assembler().assemble_program_text(test_integration_000.program_text)
+        inboxes = [[n % 7, 60 + n] * 20 for n in range(16)]
+        for form in (program, BytecodeProgram(program)):
+            for engine in ENGINES:
+                expected = [self.run_one(engine, form, jump_table, inbox) for inbox in inboxes]
+                results = [None] * len(inboxes)
+
+                def run(i):
+                    results[i] = self.run_one(engine, form, jump_table, inboxes[i])
+
+                threads = [threading.Thread(target=run, args=(i,)) for i in range(len(inboxes))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(results, expected, engine)
+
+    def test_importing_has_no_side_effects(self):
+        # readline, in particular, can't be imported in a subinterpreter
+        check = "import sys, hrmulator; print('readline' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "False")
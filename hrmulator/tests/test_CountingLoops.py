@@ -0,0 +1,123 @@
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.Assembler import Assembler
+from hrmulator.CountingLoops import find_counting_loops
+from hrmulator.Instructions import IncompatibleTypesError, JumpIfNegative, JumpIfZero
+from hrmulator.Memory import Memory
+from hrmulator.tests import test_integration_002
+
+
+class TestCountingLoops(TestCase):
+    def find(self, program_text, memory=None):
+        program, jump_table = Assembler().assemble_program_text(program_text)
+        return find_counting_loops(program, jump_table, memory or Memory(labels={"counter": 0, "copy": 1}))
+
+    def run_both(self, program_text, inbox, values):
+        """Run on the interpreter and the linked engine, check they agree."""
+        results = []
+        for engine in ("interpreter", "linked"):
+            computer = hrmulator.Computer(engine=engine)
+            computer.memory = Memory(labels={"counter": 0, "copy": 1}, values=values)
+            computer.set_inbox(inbox)
+            computer.load_program(program_text=program_text)
+            try:
+                computer.run()
+                error = None
+            except Exception as e:
+                error = type(e)
+            results.append(
+                (
+                    computer.outbox,
+                    computer.total_steps_executed,
+                    computer.accumulator,
+                    computer.program_counter,
+                    computer.memory.tiles,
+                    error,
+                )
+            )
+        self.assertEqual(results[1], results[0])
+        return results[0]
+
+    def test_finds_count_down_and_count_up(self):
+        loop, other = self.find(test_integration_002.program_text)
+        self.assertEqual(other.head, 10)
+        self.assertEqual(other.delta, 1)
+        self.assertEqual(loop.head, 6)
+        self.assertEqual(loop.delta, -1)
+        self.assertIs(loop.exit_test, JumpIfZero)
+        self.assertEqual(loop.exit_step, 14)
+        self.assertEqual(loop.outputs, 1)
+        self.assertEqual(loop.trip_length, 4)
+
+    def test_finds_count_until_negative(self):
+        loops = self.find(
+            """
+            LOOP:
+                bump_up counter
+                jump_if_negative_to LOOP
+                copy_to copy
+                jump_to LOOP"""
+        )
+        self.assertEqual(len(loops), 1)
+        self.assertIs(loops[0].exit_test, JumpIfNegative)
+        self.assertEqual(loops[0].stores, [1])
+
+    def test_loops_with_unpredictable_bodies_are_not_found(self):
+        self.assertEqual(self.find("LOOP:\nbump_down counter\njump_if_zero_to LOOP\nmove_from_inbox\njump_to LOOP"), [])
+        self.assertEqual(self.find("LOOP:\nbump_down [counter]\njump_if_zero_to LOOP\njump_to LOOP"), [])
+        self.assertEqual(self.find("LOOP:\nbump_down counter\nmove_to_outbox\njump_to LOOP"), [])
+        self.assertEqual(
+            self.find("LOOP:\nbump_down counter\njump_if_zero_to LOOP\nmove_to_outbox\nmove_to_outbox\njump_to LOOP"),
+            [],
+        )
+
+    def test_countdown(self):
+        outbox, steps, _, _, _, _ = self.run_both(test_integration_002.program_text, [1000, -1000, 0, 1], {})
+        self.assertEqual(len(outbox), 2005)
+
+    def test_countdown_is_closed_form(self):
+        # Far too many steps to go round one at a time.
+        computer = hrmulator.Computer()
+        computer.memory = Memory(labels={"counter": 0})
+        computer.set_inbox([10**12])
+        computer.load_program(
+            program_text="""
+                move_from_inbox
+                copy_to counter
+            LOOP:
+                bump_down counter
+                jump_if_zero_to DONE
+                jump_to LOOP
+            DONE:
+                move_to_outbox"""
+        )
+        computer.run()
+        self.assertEqual(computer.outbox, [0])
+        self.assertEqual(computer.total_steps_executed, 2 + 3 * (10**12 - 1) + 2 + 1)
+
+    def test_count_until_negative_with_copies(self):
+        self.run_both(
+            """
+                move_from_inbox
+                copy_to counter
+            LOOP:
+                bump_down counter
+                jump_if_negative_to DONE
+                copy_to copy
+                move_to_outbox
+                copy_from counter
+                move_to_outbox
+                no_op
+                jump_to LOOP
+            DONE:
+                move_to_outbox""",
+            [37],
+            {},
+        )
+
+    def test_loop_that_never_ends_or_fails_runs_as_usual(self):
+        _, _, _, _, _, error = self.run_both(
+            "LOOP:\nbump_down counter\njump_if_zero_to LOOP\njump_to LOOP", [], {"counter": "A"}
+        )
+        self.assertIs(error, IncompatibleTypesError)
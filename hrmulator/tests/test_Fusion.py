@@ -0,0 +1,102 @@
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.Assembler import Assembler
+from hrmulator.Fusion import Superinstruction, fuse
+from hrmulator.Instructions import IncompatibleTypesError, MoveFromInbox
+from hrmulator.Memory import Memory, MemoryTileIsEmptyError
+from hrmulator.tests import test_integration_000
+
+sum_program = """
+START:
+    move_from_inbox
+    copy_to 0
+    copy_from 0
+    add 1
+    copy_to 1
+    move_to_outbox
+    jump_to START
+"""
+
+
+class TestFusion(TestCase):
+    def run_program(self, program_text, inbox, memory, engine="linked", fuse=True):
+        computer = hrmulator.Computer(engine=engine, fuse=fuse)
+        computer.memory = memory
+        computer.set_inbox(inbox)
+        computer.load_program(program_text=program_text)
+        return computer
+
+    def test_fuse_keeps_the_length_and_the_unfused_steps(self):
+        program, jump_table = Assembler().assemble_program_text(sum_program)
+        fused = fuse(program)
+        self.assertEqual(len(fused), len(program))
+        self.assertIsInstance(fused[0], Superinstruction)
+        self.assertIs(fused[1], program[1])
+        self.assertIsInstance(fused[2], Superinstruction)
+        self.assertEqual(len(fused[2].parts), 3)
+        self.assertIsInstance(fused[5], Superinstruction)
+        self.assertIsInstance(program[0], MoveFromInbox)
+
+    def test_same_results_as_unfused(self):
+        for engine in ("interpreter", "linked"):
+            results = []
+            for fused in (False, True):
+                computer = self.run_program(sum_program, [1, 2, 3], Memory(values={1: 0}), engine, fused)
+                computer.run()
+                results.append((computer.outbox, computer.total_steps_executed))
+            self.assertEqual(results[0], results[1], engine)
+        self.assertSequenceEqual(results[0][0], [1, 3, 6])
+
+    def test_multiplication_workshop(self):
+        computer = self.run_program(
+            test_integration_000.program_text,
+            [3, 2, 0, 7],
+            test_integration_000.new_memory(),
+        )
+        computer.run()
+        self.assertSequenceEqual(computer.outbox, [6, 0])
+
+    def test_error_in_the_middle_of_a_superinstruction(self):
+        computer = self.run_program(sum_program, [1, "A"], Memory(values={1: 0}))
+        with self.assertRaises(IncompatibleTypesError):
+            computer.run()
+        self.assertEqual(computer.program_counter, 3)
+        self.assertEqual(computer.total_steps_executed, 10)
+        self.assertEqual(computer.accumulator, "A")
+        self.assertSequenceEqual(computer.outbox, [1])
+
+    def test_error_in_the_first_part_of_a_superinstruction(self):
+        computer = self.run_program("no_op\ncopy_from 0\nadd 1\ncopy_to 1", [], Memory())
+        with self.assertRaises(MemoryTileIsEmptyError):
+            computer.run()
+        self.assertEqual(computer.program_counter, 1)
+        self.assertEqual(computer.total_steps_executed, 1)
+
+    def test_jump_into_the_middle_of_a_superinstruction(self):
+        computer = self.run_program(
+            """
+                jump_to MIDDLE
+                move_from_inbox
+            MIDDLE:
+                move_to_outbox""",
+            [],
+            Memory(),
+        )
+        computer.accumulator = 74
+        computer.run()
+        self.assertSequenceEqual(computer.outbox, [74])
+        self.assertEqual(computer.total_steps_executed, 2)
+
+    def test_listing_is_unchanged(self):
+        listings = []
+        for fused in (False, True):
+            computer = self.run_program(sum_program, [1, 2], Memory(values={1: 0}), fuse=fused)
+            computer.run()
+            output = io.StringIO()
+            with redirect_stdout(output):
+                computer.print_program()
+            listings.append(output.getvalue())
+        self.assertEqual(listings[0], listings[1])
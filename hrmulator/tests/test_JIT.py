@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.Assembler import Assembler
+from hrmulator.Instructions import IncompatibleTypesError
+from hrmulator.JIT import HOT_LOOP_THRESHOLD, TracingJIT
+from hrmulator.Memory import Memory
+from hrmulator.tests import test_integration_000, test_integration_002
+
+COUNTDOWN = """
+LOOP:
+    bump_down 0
+    jump_if_zero_to DONE
+    jump_to LOOP
+DONE:
+    move_to_outbox"""
+
+
+class TestTracingJIT(TestCase):
+    def run_both(self, program_text, inbox, memory_factory):
+        """Run on the interpreter and the JIT, check they agree, return the JIT's computer."""
+        computers = []
+        for engine in ("interpreter", "jit"):
+            computer = hrmulator.Computer(engine=engine)
+            computer.memory = memory_factory()
+            computer.set_inbox(inbox)
+            computer.load_program(program_text=program_text)
+            try:
+                computer.run()
+                error = None
+            except Exception as e:
+                error = type(e)
+            computers.append(computer)
+            computer.error = error
+        interpreted, jitted = computers
+        for attribute in ("outbox", "total_steps_executed", "accumulator", "program_counter", "error"):
+            self.assertEqual(getattr(jitted, attribute), getattr(interpreted, attribute), attribute)
+        self.assertEqual(jitted.memory.tiles, interpreted.memory.tiles)
+        return jitted
+
+    def new_jit(self, counter):
+        program, jump_table = Assembler().assemble_program_text(COUNTDOWN)
+        computer = hrmulator.Computer()
+        computer.memory = Memory(values={0: counter})
+        computer.program_counter = 0
+        computer.total_steps_executed = 0
+        computer.outbox = []
+        return computer, TracingJIT(program, jump_table, computer.memory)
+
+    def test_hot_loop_gets_traced(self):
+        computer, jit = self.new_jit(10 * HOT_LOOP_THRESHOLD)
+        jit.run(computer)
+        self.assertEqual(list(jit.traces), [0])
+        self.assertEqual(jit.traces[0], [(0, 1), (1, 2), (2, 0)])
+        self.assertEqual(computer.outbox, [0])
+        self.assertEqual(computer.total_steps_executed, 30 * HOT_LOOP_THRESHOLD)
+
+    def test_cold_loop_is_not_traced(self):
+        computer, jit = self.new_jit(HOT_LOOP_THRESHOLD // 2)
+        jit.run(computer)
+        self.assertEqual(jit.traces, {})
+
+    def test_multiplication_workshop(self):
+        self.run_both(
+            test_integration_000.program_text,
+            [300, 200, 0, 7, 150, 150],
+            test_integration_000.new_memory,
+        )
+
+    def test_guard_side_exit(self):
+        # Counting down, then up, takes the loop's conditional jumps both ways.
+        computer = self.run_both(
+            test_integration_002.program_text,
+            [500, -500, 0, 300],
+            lambda: Memory(labels={"counter": 0}),
+        )
+        self.assertEqual(len(computer.outbox), 1304)
+
+    def test_error_inside_trace(self):
+        # Walks along the tiles until it bumps into a letter.
+        computer = self.run_both(
+            """
+            LOOP:
+                bump_up [0]
+                bump_up 0
+                jump_to LOOP""",
+            [],
+            lambda: Memory(values={0: 1, **{i: 0 for i in range(1, 200)}, 200: "X"}),
+        )
+        self.assertIs(computer.error, IncompatibleTypesError)
+        self.assertEqual(computer.program_counter, 0)
+
+    def test_heat_adds_up_over_runs(self):
+        computer = hrmulator.Computer(engine="jit")
+        computer.load_program(program_text=COUNTDOWN)
+        for _ in range(3):
+            computer.memory[0] = HOT_LOOP_THRESHOLD // 2
+            computer.run()
+            self.assertEqual(computer.outbox, [0])
+        self.assertEqual(list(computer._jit().traces), [0])
+        computer.load_program(program_text=COUNTDOWN)
+        self.assertEqual(computer._jit().traces, {})
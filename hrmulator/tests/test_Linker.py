@@ -0,0 +1,164 @@
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.Assembler import Assembler
+from hrmulator.Computer import ENGINES
+from hrmulator.Instructions import (
+    AccumulatorIsEmptyError,
+    IncompatibleTypesError,
+    NoSuchJumpDestinationError,
+)
+from hrmulator.Linker import Linker
+from hrmulator.Memory import CantIndirectThroughLetter, Memory, MemoryTileIsEmptyError
+from hrmulator.tests import test_integration_000, test_integration_002
+
+
+class TestLinker(TestCase):
+    def link(self, program_text, memory=None):
+        program, jump_table = Assembler().assemble_program_text(program_text)
+        return Linker(program, jump_table, memory or Memory()).link()
+
+    def test_steps_return_next_step(self):
+        steps = self.link(
+            """
+            START:
+                no_op
+                jump_to START"""
+        )
+        self.assertEqual(steps[0](None), 1)
+        self.assertEqual(steps[1](None), 0)
+
+    def test_unknown_jump_label_fails_only_when_taken(self):
+        steps = self.link("jump_if_zero_to NOWHERE")
+        computer = hrmulator.Computer()
+        computer.load_program(program_text="jump_if_zero_to NOWHERE")
+        computer.total_steps_executed = 0
+        computer.accumulator = 1
+        self.assertEqual(steps[0](computer), 1)
+        computer.accumulator = 0
+        with self.assertRaises(NoSuchJumpDestinationError):
+            steps[0](computer)
+
+    def test_jump_out_of_range_fails_only_when_taken(self):
+        steps = self.link("jump_to 7")
+        computer = hrmulator.Computer()
+        computer.load_program(program_text="jump_to 7")
+        with self.assertRaises(NoSuchJumpDestinationError):
+            steps[0](computer)
+
+    def test_tile_label_resolved_at_link_time(self):
+        memory = Memory(labels={"here": 3})
+        steps = self.link("copy_to here", memory)
+        computer = hrmulator.Computer()
+        computer.accumulator = 74
+        self.assertEqual(steps[0](computer), 1)
+        self.assertEqual(memory[3], 74)
+
+    def test_unknown_tile_label_fails_only_when_reached(self):
+        computer = hrmulator.Computer()
+        computer.load_program(
+            program_text="""
+                jump_to END
+                copy_from nowhere
+            END:
+                move_from_inbox"""
+        )
+        computer.run()
+        self.assertEqual(computer.total_steps_executed, 1)
+
+        computer.load_program(program_text="copy_from nowhere")
+        with self.assertRaises(KeyError):
+            computer.run()
+
+
+class TestLinkedEngine(TestCase):
+    def run_all(self, program_text, inbox, memory_factory=Memory):
+        """Run on every engine, check they all agree with the interpreter."""
+        results = []
+        for engine in ENGINES:
+            computer = hrmulator.Computer(engine=engine)
+            computer.memory = memory_factory()
+            computer.set_inbox(inbox)
+            computer.load_program(program_text=program_text)
+            try:
+                computer.run()
+                error = None
+            except Exception as e:
+                error = type(e)
+            results.append((computer.outbox, computer.total_steps_executed, computer.accumulator, error))
+        for engine, result in zip(ENGINES, results):
+            self.assertEqual(result, results[0], engine)
+        return results[0]
+
+    def test_multiplication_workshop(self):
+        outbox, steps, _, error = self.run_all(
+            test_integration_000.program_text,
+            [3, 2, 0, 7],
+            test_integration_000.new_memory,
+        )
+        self.assertSequenceEqual(outbox, [6, 0])
+        self.assertIsNone(error)
+
+    def test_countdown(self):
+        outbox, steps, _, error = self.run_all(
+            test_integration_002.program_text, [3, -3, 0], lambda: Memory(labels={"counter": 0})
+        )
+        self.assertSequenceEqual(outbox, [3, 2, 1, 0, -3, -2, -1, 0, 0])
+
+    def test_accumulator_is_empty(self):
+        outbox, steps, _, error = self.run_all("move_from_inbox\nmove_to_outbox\nmove_to_outbox", [1])
+        self.assertIs(error, AccumulatorIsEmptyError)
+        self.assertEqual(steps, 2)
+
+    def test_incompatible_types(self):
+        outbox, steps, _, error = self.run_all(
+            "move_from_inbox\ncopy_to 0\nmove_from_inbox\nadd 0", ["A", 3], lambda: Memory()
+        )
+        self.assertIs(error, IncompatibleTypesError)
+        self.assertEqual(steps, 3)
+
+    def test_bad_jump_never_taken(self):
+        outbox, steps, _, error = self.run_all(
+            """
+            START:
+                move_from_inbox
+                jump_if_zero_to NOWHERE
+                jump_if_negative_to 99
+                jump_to START""",
+            [1] * 100,
+        )
+        self.assertIsNone(error)
+        self.assertEqual(steps, 400)
+
+    def test_bad_jump_taken(self):
+        outbox, steps, _, error = self.run_all(
+            """
+            START:
+                move_from_inbox
+                jump_if_zero_to NOWHERE
+                jump_if_negative_to 99
+                jump_to START""",
+            [1] * 100 + [-1],
+        )
+        self.assertIs(error, NoSuchJumpDestinationError)
+        self.assertEqual(steps, 402)
+
+    def test_tile_is_empty(self):
+        outbox, steps, _, error = self.run_all("move_from_inbox\nbump_up [0]", [1], lambda: Memory(values={0: 5}))
+        self.assertIs(error, MemoryTileIsEmptyError)
+
+    def test_indirect_through_letter(self):
+        outbox, steps, _, error = self.run_all("move_from_inbox\ncopy_to [0]", [1], lambda: Memory(values={0: "A"}))
+        self.assertIs(error, CantIndirectThroughLetter)
+
+    def test_program_counter_left_at_failing_step(self):
+        computer = hrmulator.Computer()
+        computer.load_program(program_text="no_op\nmove_to_outbox")
+        with self.assertRaises(AccumulatorIsEmptyError):
+            computer.run()
+        self.assertEqual(computer.program_counter, 1)
+        self.assertEqual(computer.total_steps_executed, 1)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            hrmulator.Computer(engine="warp-drive")
@@ -0,0 +1,151 @@
+import random
+from unittest import TestCase
+from unittest.mock import patch
+
+import hrmulator
+from hrmulator.Instructions import AccumulatorIsEmptyError, IncompatibleTypesError
+from hrmulator.Linker import Linker
+from hrmulator.Lockstep import LARGEST_VALUE, run_lockstep
+from hrmulator.Memory import CantIndirectThroughLetter, Memory, MemoryTileIsEmptyError
+from hrmulator.tests import (
+    test_integration_000,
+    test_integration_002,
+    test_integration_003,
+)
+
+STRING_REVERSE = """
+START:
+    move_from_inbox
+    jump_if_zero_to END
+    copy_to [pointer]
+    bump_up pointer
+    jump_to START
+END:
+    bump_down pointer
+    jump_if_negative_to DONE
+    copy_from [pointer]
+    move_to_outbox
+    jump_to END
+DONE:
+    move_from_inbox"""
+
+
+class TestLockstep(TestCase):
+    def assert_agrees(self, program_text, inboxes, memory_factory):
+        """Run each inbox on the interpreter, and check the lockstep run agrees; return its results."""
+        results = run_lockstep(program_text=program_text, memory=memory_factory(), inboxes=inboxes)
+        self.assertEqual(len(results), len(inboxes))
+        for inbox, result in zip(inboxes, results):
+            computer = hrmulator.Computer(engine="interpreter")
+            computer.memory = memory_factory()
+            computer.set_inbox(inbox)
+            computer.load_program(program_text=program_text)
+            try:
+                computer.run()
+                error = None
+            except Exception as e:
+                error = e
+            self.assertEqual(result.outbox, computer.outbox, inbox)
+            self.assertEqual(result.steps, computer.total_steps_executed, inbox)
+            self.assertIs(type(result.error), type(error), inbox)
+            if error is not None:
+                self.assertEqual(result.error.args, error.args, inbox)
+        return results
+
+    def test_multiplication_workshop(self):
+        rng = random.Random(0)
+        inboxes = [[rng.randint(-3, 12) for _ in range(rng.randint(0, 8))] for _ in range(200)]
+        self.assert_agrees(
+            test_integration_000.program_text,
+            inboxes,
+            test_integration_000.new_memory,
+        )
+
+    def test_countdown(self):
+        rng = random.Random(1)
+        inboxes = [[rng.randint(-20, 20) for _ in range(rng.randint(0, 5))] for _ in range(100)]
+        self.assert_agrees(test_integration_002.program_text, inboxes, lambda: Memory(labels={"counter": 0}))
+
+    def test_maximization_room_with_letters(self):
+        inboxes = [[3, 8, -9, -3], ["A", "C", "Z", "B"], [2, "A"], [7]]
+        results = self.assert_agrees(
+            test_integration_003.program_text, inboxes, lambda: Memory(labels={"A": 0, "B": 1})
+        )
+        self.assertEqual(results[1].outbox, ["C", "Z"])
+        self.assertIsInstance(results[2].error, IncompatibleTypesError)
+
+    def test_indirect(self):
+        inboxes = [list("HELLO") + [0], ["A", 0, "B", 0], [0], list("TOO LONG FOR THE FLOOR") + [0]]
+        self.assert_agrees(STRING_REVERSE, inboxes, lambda: Memory(labels={"pointer": 8}, values={"pointer": 0, 7: 0}))
+
+    def test_errors(self):
+        self.assert_agrees("move_to_outbox", [[]], Memory)
+        self.assert_agrees("copy_from 3", [[]], lambda: Memory(values={0: 0, 3: "A"}))
+        self.assert_agrees("copy_from 2", [[]], lambda: Memory(values={0: 0}))
+        self.assert_agrees("copy_from [0]", [[]], lambda: Memory(values={0: "A"}))
+        self.assert_agrees("copy_from nowhere", [[]], Memory)
+        self.assert_agrees("jump_to NOWHERE", [[]], Memory)
+        self.assert_agrees("move_from_inbox\njump_if_negative_to 0", [["A"], [-1], [1]], Memory)
+        results = self.assert_agrees("move_from_inbox\nadd 0", [[1], ["A"]], lambda: Memory(values={0: 1}))
+        self.assertIsNone(results[0].error)
+        self.assertIsInstance(results[1].error, IncompatibleTypesError)
+        self.assertIs(type(run_lockstep(program_text="move_to_outbox", inboxes=[[]])[0].error), AccumulatorIsEmptyError)
+        self.assertIs(type(run_lockstep(program_text="copy_from 0", inboxes=[[]])[0].error), MemoryTileIsEmptyError)
+        self.assertIs(
+            type(run_lockstep(program_text="copy_from [0]", memory=Memory(values={0: "A"}), inboxes=[[]])[0].error),
+            CantIndirectThroughLetter,
+        )
+
+    def test_subtracting_letters(self):
+        results = self.assert_agrees(
+            "move_from_inbox\ncopy_to 0\nmove_from_inbox\nsubtract 0\nmove_to_outbox",
+            [["A", "C"], ["C", "A"], [3, "A"], ["A", 3], [5, -2]],
+            Memory,
+        )
+        self.assertEqual([result.outbox for result in results], [[2], [-2], [], [], [-7]])
+
+    def test_values_too_big_for_the_lockstep(self):
+        big = LARGEST_VALUE * 4
+        self.assert_agrees(
+            """
+            START:
+                move_from_inbox
+                add 0
+                copy_to 0
+                move_to_outbox
+                jump_to START""",
+            [[LARGEST_VALUE - 1, LARGEST_VALUE - 1, 1], [big, 1], [1, 2, 3], [True]],
+            lambda: Memory(values={0: 0}),
+        )
+        self.assert_agrees("bump_up 0\nmove_to_outbox", [[], []], lambda: Memory(values={0: big}))
+
+    def test_write_outside_the_floor(self):
+        self.assert_agrees(
+            "move_from_inbox\ncopy_to 1\ncopy_to [1]\ncopy_from [1]\nmove_to_outbox", [[0], [1], [500]], Memory
+        )
+
+    def test_lanes_that_leave_share_one_link(self):
+        with patch.object(Linker, "link", autospec=True, side_effect=Linker.link) as link:
+            results = run_lockstep(
+                program_text="move_from_inbox\nadd 0\nmove_to_outbox\ncopy_from 1",
+                memory=Memory(values={0: 1}),
+                inboxes=[[1], ["A"], [2], ["B"]],
+            )
+        self.assertEqual(link.call_count, 1)
+        self.assertEqual([result.outbox for result in results], [[2], [], [3], []])
+
+    def test_engine(self):
+        inboxes = [list("HELLO") + [0], ["A", 0, "B", 0], [0], list("TOO LONG FOR THE FLOOR") + [0]]
+        for engine in ("linked", "interpreter"):
+            results = run_lockstep(
+                program_text=STRING_REVERSE,
+                memory=Memory(labels={"pointer": 8}, values={"pointer": 0, 7: 0}),
+                inboxes=inboxes,
+                engine=engine,
+            )
+            self.assertEqual(results[0].outbox, list("OLLEH"), engine)
+        with self.assertRaises(ValueError):
+            run_lockstep(program_text="move_from_inbox", inboxes=[[]], engine="transpiled")
+
+    def test_no_inboxes(self):
+        self.assertEqual(run_lockstep(program_text="move_from_inbox", inboxes=[]), [])
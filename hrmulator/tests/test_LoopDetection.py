@@ -0,0 +1,155 @@
+import copy
+from unittest import TestCase, mock
+
+import hrmulator
+from hrmulator.Batch import run_batch
+from hrmulator.Computer import WAITING
+from hrmulator.LoopDetection import HashedTiles, InfiniteLoopError
+from hrmulator.Memory import Memory
+from hrmulator.Streams import BoundedOutbox
+from hrmulator.tests import test_integration_000, test_integration_002
+
+SPIN = """
+START:
+    copy_from 0
+    jump_if_zero_to START
+    move_from_inbox"""
+
+OUTPUT_FOREVER = """
+    move_from_inbox
+    copy_to 1
+LOOP:
+    copy_from 1
+    move_to_outbox
+    copy_from 0
+    add 0
+    jump_if_zero_to LOOP"""
+
+COUNT_TO_100 = """
+LOOP:
+    bump_up 0
+    subtract 2
+    jump_if_zero_to DONE
+    copy_from 1
+    jump_to LOOP
+DONE:
+    move_to_outbox"""
+
+
+class TestLoopDetection(TestCase):
+    def run_all_ways(self, program_text, inbox, memory_factory):
+        """Run with loops detected on every engine that can, fused or not; check they agree, return one."""
+        computers = []
+        for engine in ("interpreter", "linked"):
+            for fuse in (False, True):
+                computer = hrmulator.Computer(engine=engine, fuse=fuse, detect_loops=True)
+                computer.memory = memory_factory()
+                computer.set_inbox(inbox)
+                computer.load_program(program_text=program_text)
+                try:
+                    computer.run()
+                    computer.error = None
+                except Exception as e:
+                    computer.error = e
+                computers.append(computer)
+        first = computers[0]
+        for computer in computers[1:]:
+            for attribute in ("outbox", "total_steps_executed", "accumulator", "program_counter"):
+                self.assertEqual(getattr(computer, attribute), getattr(first, attribute), attribute)
+            self.assertEqual(type(computer.error), type(first.error))
+            self.assertEqual(computer.memory.tiles, first.memory.tiles)
+        return first
+
+    def test_spinning(self):
+        computer = self.run_all_ways(SPIN, [1, 2, 3], lambda: Memory(values={0: 0}))
+        self.assertIsInstance(computer.error, InfiniteLoopError)
+        self.assertEqual((computer.error.first_step, computer.error.last_step), (0, 1))
+        self.assertEqual(computer.program_counter, 1)
+        self.assertEqual(list(computer.inbox), [1, 2, 3])
+
+    def test_outputting_forever(self):
+        computer = self.run_all_ways(OUTPUT_FOREVER, ["A"], lambda: Memory(values={0: 0}))
+        self.assertIsInstance(computer.error, InfiniteLoopError)
+        self.assertEqual((computer.error.first_step, computer.error.last_step), (2, 6))
+        self.assertEqual(set(computer.outbox), {"A"})
+
+    def test_outputting_until_the_outbox_closes(self):
+        for engine in ("interpreter", "linked"):
+            computer = hrmulator.Computer(engine=engine, detect_loops=True)
+            computer.memory = Memory(values={0: 0})
+            computer.set_inbox(["A"])
+            computer.set_outbox(BoundedOutbox(10))
+            computer.load_program(program_text=OUTPUT_FOREVER)
+            computer.run()
+            self.assertEqual(computer.outbox.values, ["A"] * 10)
+
+    def test_programs_that_stop_are_unaffected(self):
+        for program_text, inbox, memory_factory in (
+            (
+                test_integration_000.program_text,
+                [3, 2, 0, 7, 60, 60],
+                test_integration_000.new_memory,
+            ),
+            (test_integration_002.program_text, [30, -30, 0], lambda: Memory(labels={"counter": 0})),
+        ):
+            computer = self.run_all_ways(program_text, inbox, memory_factory)
+            self.assertIsNone(computer.error)
+            expected = hrmulator.Computer()
+            expected.memory = memory_factory()
+            expected.set_inbox(inbox)
+            expected.load_program(program_text=program_text)
+            expected.run()
+            self.assertEqual(computer.outbox, expected.outbox)
+            self.assertEqual(computer.total_steps_executed, expected.total_steps_executed)
+
+    def test_hash_collisions_are_not_loops(self):
+        # With every floor hashing the same, each trip round looks like the last.
+        with mock.patch("hrmulator.LoopDetection.hash", lambda item: 0, create=True):
+            computer = self.run_all_ways(COUNT_TO_100, [], lambda: Memory(values={0: 0, 1: 7, 2: 100}))
+        self.assertIsNone(computer.error)
+        self.assertEqual(computer.outbox, [0])
+
+    def test_refilling_the_inbox(self):
+        # the inbox is never any longer than 1, but the program is getting somewhere
+        for engine in ("interpreter", "linked"):
+            computer = hrmulator.Computer(engine=engine, detect_loops=True)
+            computer.load_program(program_text="START:\nmove_from_inbox\ncopy_to 0\nmove_to_outbox\njump_to START")
+            computer.start()
+            for _ in range(10):
+                computer.inbox.append(1)
+                self.assertIs(computer.resume(100), WAITING)
+            self.assertEqual(computer.outbox, [1] * 10)
+
+    def test_unsupported_engine(self):
+        with self.assertRaises(ValueError):
+            hrmulator.Computer(engine="transpiled", detect_loops=True)
+
+    def test_batch(self):
+        results = run_batch(
+            program_text=SPIN, memory=Memory(values={0: 0}), inboxes=[[]] * 3, detect_loops=True, backend="thread"
+        )
+        for result in results:
+            self.assertIsInstance(result.error, InfiniteLoopError)
+
+
+class TestHashedTiles(TestCase):
+    def test_hash_is_kept_up_to_date(self):
+        tiles = HashedTiles({0: 1, 5: "A"})
+        tiles[0] = 2
+        tiles[7] = 0
+        tiles[5] = "B"
+        self.assertEqual(tiles.hash, HashedTiles(dict(tiles)).hash)
+        self.assertNotEqual(tiles.hash, HashedTiles({0: 1, 5: "A"}).hash)
+
+    def test_copy(self):
+        tiles = HashedTiles({0: 1, 5: "A"})
+        copied = copy.deepcopy(tiles)
+        self.assertEqual(copied, tiles)
+        self.assertEqual(copied.hash, tiles.hash)
+
+    def test_clear_and_update(self):
+        tiles = HashedTiles({0: 1, 5: "A"})
+        tiles.clear()
+        self.assertEqual(tiles.hash, HashedTiles({}).hash)
+        tiles.update({2: 3, 4: "B"})
+        self.assertEqual(tiles.hash, HashedTiles({2: 3, 4: "B"}).hash)
@@ -1,7 +1,28 @@
+import copy
+import io
+import random
+from contextlib import redirect_stdout
 from unittest import TestCase
 
 import hrmulator
-from hrmulator.Memory import CantIndirectThroughLetter, CantStoreBadType, MemoryTileIsEmptyError
+from hrmulator.Computer import ENGINES
+from hrmulator.Memory import (
+    CantIndirectThroughLetter,
+    CantStoreBadType,
+    DenseMemory,
+    Memory,
+    MemoryTileIsEmptyError,
+    NoSuchTileError,
+    ProfiledMemory,
+)
+from hrmulator.tests import test_integration_000
+
+FILL_THE_FLOOR = """
+START:
+    move_from_inbox
+    copy_to [0]
+    bump_up 0
+    jump_to START"""
 
 
 class TestMemory(TestCase):
@@ -102,3 +123,223 @@ class TestMemory(TestCase):
             self.memory[0] = "hello"
         with self.assertRaises(CantStoreBadType):
             self.memory.set(0, 5.2, indirect=True)
+
+    def test_snapshot_and_restore(self):
+        self.memory.label_tile(0, "zero")
+        self.memory[0] = 0
+        self.memory[3] = "A"
+        tiles = self.memory.tiles
+        write = self.memory.writer(3)
+        snapshot = self.memory.snapshot()
+        write(7)
+        self.memory[4] = 1
+        self.memory.label_tile(4, "one")
+        self.memory.restore(snapshot)
+        self.assertIs(self.memory.tiles, tiles)
+        self.assertEqual(self.memory.tiles, {0: 0, 3: "A"})
+        self.assertEqual(dict(self.memory.label_map), {"zero": 0})
+        write(8)
+        self.assertEqual(self.memory[3], 8)
+
+    def test_journaled_snapshots(self):
+        self.memory[0] = 0
+        self.memory.journal()
+        tiles = self.memory.tiles
+        other = copy.deepcopy(self.memory)
+        other.journal()
+        rng = random.Random(2)
+        snapshots = []
+        for _ in range(500):
+            choice = rng.random()
+            if snapshots and choice < 0.2:
+                snapshot, expected = rng.choice(snapshots)
+                memory = self.memory if choice < 0.15 else other
+                memory.restore(snapshot)
+                self.assertEqual(dict(memory.tiles.items()), expected)
+            elif choice < 0.3:
+                snapshots.append((self.memory.snapshot(), dict(tiles.items())))
+            else:
+                self.memory[rng.randrange(6)] = rng.choice([0, 1, "A"])
+        self.assertIs(self.memory.tiles, tiles)
+
+    def test_labels_are_copied_on_write(self):
+        labels = self.memory.label_map
+        self.memory.label_tile(5, "five")
+        self.assertIsNot(self.memory.label_map, labels)
+        self.assertEqual(dict(labels), {})
+
+
+class TestDenseMemory(TestMemory):
+    # every test of a Memory, again, on a DenseMemory
+    def setUp(self):
+        self.memory = DenseMemory(size=100)
+
+    def test_off_the_floor(self):
+        memory = DenseMemory(values={0: 25, 1: -1}, size=25)
+        for access in (
+            lambda: memory[25],
+            lambda: memory.set(25, 1),
+            lambda: memory.get(0, indirect=True),
+            lambda: memory.set(1, 1, indirect=True),
+            lambda: memory.reader(0, indirect=True)(),
+            lambda: memory.writer(1, indirect=True)(1),
+            lambda: memory.reader(30)(),
+            lambda: memory.label_tile(30, "far"),
+            lambda: DenseMemory(labels={"far": 30}, size=25),
+        ):
+            with self.assertRaises(NoSuchTileError):
+                access()
+        self.assertEqual(memory.tiles, {0: 25, 1: -1})
+
+    def test_readers_and_writers(self):
+        memory = DenseMemory(labels={"pointer": 0}, values={"pointer": 3}, size=5)
+        memory.writer("pointer", indirect=True)("A")
+        self.assertEqual(memory.reader(3)(), "A")
+        self.assertEqual(memory.reader("pointer", indirect=True)(), "A")
+        with self.assertRaises(MemoryTileIsEmptyError):
+            memory.reader(4)()
+        with self.assertRaises(CantStoreBadType):
+            memory.writer(4)(5.2)
+
+    def test_tiles_are_like_a_dictionary(self):
+        tiles = DenseMemory(values={1: 5, 3: "A"}, size=5).tiles
+        self.assertEqual((len(tiles), list(tiles), tiles.items()), (2, [1, 3], [(1, 5), (3, "A")]))
+        self.assertEqual((tiles.get(0), tiles.get("A"), 3 in tiles, 4 in tiles), (None, None, True, False))
+        with self.assertRaises(KeyError):
+            tiles[0]
+        cells = tiles.cells
+        tiles.clear()
+        tiles.update({4: 1})
+        self.assertIs(tiles.cells, cells)
+        self.assertEqual(tiles, {4: 1})
+
+    def test_copies_are_linked_to_their_own_tiles(self):
+        memory = copy.deepcopy(DenseMemory(values={0: 1}, size=5))
+        memory.writer(0)(2)
+        self.assertEqual(memory[0], 2)
+
+    def run_everywhere(self, program_text, inbox, memory):
+        """Run on every engine, fused or not, a copy of `memory` each time; yield each computer, and its error."""
+        for engine in ENGINES:
+            for fuse in (False, True):
+                computer = hrmulator.Computer(engine=engine, fuse=fuse)
+                computer.memory = copy.deepcopy(memory)
+                computer.load_program(program_text=program_text)
+                computer.set_inbox(inbox)
+                try:
+                    computer.run()
+                    error = None
+                except Exception as e:
+                    error = e
+                yield computer, error
+
+    def test_every_engine(self):
+        for program_text, inbox, new_memory in (
+            (test_integration_000.program_text, [3, 2, 0, 7, 60, 60], test_integration_000.new_memory),
+            (FILL_THE_FLOOR, [1, 2, "A"], lambda memory_class: memory_class(values={0: 3})),
+        ):
+            by_memory = [
+                [
+                    (computer.outbox, computer.total_steps_executed, dict(computer.memory.tiles), type(error))
+                    for computer, error in self.run_everywhere(program_text, inbox, new_memory(memory_class))
+                ]
+                for memory_class in (Memory, DenseMemory)
+            ]
+            self.assertEqual(by_memory[1], by_memory[0])
+
+    def test_every_engine_stops_at_the_edge_of_the_floor(self):
+        for computer, error in self.run_everywhere(FILL_THE_FLOOR, range(30), DenseMemory(values={0: 1})):
+            self.assertIsInstance(error, NoSuchTileError, computer.engine)
+            self.assertEqual((computer.program_counter, computer.total_steps_executed), (1, 24 * 4 + 1))
+
+    def test_loops_are_not_detected(self):
+        computer = hrmulator.Computer(detect_loops=True)
+        computer.memory = DenseMemory()
+        computer.load_program(program_text="move_from_inbox")
+        with self.assertRaises(ValueError):
+            computer.run()
+
+
+class TestProfiledMemory(TestCase):
+    def accesses(self, memory):
+        return {
+            index: (a.reads, a.indirect_reads, a.writes, a.indirect_writes, a.pointer_uses, dict(a.read_after_write))
+            for index, a in memory.accesses.items()
+        }
+
+    def test_get_and_set(self):
+        memory = ProfiledMemory(labels={"pointer": 0}, values={"pointer": 3})
+        memory.set(3, 10)
+        memory.get("pointer", indirect=True)
+        memory.set("pointer", 11, indirect=True)
+        memory.get(3)
+        with self.assertRaises(MemoryTileIsEmptyError):
+            memory.get(4)
+        self.assertEqual(
+            self.accesses(memory),
+            {0: (0, 0, 0, 0, 2, {}), 3: (2, 1, 2, 1, 0, {2: 1, 1: 1})},
+        )
+
+    def test_brackets_count_like_get_and_set(self):
+        by_brackets = ProfiledMemory(labels={"pointer": 0}, values={"pointer": 3})
+        by_method = ProfiledMemory(labels={"pointer": 0}, values={"pointer": 3})
+        by_brackets["pointer"] = by_brackets[0] + 1
+        by_brackets[4] = by_brackets["pointer"]
+        by_method.set("pointer", by_method.get(0) + 1)
+        by_method.set(4, by_method.get("pointer"))
+        self.assertEqual(self.accesses(by_brackets), self.accesses(by_method))
+        self.assertEqual(self.accesses(by_brackets)[0], (2, 0, 1, 0, 0, {1: 1}))
+
+    def test_readers_and_writers_count_the_same(self):
+        by_method = ProfiledMemory(values={0: 5, 5: 1})
+        by_function = ProfiledMemory(values={0: 5, 5: 1})
+        for indirect in (False, True, True, False):
+            by_method.set(1, by_method.get(0, indirect=indirect))
+            by_method.set(0, 5, indirect=indirect)
+            by_function.writer(1)(by_function.reader(0, indirect=indirect)())
+            by_function.writer(0, indirect=indirect)(5)
+        self.assertEqual(self.accesses(by_function), self.accesses(by_method))
+
+    def test_running(self):
+        results = []
+        for engine in ("interpreter", "linked"):
+            computer = hrmulator.Computer(engine=engine, profile=True)
+            computer.memory = test_integration_000.new_memory(ProfiledMemory)
+            computer.load_program(program_text=test_integration_000.program_text)
+            computer.set_inbox([3, 2, 0, 7, 60, 60])
+            computer.run()
+            results.append(self.accesses(computer.memory))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][1][:2], (61, 0))
+
+    def test_counting_loops_and_fusion_are_counted_too(self):
+        for engine in ("interpreter", "linked"):
+            for fuse in (False, True):
+                computer = hrmulator.Computer(engine=engine, fuse=fuse)
+                computer.memory = ProfiledMemory(values={0: 100})
+                computer.load_program(
+                    program_text="LOOP:\nbump_down 0\njump_if_zero_to DONE\njump_to LOOP\nDONE:\nmove_to_outbox"
+                )
+                computer.run()
+                self.assertEqual(self.accesses(computer.memory)[0][:3], (100, 0, 100))
+
+    def test_engines_that_cant_count(self):
+        for engine in ("transpiled", "bytecode", "jit"):
+            computer = hrmulator.Computer(engine=engine)
+            computer.memory = ProfiledMemory(values={0: 1})
+            computer.load_program(program_text="bump_down 0")
+            with self.assertRaises(ValueError):
+                computer.run()
+
+    def test_heat_map(self):
+        memory = ProfiledMemory(labels={"hot": 4})
+        for _ in range(3):
+            memory.set("hot", 1)
+        memory.set(0, 1)
+        with redirect_stdout(io.StringIO()) as output:
+            memory.print_heat_map()
+        lines = output.getvalue().splitlines()
+        self.assertIn("hot", lines[1])
+        self.assertIn(" 0", lines[2])
+        memory.reset_profile()
+        self.assertEqual(memory.accesses, {})
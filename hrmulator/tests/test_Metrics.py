@@ -0,0 +1,141 @@
+import os
+import tempfile
+import threading
+import urllib.request
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.AssemblyCache import AssemblyCache
+from hrmulator.Batch import run_batch
+from hrmulator.Memory import Memory
+from hrmulator.Metrics import CONTENT_TYPE, ExecutorMetrics, Registry
+from hrmulator.tests import test_integration_000
+
+INBOXES = [[3, 2, 0, 7], [], [5, "A"], [-2, 9]]
+
+
+class TestMetrics(TestCase):
+    def run_all(self, metrics, **options):
+        steps = 0
+        for inbox in INBOXES:
+            computer = hrmulator.Computer(metrics=metrics, **options)
+            computer.memory = test_integration_000.new_memory()
+            computer.load_program(program_text=test_integration_000.program_text)
+            computer.set_inbox(inbox)
+            try:
+                computer.run()
+            except Exception:
+                pass
+            steps += computer.total_steps_executed
+        return steps
+
+    def test_runs(self):
+        metrics = ExecutorMetrics()
+        steps = self.run_all(metrics, assembly_cache=AssemblyCache())
+        self.assertEqual(metrics.runs.value(), len(INBOXES))
+        self.assertEqual(metrics.steps.value(), steps)
+        self.assertEqual(metrics.errors.values, {"IncompatibleTypesError": 1})
+        self.assertEqual(metrics.run_seconds.count, len(INBOXES))
+        self.assertEqual(metrics.assembly_seconds.count, 1)  # only the first load assembled it
+        self.assertGreater(metrics.steps_per_second.value, 0)
+        self.assertEqual(metrics.instructions.values, {})
+
+    def test_instructions_by_opcode(self):
+        metrics = ExecutorMetrics()
+        steps = self.run_all(metrics, profile=True)
+        self.assertEqual(sum(metrics.instructions.values.values()), steps)
+        self.assertEqual(metrics.instructions.value("move_from_inbox"), 8)
+        # a profiler that carries on from one run to the next is counted once
+        computer = hrmulator.Computer(metrics=metrics, profile=True)
+        computer.load_program(program_text="move_from_inbox\nmove_to_outbox")
+        for _ in range(3):
+            computer.set_inbox([1])
+            computer.run()
+        self.assertEqual(metrics.instructions.value("move_to_outbox"), 3 + 3)
+
+    def test_batch(self):
+        for backend in ("process", "thread"):
+            metrics = ExecutorMetrics()
+            results = run_batch(
+                program_text=test_integration_000.program_text,
+                memory=test_integration_000.new_memory(),
+                inboxes=INBOXES,
+                backend=backend,
+                max_workers=2,
+                metrics=metrics,
+            )
+            self.assertEqual(metrics.runs.value(), len(INBOXES))
+            self.assertEqual(metrics.steps.value(), sum(result.steps for result in results))
+            self.assertEqual(metrics.errors.values, {"IncompatibleTypesError": 1})
+            self.assertEqual(metrics.run_seconds.count, len(INBOXES))
+
+    def test_exposition(self):
+        registry = Registry()
+        counter = registry.counter("things", "Things.", label="kind")
+        counter.inc(2, label_value='say "hi"')
+        histogram = registry.histogram("seconds", "Seconds.", buckets=(1, 2))
+        for value in (0.5, 1, 1.5, 3):
+            histogram.observe(value)
+        registry.gauge("level", "Level.").set(1.5)
+        self.assertIs(registry.counter("things", "Things.", label="kind"), counter)
+        with self.assertRaises(ValueError):
+            registry.gauge("things", "Things.")
+        self.assertEqual(
+            registry.exposition().splitlines(),
+            [
+                "# TYPE things counter",
+                "# HELP things Things.",
+                'things_total{kind="say \\"hi\\""} 2',
+                "# TYPE seconds histogram",
+                "# HELP seconds Seconds.",
+                'seconds_bucket{le="1.0"} 2',
+                'seconds_bucket{le="2.0"} 3',
+                'seconds_bucket{le="+Inf"} 4',
+                "seconds_sum 6.0",
+                "seconds_count 4",
+                "# TYPE level gauge",
+                "# HELP level Level.",
+                "level 1.5",
+                "# EOF",
+            ],
+        )
+
+    def test_threads_share_metrics(self):
+        metrics = ExecutorMetrics()
+
+        def run():
+            for _ in range(200):
+                computer = hrmulator.Computer(metrics=metrics)
+                computer.memory = Memory(values={0: 0})
+                computer.load_program(program_text="bump_up 0")
+                computer.run()
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((metrics.runs.value(), metrics.steps.value(), metrics.run_seconds.count), (800, 800, 800))
+
+    def test_write(self):
+        metrics = ExecutorMetrics()
+        self.run_all(metrics)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hrmulator.prom")
+            metrics.registry.write(path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), metrics.registry.exposition())
+            self.assertEqual(os.listdir(directory), ["hrmulator.prom"])
+
+    def test_serve(self):
+        metrics = ExecutorMetrics()
+        self.run_all(metrics)
+        server = metrics.registry.serve()
+        try:
+            host, port = server.server_address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                self.assertEqual(response.headers["Content-Type"], CONTENT_TYPE)
+                self.assertEqual(response.read().decode("utf-8"), metrics.registry.exposition())
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,176 @@
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.Computer import PAUSED
+from hrmulator.Instructions import AccumulatorIsEmptyError, IncompatibleTypesError
+from hrmulator.Memory import Memory
+from hrmulator.Observers import Observer
+from hrmulator.tests import test_integration_000
+
+INBOX = [3, 2, 0, 7, 60, 60, -2, 5]
+
+
+class Recorder(Observer):
+    """Records every event, in order."""
+
+    def __init__(self):
+        self.events = []
+
+    def on_read(self, computer, index, value):
+        self.events.append(("read", index, value))
+
+    def on_write(self, computer, index, value):
+        self.events.append(("write", index, value))
+
+    def on_inbox(self, computer, value):
+        self.events.append(("inbox", value))
+
+    def on_outbox(self, computer, value):
+        self.events.append(("outbox", value))
+
+    def on_step(self, computer, step, instruction):
+        self.events.append(("step", step, computer.program_counter))
+
+    def on_error(self, computer, error):
+        self.events.append(("error", type(error)))
+
+
+class StepCounter(Observer):
+    def __init__(self):
+        self.steps = 0
+
+    def on_step(self, computer, step, instruction):
+        self.steps += 1
+
+
+class TestObservers(TestCase):
+    def observe(self, observer, program_text=test_integration_000.program_text, inbox=INBOX, memory=None, **options):
+        computer = hrmulator.Computer(**options)
+        computer.add_observer(observer)
+        computer.memory = memory if memory is not None else test_integration_000.new_memory()
+        computer.load_program(program_text=program_text)
+        computer.set_inbox(inbox)
+        computer.run()
+        return computer
+
+    def test_every_way_agrees(self):
+        first = Recorder()
+        computer = self.observe(first, engine="interpreter")
+        steps = [event for event in first.events if event[0] == "step"]
+        self.assertEqual(len(steps), computer.total_steps_executed)
+        self.assertEqual([event[1] for event in first.events if event[0] == "outbox"], computer.outbox)
+        self.assertEqual([event[1] for event in first.events if event[0] == "inbox"], INBOX)
+        for engine in ("interpreter", "linked"):
+            for fuse in (False, True):
+                for detect_loops in (False, True):
+                    recorder = Recorder()
+                    self.observe(recorder, engine=engine, fuse=fuse, detect_loops=detect_loops, profile=detect_loops)
+                    self.assertEqual(recorder.events, first.events)
+
+    def test_order_of_events(self):
+        recorder = Recorder()
+        self.observe(
+            recorder,
+            program_text="move_from_inbox\ncopy_to 0\nbump_up [1]\nadd 0\nmove_to_outbox",
+            inbox=[5],
+            memory=Memory(values={1: 0}),
+        )
+        self.assertEqual(
+            recorder.events,
+            [
+                ("inbox", 5),
+                ("step", 0, 1),
+                ("write", 0, 5),
+                ("step", 1, 2),
+                ("read", 1, 0),
+                ("read", 0, 5),
+                ("write", 0, 6),
+                ("step", 2, 3),
+                ("read", 0, 6),
+                ("step", 3, 4),
+                ("outbox", 12),
+                ("step", 4, 5),
+            ],
+        )
+
+    def test_indirect_copy_to_reads_its_pointer(self):
+        for engine in ("interpreter", "linked"):
+            recorder = Recorder()
+            self.observe(
+                recorder,
+                program_text="move_from_inbox\ncopy_to [1]",
+                inbox=[5],
+                memory=Memory(values={1: 3}),
+                engine=engine,
+            )
+            self.assertEqual(recorder.events[2:], [("read", 1, 3), ("write", 3, 5), ("step", 1, 2)])
+
+    def test_hooks_see_the_step_count(self):
+        class Counts(Observer):
+            def __init__(self):
+                self.counts = []
+
+            def on_step(self, computer, step, instruction):
+                self.counts.append(computer.total_steps_executed)
+
+        for engine in ("interpreter", "linked"):
+            counts = Counts()
+            computer = self.observe(counts, engine=engine)
+            self.assertEqual(counts.counts, list(range(1, computer.total_steps_executed + 1)))
+
+    def test_errors(self):
+        for engine in ("interpreter", "linked"):
+            recorder = Recorder()
+            with self.assertRaises(IncompatibleTypesError):
+                self.observe(
+                    recorder,
+                    program_text="move_from_inbox\nadd 0",
+                    inbox=["A"],
+                    memory=Memory(values={0: 1}),
+                    engine=engine,
+                )
+            self.assertEqual(recorder.events[-1], ("error", IncompatibleTypesError))
+            recorder = Recorder()
+            with self.assertRaises(AccumulatorIsEmptyError):
+                self.observe(recorder, program_text="move_to_outbox", inbox=[], engine=engine)
+            self.assertEqual(recorder.events, [("error", AccumulatorIsEmptyError)])
+            # an empty inbox is how programs normally stop
+            recorder = Recorder()
+            self.observe(recorder, program_text="move_from_inbox", inbox=[], engine=engine)
+            self.assertEqual(recorder.events, [])
+
+    def test_only_overridden_methods_are_called(self):
+        counter = StepCounter()
+        computer = self.observe(counter)
+        self.assertEqual(counter.steps, computer.total_steps_executed)
+        hooks = computer._program_to_run()[0].hooks
+        self.assertEqual(len(hooks.on_step), 1)
+        self.assertEqual(hooks.on_read, [])
+        self.assertEqual(hooks.on_error, [])
+
+    def test_no_observers_no_wrapping(self):
+        computer = hrmulator.Computer()
+        computer.load_program(program_text=test_integration_000.program_text)
+        self.assertIs(computer._program_to_run(), computer.program)
+        observer = StepCounter()
+        computer.add_observer(observer)
+        self.assertIsNot(computer._program_to_run(), computer.program)
+        computer.remove_observer(observer)
+        self.assertIs(computer._program_to_run(), computer.program)
+
+    def test_resume(self):
+        counter = StepCounter()
+        computer = hrmulator.Computer()
+        computer.add_observer(counter)
+        computer.memory = test_integration_000.new_memory()
+        computer.load_program(program_text=test_integration_000.program_text)
+        computer.set_inbox(INBOX)
+        computer.start()
+        while computer.resume(7) is PAUSED:
+            pass
+        self.assertEqual(counter.steps, computer.total_steps_executed)
+
+    def test_unsupported_engines(self):
+        for engine in ("transpiled", "bytecode", "jit"):
+            with self.assertRaises(ValueError):
+                hrmulator.Computer(engine=engine).add_observer(Observer())
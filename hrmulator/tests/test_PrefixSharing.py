@@ -0,0 +1,92 @@
+import random
+from unittest import TestCase
+
+from hrmulator.Batch import run_batch
+from hrmulator.LoopDetection import InfiniteLoopError
+from hrmulator.Memory import Memory
+from hrmulator.PrefixSharing import run_shared
+from hrmulator.tests import test_integration_000, test_integration_002
+
+# Fails at the first "A", and spins forever at the first 0 after a 1.
+STOP_OR_SPIN = """
+START:
+    move_from_inbox
+    copy_to 0
+    subtract 1
+    jump_if_zero_to ONE
+    copy_from 0
+    move_to_outbox
+    jump_to START
+ONE:
+    move_from_inbox
+    jump_if_zero_to SPIN
+    move_to_outbox
+    jump_to START
+SPIN:
+    jump_to SPIN"""
+
+
+def family_of_inboxes(values, count, seed):
+    """Inboxes made by extending, and branching off, ones made before."""
+    rng = random.Random(seed)
+    inboxes = [[]]
+    for _ in range(count):
+        inbox = list(rng.choice(inboxes))
+        del inbox[rng.randrange(len(inbox) + 1) :]
+        inbox.extend(rng.choice(values) for _ in range(rng.randrange(4)))
+        inboxes.append(inbox)
+    rng.shuffle(inboxes)
+    return inboxes
+
+
+class TestPrefixSharing(TestCase):
+    def assert_same_as_run_batch(self, inboxes, **job):
+        expected = run_batch(inboxes=inboxes, backend="thread", **job)
+        for engine in ("interpreter", "linked"):
+            results = run_shared(inboxes=inboxes, engine=engine, **job)
+            self.assertEqual(len(results), len(expected))
+            for result, expected_result, inbox in zip(results, expected, inboxes):
+                self.assertEqual(result.outbox, expected_result.outbox, inbox)
+                self.assertEqual(result.steps, expected_result.steps, inbox)
+                self.assertEqual(type(result.error), type(expected_result.error), inbox)
+                if isinstance(result.error, InfiniteLoopError):
+                    self.assertEqual(result.error.args, expected_result.error.args)
+
+    def test_multiplying(self):
+        memory = test_integration_000.new_memory()
+        inboxes = family_of_inboxes([0, 1, 3, -2, "A"], 200, seed=0)
+        self.assertIn([], inboxes)
+        self.assert_same_as_run_batch(inboxes, program_text=test_integration_000.program_text, memory=memory)
+
+    def test_counting(self):
+        inboxes = family_of_inboxes([0, 5, -3, 40], 200, seed=1)
+        self.assert_same_as_run_batch(
+            inboxes, program_text=test_integration_002.program_text, memory=Memory(labels={"counter": 0})
+        )
+
+    def test_stopping_and_looping(self):
+        inboxes = family_of_inboxes([0, 1, 2, "A"], 200, seed=2)
+        self.assert_same_as_run_batch(
+            inboxes, program_text=STOP_OR_SPIN, memory=Memory(values={1: 1}), detect_loops=True
+        )
+
+    def test_the_same_values_again_are_not_a_loop(self):
+        inboxes = [[1, 1, 1, 1, 1], [1, 1, 1, 1, 2]]
+        program_text = "START:\nmove_from_inbox\ncopy_to 0\nmove_to_outbox\njump_to START"
+        for result, inbox in zip(run_shared(program_text=program_text, inboxes=inboxes, detect_loops=True), inboxes):
+            self.assertEqual((result.outbox, result.error), (inbox, None))
+
+    def test_duplicates_and_nothing(self):
+        self.assertEqual(run_shared(program_text="move_from_inbox", inboxes=[]), [])
+        results = run_shared(program_text="move_from_inbox\nmove_to_outbox", inboxes=[[1, 2], [1, 2], [1]])
+        self.assertEqual([result.outbox for result in results], [[1], [1], [1]])
+        self.assertIsNot(results[0].outbox, results[1].outbox)
+
+    def test_memory_is_left_alone(self):
+        memory = Memory(values={0: 0})
+        run_shared(program_text="move_from_inbox\ncopy_to 0", memory=memory, inboxes=[[5], [6]])
+        self.assertEqual(memory.tiles, {0: 0})
+
+    def test_unsupported_engine(self):
+        with self.assertRaises(ValueError):
+            run_shared(program_text="move_from_inbox", inboxes=[[1]], engine="bytecode")
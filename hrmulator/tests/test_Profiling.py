@@ -0,0 +1,87 @@
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.tests import test_integration_000
+
+INBOX = [3, 2, 0, 7, 60, 60, -2, 5]
+
+
+class TestProfiling(TestCase):
+    def profile(self, **options):
+        computer = hrmulator.Computer(profile=True, **options)
+        computer.memory = test_integration_000.new_memory()
+        computer.load_program(program_text=test_integration_000.program_text)
+        computer.set_inbox(INBOX)
+        computer.run()
+        return computer
+
+    def test_every_way_agrees(self):
+        first = self.profile(engine="interpreter")
+        self.assertEqual(first.profiler.total(), first.total_steps_executed)
+        plain = hrmulator.Computer(fuse=True)
+        plain.memory = test_integration_000.new_memory()
+        plain.load_program(program_text=test_integration_000.program_text)
+        plain.set_inbox(INBOX)
+        plain.run()
+        self.assertEqual(first.total_steps_executed, plain.total_steps_executed)
+        for engine in ("interpreter", "linked"):
+            for fuse in (False, True):
+                for detect_loops in (False, True):
+                    computer = self.profile(engine=engine, fuse=fuse, detect_loops=detect_loops)
+                    self.assertEqual(computer.profiler.counts, first.profiler.counts)
+                    self.assertEqual(computer.profiler.taken, first.profiler.taken)
+                    self.assertEqual(computer.outbox, plain.outbox)
+
+    def test_counts(self):
+        computer = self.profile()
+        profiler = computer.profiler
+        loop = computer.jump_table["LOOP"]
+        # A goes down to 0, for 3 * 2 and 60 * 60, or below it, for 0 * 7 and -2 * 5
+        self.assertEqual(profiler.counts[loop + 1], 3 + 60 + 1 + 1)
+        self.assertEqual(profiler.taken[loop + 1], 2)
+        self.assertEqual(profiler.taken[loop + 2], 2)
+        rollup = profiler.by_label()
+        self.assertEqual(sum(rollup.values()), profiler.total())
+        self.assertEqual(max(rollup, key=rollup.get), "LOOP")
+        self.assertNotIn(None, rollup)
+
+    def test_counts_add_up_until_the_program_is_loaded_again(self):
+        computer = self.profile()
+        counts = list(computer.profiler.counts)
+        computer.set_inbox(INBOX)
+        computer.memory = test_integration_000.new_memory()
+        computer.run()
+        self.assertEqual(computer.profiler.counts, [2 * count for count in counts])
+        computer.load_program(program_text=test_integration_000.program_text)
+        computer.set_inbox(INBOX)
+        computer.memory = test_integration_000.new_memory()
+        computer.run()
+        self.assertEqual(computer.profiler.counts, counts)
+
+    def test_steps_before_any_label(self):
+        computer = hrmulator.Computer(profile=True)
+        computer.load_program(program_text="move_from_inbox\nLOOP:\nmove_to_outbox")
+        computer.set_inbox([1])
+        computer.run()
+        self.assertEqual(computer.profiler.by_label(), {None: 1, "LOOP": 1})
+
+    def test_print_profile(self):
+        computer = self.profile()
+        with redirect_stdout(io.StringIO()) as output:
+            computer.print_profile()
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len([line for line in lines if "taken" in line]), 3)
+        self.assertTrue(lines[-1].endswith(f"{computer.total_steps_executed} steps in all"))
+        self.assertIn("LOOP", lines[-6])
+
+    def test_no_profile(self):
+        computer = hrmulator.Computer()
+        computer.load_program(program_text=test_integration_000.program_text)
+        computer.run()
+        self.assertIsNone(computer.profiler)
+
+    def test_unsupported_engine(self):
+        with self.assertRaises(ValueError):
+            hrmulator.Computer(engine="jit", profile=True)
@@ -0,0 +1,107 @@
+import itertools
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.Instructions import AccumulatorIsEmptyError
+from hrmulator.LoopDetection import InfiniteLoopError
+from hrmulator.Memory import Memory
+from hrmulator.Scheduler import Scheduler, StepBudgetExceededError
+from hrmulator.tests import test_integration_002
+
+COPY = """
+START:
+    move_from_inbox
+    move_to_outbox
+    jump_to START"""
+
+
+def new_computer(program_text, inbox, memory=None, **options):
+    computer = hrmulator.Computer(**options)
+    computer.memory = memory if memory is not None else Memory()
+    computer.load_program(program_text=program_text)
+    computer.set_inbox(inbox)
+    return computer
+
+
+class TestScheduler(TestCase):
+    def test_same_results_as_run(self):
+        inboxes = [[30, -30, 0], [], [5, -7], [1000, 2, 0, -1]]
+        scheduler = Scheduler(quantum=7)
+        tasks = []
+        for engine in ("interpreter", "linked"):
+            for fuse in (False, True):
+                for inbox in inboxes:
+                    computer = new_computer(
+                        test_integration_002.program_text,
+                        inbox,
+                        Memory(labels={"counter": 0}),
+                        engine=engine,
+                        fuse=fuse,
+                    )
+                    tasks.append((scheduler.add(computer), inbox))
+        scheduler.run()
+        for task, inbox in tasks:
+            expected = new_computer(test_integration_002.program_text, inbox, Memory(labels={"counter": 0}))
+            expected.run()
+            self.assertTrue(task.finished)
+            self.assertIsNone(task.error)
+            self.assertEqual(task.computer.outbox, expected.outbox)
+            self.assertEqual(task.steps, expected.total_steps_executed)
+            self.assertIsNone(task.computer.program_counter)
+
+    def test_priorities(self):
+        scheduler = Scheduler(quantum=10)
+        low = scheduler.add(new_computer(COPY, itertools.count()), budget=4000)
+        high = scheduler.add(new_computer(COPY, itertools.count()), priority=3, budget=9000)
+        # while both are running, the high priority one gets three times the steps
+        while not high.finished:
+            scheduler.run_slice()
+        self.assertAlmostEqual(low.steps / 3000, 1, delta=0.01)
+        self.assertIsInstance(high.error, StepBudgetExceededError)
+        self.assertIsNone(low.error)
+        scheduler.run()
+        self.assertIsInstance(low.error, StepBudgetExceededError)
+        self.assertEqual(scheduler.tasks, [low, high])
+
+    def test_a_late_arrival_does_not_catch_up(self):
+        scheduler = Scheduler(quantum=10)
+        early = scheduler.add(new_computer(COPY, itertools.count()))
+        for _ in range(100):
+            scheduler.run_slice()
+        late = scheduler.add(new_computer(COPY, itertools.count()))
+        for _ in range(100):
+            scheduler.run_slice()
+        self.assertEqual(early.slices, 150)
+        self.assertEqual(late.slices, 50)
+
+    def test_an_endless_program_does_not_hold_up_the_rest(self):
+        scheduler = Scheduler(quantum=100)
+        endless = scheduler.add(new_computer(COPY, itertools.count()))
+        quick = scheduler.add(new_computer(COPY, [1, 2, 3]))
+        while not quick.finished:
+            scheduler.run_slice()
+        self.assertEqual(quick.computer.outbox, [1, 2, 3])
+        self.assertLess(endless.steps, 200)
+
+    def test_errors_are_kept(self):
+        scheduler = Scheduler()
+        failing = scheduler.add(new_computer("move_to_outbox", []))
+        looping = scheduler.add(
+            new_computer(
+                "START:\n    copy_from 0\n    jump_if_zero_to START", [], Memory(values={0: 0}), detect_loops=True
+            )
+        )
+        fine = scheduler.add(new_computer(COPY, [1]))
+        scheduler.run()
+        self.assertIsInstance(failing.error, AccumulatorIsEmptyError)
+        self.assertIsInstance(looping.error, InfiniteLoopError)
+        self.assertIsNone(fine.error)
+        self.assertTrue(all(task.finished for task in scheduler.tasks))
+
+    def test_bad_priority(self):
+        with self.assertRaises(ValueError):
+            Scheduler().add(new_computer(COPY, []), priority=0)
+
+    def test_unsupported_engine(self):
+        with self.assertRaises(ValueError):
+            Scheduler().add(new_computer(COPY, [], engine="jit"))
@@ -0,0 +1,130 @@
+import io
+import itertools
+from collections import deque
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+import hrmulator
+from hrmulator.Computer import ENGINES
+from hrmulator.Memory import Memory
+from hrmulator.Streams import (
+    BoundedOutbox,
+    CallbackOutbox,
+    GeneratorOutbox,
+    ListInbox,
+    StreamingInbox,
+)
+from hrmulator.tests import test_integration_002
+
+COPY = """
+START:
+    move_from_inbox
+    move_to_outbox
+    jump_to START"""
+
+
+class TestStreams(TestCase):
+    def run_everywhere(self, program_text, new_inbox, new_outbox, memory_factory=Memory):
+        """Run on every engine, fused and not; check they agree, and return the interpreter's computer."""
+        computers = []
+        for engine in ENGINES:
+            for fuse in (False, True):
+                computer = hrmulator.Computer(engine=engine, fuse=fuse)
+                computer.memory = memory_factory()
+                computer.load_program(program_text=program_text)
+                computer.set_inbox(new_inbox())
+                computer.set_outbox(new_outbox())
+                computer.run()
+                computers.append(computer)
+        first = computers[0]
+        for computer in computers[1:]:
+            # Callback and generator outboxes are checked by what they were sent.
+            if isinstance(first.outbox, (list, deque, BoundedOutbox)):
+                self.assertEqual(repr(computer.outbox), repr(first.outbox), computer.engine)
+            self.assertEqual(computer.total_steps_executed, first.total_steps_executed, computer.engine)
+        return first
+
+    def test_inbox_is_read_lazily(self):
+        taken = []
+
+        def numbers():
+            for n in itertools.count():
+                taken.append(n)
+                yield n
+
+        computer = hrmulator.Computer()
+        computer.load_program(program_text=COPY)
+        computer.set_inbox(numbers())
+        computer.set_outbox(BoundedOutbox(3))
+        computer.run()
+        self.assertEqual(taken, [0, 1, 2])
+        self.assertIsInstance(computer.inbox, StreamingInbox)
+        self.assertEqual(computer.inbox.taken, 3)
+
+    def test_finite_stream(self):
+        computer = self.run_everywhere(COPY, lambda: iter(range(10)), lambda: None)
+        self.assertEqual(computer.outbox, list(range(10)))
+
+    def test_bounded_outbox(self):
+        computer = self.run_everywhere(COPY, itertools.count, lambda: BoundedOutbox(4))
+        self.assertEqual(computer.outbox.values, [0, 1, 2, 3])
+        self.assertEqual(computer.total_steps_executed, 10)
+
+    def test_outbox_closing_inside_a_counting_loop(self):
+        computer = self.run_everywhere(
+            test_integration_002.program_text,
+            lambda: iter([1000]),
+            lambda: BoundedOutbox(10),
+            lambda: Memory(labels={"counter": 0}),
+        )
+        self.assertEqual(computer.outbox.values, list(range(1000, 990, -1)))
+
+    def test_callback_outbox(self):
+        seen = []
+        computer = self.run_everywhere(
+            COPY, lambda: iter("HELLO"), lambda: CallbackOutbox(lambda value: seen.append(value) or value == "L")
+        )
+        self.assertTrue(computer.outbox.closed)
+        self.assertEqual(seen, list("HEL") * 10)
+
+    def test_generator_outbox(self):
+        def total_of_five(results):
+            total = 0
+            for _ in range(5):
+                total += yield
+            results.append(total)
+
+        results = []
+        self.run_everywhere(COPY, itertools.count, lambda: GeneratorOutbox(total_of_five(results)))
+        self.assertEqual(results, [10] * 10)
+
+    def test_deque_keeps_the_last_few(self):
+        computer = self.run_everywhere(COPY, lambda: iter(range(1000)), lambda: deque(maxlen=3))
+        self.assertEqual(list(computer.outbox), [997, 998, 999])
+
+    def test_print_run_program(self):
+        computer = hrmulator.Computer()
+        computer.set_outbox(BoundedOutbox(2))
+        with redirect_stdout(io.StringIO()) as output:
+            computer.print_run_program(program_text=COPY, inbox=itertools.count())
+        self.assertIn("<a stream, 2 values taken>", output.getvalue())
+        self.assertIn("[0, 1]", output.getvalue())
+
+    def test_loop_detection_follows_the_stream(self):
+        computer = hrmulator.Computer(detect_loops=True)
+        computer.load_program(program_text="START:\n    move_from_inbox\n    jump_to START")
+        computer.set_inbox(itertools.repeat(0, 10000))
+        computer.run()
+        self.assertEqual(computer.inbox.taken, 10000)
+
+    def test_list_inbox(self):
+        inbox = ListInbox([1, 2])
+        self.assertEqual(inbox.popleft(), 1)
+        copy = inbox.copy()
+        inbox.append(3)
+        copy.append(4)
+        self.assertEqual((list(inbox), list(copy)), ([2, 3], [2, 4]))
+        self.assertEqual([inbox.popleft(), inbox.popleft()], [2, 3])
+        self.assertEqual((len(inbox), inbox.position(), copy.position()), (0, 3, 1))
+        with self.assertRaises(IndexError):
+            inbox.popleft()
@@ -0,0 +1,115 @@
+import os
+import random
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import hrmulator
+from hrmulator.Computer import PAUSED
+from hrmulator.Instructions import IncompatibleTypesError
+from hrmulator.Memory import Memory
+from hrmulator.tests import test_integration_000
+from hrmulator.TraceFiles import TraceFile, TraceWriter
+
+INBOX = [3, 2, 0, 7, 60, 60, -2, 5, 4, "A"]
+
+
+class TestTraceFiles(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "run.hrmtrace")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def new_computer(self, **options):
+        computer = hrmulator.Computer(**options)
+        computer.memory = test_integration_000.new_memory()
+        computer.load_program(program_text=test_integration_000.program_text)
+        computer.set_inbox(INBOX)
+        return computer
+
+    def states_step_by_step(self):
+        """The state after each step, the slow way."""
+        computer = self.new_computer(engine="interpreter")
+        computer.start()
+        states = []
+        while True:
+            states.append(
+                (
+                    computer.program_counter,
+                    computer.accumulator,
+                    computer.total_steps_executed,
+                    dict(computer.memory.tiles),
+                    list(computer.outbox),
+                )
+            )
+            try:
+                if computer.resume(1) is not PAUSED:
+                    break
+            except IncompatibleTypesError:
+                break
+        return states
+
+    def test_every_state_is_in_the_trace(self):
+        expected = self.states_step_by_step()
+        for engine in ("interpreter", "linked"):
+            for chunk_steps in (1, 7, 1 << 16):
+                computer = self.new_computer(engine=engine, fuse=True)
+                with self.assertRaises(IncompatibleTypesError):
+                    with TraceWriter(self.path, computer, chunk_steps=chunk_steps):
+                        computer.run()
+                self.assertEqual(computer.observers, [])
+                with TraceFile(self.path) as trace:
+                    self.assertEqual(len(trace), len(expected) - 1)
+                    self.assertEqual(trace.error, "IncompatibleTypesError")
+                    self.assertEqual(trace.program_counter, expected[-1][0])
+                    for steps in (0, 1, 2, 50, len(trace) // 2, len(trace)):
+                        self.assertEqual(tuple(trace.state_at(steps)), expected[steps], steps)
+                    self.assertEqual([record.step for record in trace], [state[0] for state in expected[:-1]])
+
+    def test_states_from_checkpoints(self):
+        expected = self.states_step_by_step()
+        computer = self.new_computer()
+        with self.assertRaises(IncompatibleTypesError):
+            with TraceWriter(self.path, computer):
+                computer.run()
+        with patch("hrmulator.TraceFiles.CHECKPOINT_STEPS", 5):
+            with TraceFile(self.path) as trace:
+                order = list(range(len(trace) + 1))
+                random.Random(3).shuffle(order)
+                for steps in order:
+                    self.assertEqual(tuple(trace.state_at(steps)), expected[steps], steps)
+                self.assertEqual(len(trace.checkpoints), len(trace) // 5 + 1)
+
+    def test_no_trace_without_an_observer(self):
+        computer = self.new_computer(engine="transpiled")
+        with self.assertRaises(ValueError):
+            TraceWriter(self.path, computer)
+        self.assertFalse(os.path.exists(self.path))
+        computer = self.new_computer()
+        with self.assertRaises(OSError):
+            TraceWriter(os.path.join(self.path, "nowhere"), computer)
+        self.assertEqual(computer.observers, [])
+
+    def test_a_run_that_stops(self):
+        computer = hrmulator.Computer()
+        computer.memory = Memory(values={0: "B"})
+        computer.load_program(program_text="START:\nmove_from_inbox\nmove_to_outbox\ncopy_from 0\njump_to START")
+        computer.set_inbox([1, "A"])
+        with TraceWriter(self.path, computer):
+            computer.run()
+        with TraceFile(self.path) as trace:
+            self.assertIsNone(trace.error)
+            self.assertEqual(trace.start.tiles, {0: "B"})
+            end = trace.state_at(len(trace))
+            self.assertEqual((end.program_counter, end.outbox, end.accumulator), (0, [1, "A"], "B"))
+            self.assertEqual(trace[1].tile_index, None)
+            with self.assertRaises(IndexError):
+                trace.state_at(len(trace) + 1)
+
+    def test_not_a_trace_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a trace, not at all, not even a little bit; nothing like one")
+        with self.assertRaises(ValueError):
+            TraceFile(self.path)
@@ -0,0 +1,118 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import hrmulator
+from hrmulator.Assembler import Assembler
+from hrmulator.Instructions import AccumulatorIsEmptyError, NoSuchJumpDestinationError
+from hrmulator.Memory import Memory
+from hrmulator.tests import test_integration_001, test_integration_003
+from hrmulator.Transpiler import Transpiler
+
+
+class TestTranspiler(TestCase):
+    def setUp(self):
+        self.computer = hrmulator.Computer(engine="transpiled")
+
+    def test_exclusive_lounge(self):
+        self.computer.memory = Memory(values={4: 0, 5: 1})
+        self.computer.set_inbox([-2, -8, 3, -5, -3, 7, 4, 3])
+        self.computer.load_program(program_text=test_integration_001.program_text)
+        self.computer.run()
+        self.assertSequenceEqual(self.computer.outbox, [0, 1, 1, 0])
+        self.assertIsNone(self.computer.program_counter)
+
+    def test_maximization_room_steps_match_interpreter(self):
+        steps = []
+        for engine in ("interpreter", "transpiled"):
+            computer = hrmulator.Computer(engine=engine)
+            computer.memory = Memory(labels={"A": 0, "B": 1})
+            computer.set_inbox([3, 8, -9, -3, 2, 2, 4, -9])
+            computer.load_program(program_text=test_integration_003.program_text)
+            computer.run()
+            steps.append(computer.total_steps_executed)
+        self.assertEqual(steps[0], steps[1])
+
+    def test_failure_in_the_middle_of_a_block(self):
+        self.computer.set_inbox([1])
+        self.computer.load_program(
+            program_text="""
+                no_op
+                move_from_inbox
+                move_to_outbox
+                move_to_outbox
+                no_op"""
+        )
+        with self.assertRaises(AccumulatorIsEmptyError):
+            self.computer.run()
+        self.assertEqual(self.computer.program_counter, 3)
+        self.assertEqual(self.computer.total_steps_executed, 3)
+        self.assertSequenceEqual(self.computer.outbox, [1])
+
+    def test_character_arithmetic(self):
+        self.computer.set_inbox(["C", "A", 7])
+        self.computer.load_program(
+            program_text="""
+                move_from_inbox
+                copy_to 0
+                move_from_inbox
+                copy_to 1
+                copy_from 0
+                subtract 1
+                move_to_outbox
+                move_from_inbox
+                jump_if_negative_to 0"""
+        )
+        self.computer.run()
+        self.assertSequenceEqual(self.computer.outbox, [2])
+
+    def test_jump_if_negative_on_a_letter(self):
+        self.computer.set_inbox(["A"])
+        self.computer.load_program(program_text="move_from_inbox\njump_if_negative_to 0")
+        with self.assertRaises(TypeError):
+            self.computer.run()
+        self.assertEqual(self.computer.program_counter, 1)
+
+    def test_bad_jump_fails_only_when_taken(self):
+        self.computer.set_inbox([1])
+        self.computer.load_program(program_text="move_from_inbox\njump_to NOWHERE")
+        with self.assertRaises(NoSuchJumpDestinationError):
+            self.computer.run()
+        self.assertEqual(self.computer.total_steps_executed, 1)
+        self.assertEqual(self.computer.program_counter, 1)
+
+    def test_unknown_instructions_are_named(self):
+        program, jump_table = Assembler().assemble_program_text("no_op")
+        program.append(object())
+        with self.assertRaisesRegex(TypeError, "Step 1, .* is a object"):
+            Transpiler(program, jump_table, Memory()).source()
+
+    def test_unknown_tile_label_fails_only_when_reached(self):
+        self.computer.set_inbox([1])
+        self.computer.load_program(program_text="move_from_inbox\ncopy_to nowhere")
+        with self.assertRaises(KeyError):
+            self.computer.run()
+        self.assertEqual(self.computer.total_steps_executed, 1)
+        self.assertEqual(self.computer.program_counter, 1)
+
+    def test_compiled_functions_are_shared(self):
+        program, jump_table = Assembler().assemble_program_text("copy_from sum\nmove_to_outbox")
+        first = Transpiler(program, jump_table, Memory(labels={"sum": 0})).compile()
+        second = Transpiler(program, jump_table, Memory(labels={"sum": 0})).compile()
+        elsewhere = Transpiler(program, jump_table, Memory(labels={"sum": 1})).compile()
+        self.assertIs(first, second)
+        self.assertIsNot(first, elsewhere)
+
+    def test_transpiled_once(self):
+        self.computer.memory = Memory(labels={"sum": 0})
+        self.computer.load_program(program_text="move_from_inbox\ncopy_to sum\nadd sum\nmove_to_outbox")
+        with patch.object(Transpiler, "source", autospec=True, side_effect=Transpiler.source) as source:
+            for value in (1, 2, 3):
+                self.computer.set_inbox([value])
+                self.computer.run()
+                self.assertEqual(self.computer.outbox, [2 * value])
+            self.assertEqual(source.call_count, 1)
+            self.computer.memory.label_tile(1, "sum")
+            self.computer.set_inbox([4])
+            self.computer.run()
+            self.assertEqual((self.computer.outbox, self.computer.memory[1]), ([8], 4))
+            self.assertEqual(source.call_count, 2)
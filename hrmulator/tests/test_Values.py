@@ -0,0 +1,35 @@
+import random
+from unittest import TestCase
+
+from hrmulator.Values import EMPTY, ONE, decode, encode
+
+
+class TestValues(TestCase):
+    def test_round_trip(self):
+        for value in (0, 1, -1, 2**70, -(2**70), "A", "z", " ", "☺"):
+            self.assertEqual(decode(encode(value)), value)
+            self.assertEqual(type(decode(encode(value))), type(value))
+
+    def test_only_integers_and_letters(self):
+        for value in (None, True, 1.5, "AB", ""):
+            with self.assertRaises(ValueError):
+                encode(value)
+
+    def test_arithmetic(self):
+        rng = random.Random(0)
+        for _ in range(1000):
+            a, b = rng.randint(-1000, 1000), rng.randint(-1000, 1000)
+            c, d = chr(rng.randint(32, 126)), chr(rng.randint(32, 126))
+            self.assertEqual(decode(encode(a) + encode(b)), a + b)
+            self.assertEqual(decode(encode(a) - encode(b)), a - b)
+            self.assertEqual(decode(encode(c) - encode(d)), ord(c) - ord(d))
+            self.assertEqual(decode(encode(a) + ONE), a + 1)
+            self.assertEqual(encode(a) < 0, a < 0)
+            self.assertEqual(encode(a) == 0, a == 0)
+            self.assertFalse((encode(a) | encode(b)) & 1)
+            self.assertTrue((encode(a) | encode(c)) & 1)
+            self.assertTrue((encode(a) ^ encode(c)) & 1)
+            self.assertFalse((encode(c) ^ encode(d)) & 1)
+
+    def test_empty_is_no_value(self):
+        self.assertNotIn(EMPTY, [encode(value) for value in (0, -(2**62) + 1, 2**62 - 1, chr(0x10FFFF))])
@@ -4,6 +4,26 @@ import unittest
 
 def load_all_tests():
     suite = unittest.TestSuite()
+    suite.addTest(doctest.DocTestSuite("hrmulator.AssemblyCache"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Async"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Batch"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.BoxFiles"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Bytecode"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.CountingLoops"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Fusion"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.JIT"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Linker"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Lockstep"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.LoopDetection"))
     suite.addTest(doctest.DocTestSuite("hrmulator.Memory"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Metrics"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Observers"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.PrefixSharing"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Profiling"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Scheduler"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Streams"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.TraceFiles"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Transpiler"))
     suite.addTest(doctest.DocTestSuite("hrmulator.Utilities"))
+    suite.addTest(doctest.DocTestSuite("hrmulator.Values"))
     unittest.TextTestRunner(verbosity=1).run(suite)
@@ -19,6 +19,9 @@ setup(
         "colorama",
         "termcolor",
     ],
+    extras_require={
+        "lockstep": ["numpy"],
+    },
     test_suite="nose.collector",
     tests_require=[
         "mock",